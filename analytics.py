@@ -0,0 +1,145 @@
+"""
+Analytics
+Retention, lapse, leech and difficulty reports over the review log
+Each report is one SQL pass (window functions instead of per-row Python) and is
+cached until the database changes, detected through PRAGMA data_version
+"""
+
+from config import Config
+
+# (lowest gap, highest gap, label) in days since the card's previous review
+INTERVAL_BUCKETS = (
+    (0, 0, 'same day'),
+    (1, 1, '1 day'),
+    (2, 3, '2-3 days'),
+    (4, 7, '4-7 days'),
+    (8, 14, '1-2 weeks'),
+    (15, 30, '2-4 weeks'),
+    (31, None, 'over a month'),
+)
+
+# Grouping columns for difficulty reports (aliases: l = lemmas, c = categories)
+DIFFICULTY_GROUPS = {
+    'part_of_speech': ('l.part_of_speech', ''),
+    'category': ('c.name', '''
+        JOIN lemma_categories lc ON lc.lemma_id = r.lemma_id
+        JOIN categories c ON c.category_id = lc.category_id'''),
+}
+
+# Answers per card, each with the gap since the card's previous answer and that answer
+ANSWERS_CTE = '''
+    WITH answers AS (
+        SELECT lemma_id, day, familiarity,
+               day - LAG(day) OVER card AS gap,
+               LAG(familiarity) OVER card AS previous
+        FROM review_log
+        WINDOW card AS (PARTITION BY lemma_id ORDER BY review_id)
+    )
+'''
+
+
+def _bucket_case():
+    """SQL CASE mapping a gap to its bucket index"""
+    whens = []
+    for index, (low, high, _) in enumerate(INTERVAL_BUCKETS):
+        condition = f"gap >= {low}" if high is None else f"gap BETWEEN {low} AND {high}"
+        whens.append(f"WHEN {condition} THEN {index}")
+    return f"CASE {' '.join(whens)} END"
+
+
+class Analytics:
+    """Cached analytics queries over review_log, lemmas and user_progress"""
+    
+    def __init__(self, db):
+        self.db = db
+        self.cache = {}  # (report, args) -> (cache key, result)
+    
+    def cache_key(self):
+        """Changes whenever any connection commits a write
+        
+        data_version only moves for other connections' commits, so our own
+        writes are covered by the connection's total_changes counter.
+        """
+        cursor = self.db.connection.cursor()
+        cursor.execute('PRAGMA data_version')
+        return cursor.fetchone()[0], self.db.connection.total_changes
+    
+    def _cached(self, name, args, compute):
+        key = self.cache_key()
+        entry = self.cache.get((name, args))
+        if entry is None or entry[0] != key:
+            entry = self.cache[(name, args)] = (key, compute(*args))
+        return entry[1]
+    
+    def _query(self, sql, params=()):
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    # ==================== REPORTS ====================
+    
+    def retention_by_interval(self):
+        """[{bucket, reviews, retention}] - share recalled, by days since the previous review"""
+        return self._cached('retention', (), self._retention_by_interval)
+    
+    def _retention_by_interval(self):
+        rows = self._query(ANSWERS_CTE + f'''
+            SELECT {_bucket_case()} AS bucket, COUNT(*) AS reviews, AVG(familiarity >= 3) AS retention
+            FROM answers
+            WHERE gap IS NOT NULL
+            GROUP BY bucket
+            ORDER BY bucket
+        ''')
+        for row in rows:
+            row['bucket'] = INTERVAL_BUCKETS[row['bucket']][2]
+        return rows
+    
+    def card_lapses(self, min_failures=1, limit=None):
+        """[{lemma_id, lemma, english, reviews, failures, lapses, last_day}], most failed first
+        
+        A failure is any 'again' answer; a lapse is a failure right after a good/easy answer.
+        """
+        return self._cached('lapses', (min_failures, limit), self._card_lapses)
+    
+    def _card_lapses(self, min_failures, limit):
+        return self._query(ANSWERS_CTE + '''
+            SELECT a.lemma_id, l.lemma, l.english,
+                   COUNT(*) AS reviews,
+                   SUM(a.familiarity = 1) AS failures,
+                   SUM(a.familiarity = 1 AND a.previous >= 3) AS lapses,
+                   MAX(a.day) AS last_day
+            FROM answers a
+            JOIN lemmas l ON l.lemma_id = a.lemma_id
+            GROUP BY a.lemma_id
+            HAVING failures >= ?
+            ORDER BY failures DESC, lapses DESC, l.frequency_rank
+            LIMIT ?
+        ''', (min_failures, -1 if limit is None else limit))
+    
+    def leeches(self, threshold=None):
+        """Cards failed at least Config.LEECH_THRESHOLD times"""
+        return self.card_lapses(threshold or Config.LEECH_THRESHOLD)
+    
+    def difficulty(self, group_by):
+        """[{name, words, reviews, failure_rate, avg_answer, rank}] per part of speech or category"""
+        if group_by not in DIFFICULTY_GROUPS:
+            raise ValueError(f"Cannot group difficulty by: {group_by}")
+        return self._cached('difficulty', (group_by,), self._difficulty)
+    
+    def _difficulty(self, group_by):
+        column, joins = DIFFICULTY_GROUPS[group_by]
+        return self._query(f'''
+            WITH grouped AS (
+                SELECT {column} AS name,
+                       COUNT(DISTINCT r.lemma_id) AS words,
+                       COUNT(*) AS reviews,
+                       AVG(r.familiarity = 1) AS failure_rate,
+                       AVG(r.familiarity) AS avg_answer
+                FROM review_log r
+                JOIN lemmas l ON l.lemma_id = r.lemma_id{joins}
+                GROUP BY name
+            )
+            SELECT *, RANK() OVER (ORDER BY failure_rate DESC) AS rank
+            FROM grouped
+            ORDER BY rank, name
+        ''')
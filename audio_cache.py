@@ -0,0 +1,207 @@
+"""
+Audio Cache
+Rendered text-to-speech clips on disk, content-addressed by (text, voice, engine)
+Each clip is synthesized once into <key[:2]>/<key><suffix> under the cache directory.
+A small SQLite index beside the clips records each file's size, SHA-256 and last
+use, so the cache can evict the least recently played clips beyond its byte budget
+and verify that files on disk are the ones it wrote.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from config import Config
+
+INDEX_FILE = 'index.db'
+
+
+def _digest(path):
+    """(sha256 hex, size) of a file"""
+    sha = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha.update(chunk)
+            size += len(chunk)
+    return sha.hexdigest(), size
+
+
+class AudioCache:
+    """Size-bounded, least-recently-used cache of rendered clips
+    
+    Safe to share between threads: index access is serialized and renders
+    write to private temporary files before being moved into place.
+    """
+    
+    def __init__(self, directory, max_bytes=Config.AUDIO_CACHE_MAX_BYTES, clock=time.time):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.directory / INDEX_FILE, check_same_thread=False)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS clips (
+                key TEXT PRIMARY KEY,
+                file TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS idx_clips_last_used ON clips(last_used)')
+        self.connection.commit()
+    
+    @staticmethod
+    def key(text, voice, engine):
+        """Content address of a clip: the same words in the same voice share one file"""
+        return hashlib.sha256('\0'.join((engine, voice or '', text)).encode('utf-8')).hexdigest()
+    
+    def path(self, file):
+        """Absolute path of a file name recorded in the index (or in lemmas.audio_path)"""
+        return self.directory / file
+    
+    def get(self, text, voice, engine, touch=True):
+        """Path of the cached clip, or None; a hit becomes the most recently used
+        
+        A file whose size no longer matches the index is dropped as a miss. Pass
+        touch=False to check for a clip without changing the eviction order.
+        """
+        return self._lookup(self.key(text, voice, engine), touch)
+    
+    def touch(self, file):
+        """Path of a file named in lemmas.audio_path, made the most recently used, or None if it was evicted"""
+        path = self._lookup(Path(file).stem, touch=True)
+        return path if path == self.path(file) else None
+    
+    def _lookup(self, key, touch):
+        with self.lock:
+            row = self.connection.execute('SELECT file, bytes FROM clips WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            path = self.path(row[0])
+            try:
+                intact = path.stat().st_size == row[1]
+            except OSError:
+                intact = False
+            if not intact:
+                self._forget(key, path)
+                return None
+            if touch:
+                self.connection.execute('UPDATE clips SET last_used = ? WHERE key = ?', (self.clock(), key))
+                self.connection.commit()
+        return path
+    
+    def put(self, text, voice, engine, render, suffix):
+        """Path of the clip, calling render(path) to synthesize it on a miss
+        
+        render must write a complete clip to the path it is given; the file is
+        checksummed and moved into place only after it returns.
+        """
+        cached = self.get(text, voice, engine)
+        if cached is not None:
+            return cached
+        partial = self.reserve(text, voice, engine, suffix)
+        try:
+            render(partial)
+            return self.store(text, voice, engine, partial)
+        finally:
+            if partial.exists():
+                partial.unlink()
+    
+    def reserve(self, text, voice, engine, suffix):
+        """A new private file to render a clip into, next to where the clip will live"""
+        key = self.key(text, voice, engine)
+        directory = self.directory / key[:2]
+        directory.mkdir(exist_ok=True)
+        fd, partial = tempfile.mkstemp(prefix=f'.{key}-', suffix=suffix, dir=directory)
+        os.close(fd)
+        return Path(partial)
+    
+    def store(self, text, voice, engine, partial):
+        """Move a finished render from reserve() into place and index it; returns its path"""
+        key = self.key(text, voice, engine)
+        file = f'{key[:2]}/{key}{Path(partial).suffix}'
+        path = self.path(file)
+        sha256, size = _digest(partial)
+        if not size:
+            raise OSError(f"No audio rendered for: {text}")
+        os.replace(partial, path)
+        with self.lock:
+            self.connection.execute('''
+                INSERT OR REPLACE INTO clips (key, file, bytes, sha256, last_used) VALUES (?, ?, ?, ?, ?)
+            ''', (key, file, size, sha256, self.clock()))
+            self.connection.commit()
+        self.evict()
+        return path
+    
+    def total_bytes(self):
+        with self.lock:
+            return self.connection.execute('SELECT COALESCE(SUM(bytes), 0) FROM clips').fetchone()[0]
+    
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM clips').fetchone()[0]
+    
+    def evict(self, max_bytes=None):
+        """Delete least recently used clips until the cache fits max_bytes; returns the files removed"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        removed = []
+        with self.lock:
+            total = self.connection.execute('SELECT COALESCE(SUM(bytes), 0) FROM clips').fetchone()[0]
+            if total <= max_bytes:
+                return removed
+            for key, file, size in self.connection.execute(
+                    'SELECT key, file, bytes FROM clips ORDER BY last_used').fetchall():
+                if total <= max_bytes:
+                    break
+                self._forget(key, self.path(file))
+                removed.append(file)
+                total -= size
+        return removed
+    
+    def verify(self):
+        """Check every clip against its recorded size and SHA-256
+        
+        Clips that are missing or changed are dropped from the index, and files
+        the index does not know (such as renders interrupted mid-write) are
+        deleted - so run it while nothing is rendering. Returns the file names
+        removed from the cache.
+        """
+        removed = []
+        with self.lock:
+            known = set()
+            for key, file, size, sha256 in self.connection.execute(
+                    'SELECT key, file, bytes, sha256 FROM clips').fetchall():
+                path = self.path(file)
+                try:
+                    intact = _digest(path) == (sha256, size)
+                except OSError:
+                    intact = False
+                if intact:
+                    known.add(path)
+                else:
+                    self._forget(key, path)
+                    removed.append(file)
+            for path in self.directory.glob('*/*'):
+                if path.is_file() and path not in known:
+                    path.unlink()
+                    removed.append(path.relative_to(self.directory).as_posix())
+        return removed
+    
+    def _forget(self, key, path):
+        """Drop a clip from the index and disk (caller holds the lock)"""
+        self.connection.execute('DELETE FROM clips WHERE key = ?', (key,))
+        self.connection.commit()
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,252 @@
+"""
+Audio Pack
+Every rendered clip in one append-only file, indexed by lemma_id in the database
+The pack is a short header followed by clips back to back; the audio_pack table
+records each lemma's offset, length and format. Clips are read as memoryviews of
+an mmap of the file, so nothing is copied before the player reads them, and
+identical clips are stored once. Re-packing a lemma leaves its old bytes behind
+until compact() rewrites the file with only the clips still indexed.
+
+Shipping pre-rendered audio with a dictionary is one file copied next to its database.
+
+Usage: python audio_pack.py build|compact|stats [--db hebrew_vocabulary.db] [--cache DIR]
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+from audio_cache import AudioCache
+from config import Config
+from data_manager import get_database_path
+from database_manager import DatabaseManager
+
+MAGIC = b'HEBAUDIO'
+HEADER = struct.Struct('<8sQ')  # Magic, then the generation the index was written for
+GENERATION_SETTING = 'audio_pack_generation'  # Bumped by each compaction
+
+
+def pack_path(db_path):
+    """The pack that belongs to a vocabulary database: a file beside it"""
+    return Path(db_path).with_name(Config.AUDIO_PACK_FILE)
+
+
+class AudioPack:
+    """Reads and appends clips in a pack file whose index lives in the vocabulary database
+    
+    A compaction writes the new file beside the old one, commits the new offsets
+    with a new generation number, then swaps the files; a pack whose header
+    names another generation is ignored, and an interrupted swap is finished on
+    the next open.
+    """
+    
+    def __init__(self, db, path):
+        self.db = db
+        self.path = Path(path)
+        self.map = None  # mmap of the file, made at the first read and again after appends
+    
+    @property
+    def compacting_path(self):
+        return self.path.with_name(self.path.name + '.compacting')
+    
+    def generation(self):
+        return int(self.db.get_setting(GENERATION_SETTING, 0))
+    
+    def _header(self, path):
+        """Generation in a pack file's header, or None if it is missing or not a pack"""
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(header) < HEADER.size:
+            return None
+        magic, generation = HEADER.unpack(header)
+        return generation if magic == MAGIC else None
+    
+    def _recover(self):
+        """Finish a compaction whose index was committed, or drop one that was not"""
+        compacting = self.compacting_path
+        if compacting.exists():
+            if self._header(compacting) == self.generation():
+                os.replace(compacting, self.path)
+            else:
+                compacting.unlink()
+    
+    def _mapped(self):
+        """mmap of the pack, or None if there is none for this index"""
+        if self.map is None:
+            self._recover()
+            if self._header(self.path) != self.generation():
+                return None
+            with open(self.path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.map
+    
+    def read(self, lemma_id):
+        """(memoryview of the clip, format suffix) for a lemma, or None if it is not packed
+        
+        The view shares the pack's pages; release() it when the clip has been played.
+        """
+        cursor = self.db.connection.cursor()
+        cursor.execute('SELECT offset, length, format FROM audio_pack WHERE lemma_id = ?', (lemma_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        data = self._mapped()
+        if data is None or row['offset'] + row['length'] > len(data):
+            return None  # No pack, or one cut short
+        return memoryview(data)[row['offset']:row['offset'] + row['length']], row['format']
+    
+    def __contains__(self, lemma_id):
+        clip = self.read(lemma_id)
+        if clip is None:
+            return False
+        clip[0].release()
+        return True
+    
+    def add(self, clips):
+        """Pack (lemma_id, bytes, format) clips, appending only bytes not already in the pack
+        
+        Clips are written and synced before their index rows are committed, so an
+        interruption can only leave unindexed bytes for compact() to drop. Returns
+        the number of bytes appended.
+        """
+        self._recover()
+        generation = self.generation()
+        if self._header(self.path) not in (None, generation):
+            raise OSError(f"{self.path} belongs to another index; compact or remove it first")
+        cursor = self.db.connection.cursor()
+        appended = 0
+        with open(self.path, 'ab') as f:
+            if f.tell() == 0:
+                cursor.execute('DELETE FROM audio_pack')  # Rows left from a pack that was removed
+                f.write(HEADER.pack(MAGIC, generation))
+            for lemma_id, data, format in clips:
+                sha256 = hashlib.sha256(data).hexdigest()
+                cursor.execute('SELECT offset FROM audio_pack WHERE sha256 = ? LIMIT 1', (sha256,))
+                row = cursor.fetchone()
+                if row is not None:
+                    offset = row['offset']
+                else:
+                    offset = f.tell()
+                    f.write(data)
+                    appended += len(data)
+                cursor.execute('''
+                    INSERT OR REPLACE INTO audio_pack (lemma_id, offset, length, format, sha256)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (lemma_id, offset, len(data), format, sha256))
+            f.flush()
+            os.fsync(f.fileno())
+        self.db.connection.commit()
+        self.map = None  # Remapped at the next read to cover the new bytes
+        return appended
+    
+    def add_from_cache(self, cache):
+        """Pack every lemma's clip recorded in lemmas.audio_path; returns the bytes appended"""
+        cursor = self.db.connection.cursor()
+        cursor.execute('SELECT lemma_id, audio_path FROM lemmas WHERE audio_path IS NOT NULL')
+        rows = cursor.fetchall()
+        
+        def clips():
+            for row in rows:
+                path = cache.path(row['audio_path'])
+                try:
+                    yield row['lemma_id'], path.read_bytes(), path.suffix
+                except FileNotFoundError:
+                    continue  # Evicted since it was recorded (audio_path is only a hint)
+        return self.add(clips())
+    
+    def stats(self):
+        """Lemmas packed, bytes they use, and the pack file's size"""
+        cursor = self.db.connection.cursor()
+        cursor.execute('SELECT COUNT(*) FROM audio_pack')
+        lemmas = cursor.fetchone()[0]
+        cursor.execute('SELECT COALESCE(SUM(length), 0) FROM (SELECT DISTINCT offset, length FROM audio_pack)')
+        live_bytes = cursor.fetchone()[0]
+        file_bytes = self.path.stat().st_size if self._header(self.path) == self.generation() else 0
+        return {'lemmas': lemmas, 'live_bytes': live_bytes, 'file_bytes': file_bytes}
+    
+    def compact(self):
+        """Rewrite the pack with only indexed clips, in file order; returns the bytes reclaimed
+        
+        Index rows pointing past the end of a cut-short pack are dropped.
+        """
+        data = self._mapped()
+        if data is None:
+            return 0
+        before = len(data)
+        generation = self.generation() + 1
+        cursor = self.db.connection.cursor()
+        cursor.execute('SELECT lemma_id, offset, length FROM audio_pack ORDER BY offset')
+        moved, offsets, lost = {}, [], []
+        view = memoryview(data)
+        try:
+            with open(self.compacting_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, generation))
+                for row in cursor.fetchall():
+                    start, end = row['offset'], row['offset'] + row['length']
+                    if end > before:
+                        lost.append((row['lemma_id'],))
+                        continue
+                    if (start, end) not in moved:
+                        moved[start, end] = f.tell()
+                        f.write(view[start:end])
+                    offsets.append((moved[start, end], row['lemma_id']))
+                f.flush()
+                os.fsync(f.fileno())
+                after = f.tell()
+        finally:
+            view.release()
+        cursor.executemany('UPDATE audio_pack SET offset = ? WHERE lemma_id = ?', offsets)
+        cursor.executemany('DELETE FROM audio_pack WHERE lemma_id = ?', lost)
+        cursor.execute('''
+            INSERT INTO user_settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (GENERATION_SETTING, str(generation)))
+        # Committed first: from here on _recover() completes the swap if it is interrupted
+        self.db.connection.commit()
+        self.map = None
+        os.replace(self.compacting_path, self.path)
+        return before - after
+    
+    def close(self):
+        """Drop the mapping (views still held keep it alive until released)"""
+        self.map = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='audio-pack', description=__doc__.strip().splitlines()[0])
+    paths = Config.get_paths()
+    parser.add_argument('command', choices=['build', 'compact', 'stats'],
+                        help='build: pack cached clips; compact: drop replaced clips; stats: sizes')
+    parser.add_argument('--db', type=Path, default=get_database_path(paths['vocab']), help='database file')
+    parser.add_argument('--cache', type=Path, default=paths['audio_cache'], help='audio cache directory (build)')
+    parser.add_argument('--pack', type=Path, default=None, help='pack file (default: next to the database)')
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.db)
+    pack = AudioPack(db, args.pack or pack_path(args.db))
+    try:
+        if args.command == 'build':
+            cache = AudioCache(args.cache)
+            try:
+                print(f"Appended {pack.add_from_cache(cache)} bytes")
+            finally:
+                cache.close()
+        elif args.command == 'compact':
+            print(f"Reclaimed {pack.compact()} bytes")
+        stats = pack.stats()
+        print(f"{stats['lemmas']} lemmas, {stats['live_bytes']} bytes of clips in a {stats['file_bytes']}-byte pack")
+    finally:
+        pack.close()
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
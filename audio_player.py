@@ -1,27 +1,172 @@
 """
 Audio Playback
-Handles Hebrew text-to-speech using macOS 'say' command
+Speaks Hebrew words through a pluggable TTS backend (tts_backends.py)
+With an AudioCache, each word is rendered to a file once and later plays are
+just that file; the clip is recorded in lemmas.audio_path and played from there
+next time (a path whose clip was evicted is cleared). With a SynthesisPool,
+renders run on worker threads and a new word supersedes the previous one. Words
+in an AudioPack are piped to the player straight from its memory map.
 """
 
 import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+from tts_backends import SayBackend, find_stream_player
+
 
 class AudioPlayer:
     """Manages audio pronunciation"""
     
-    def __init__(self, voice='Carmit'):
-        self.voice = voice
+    def __init__(self, voice=None, cache=None, db=None, backend=None, pool=None, pack=None):
+        self.backend = backend or SayBackend()
+        self.voice = voice or self.backend.default_voice
+        self.cache = cache  # AudioCache; None speaks every time instead of rendering
+        self.db = db  # Records rendered clips in lemmas.audio_path
+        self.pool = pool  # SynthesisPool; None renders on the calling thread
+        self.pack = pack  # AudioPack played before anything is rendered
+        self.process = None  # Playback of the current word, stopped when the next one starts
+        self.lock = threading.Lock()
+        self.unrecorded = []  # (lemma_id, audio_path) rendered on workers, written on the database's thread
     
-    def play(self, hebrew_text):
-        """Play Hebrew text using macOS text-to-speech"""
+    def play(self, hebrew_text, lemma_id=None):
+        """Play Hebrew text, stopping the previous word (from the cache when there is one)
+        
+        With a pool the clip is rendered in the background and the Future of that
+        render is returned; otherwise playback has started when this returns.
+        """
         if not hebrew_text:
-            return
+            return None
         
+        self.record_audio_paths()
         try:
-            # Use macOS 'say' command with Hebrew voice
-            subprocess.Popen(
-                ['say', '-v', self.voice, hebrew_text],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
+            clip = self.pack.read(lemma_id) if self.pack is not None and lemma_id is not None else None
+            if clip is not None:
+                self._stream(*clip)
+            elif self.cache is None:
+                recorded = self.backend.recorded(hebrew_text)
+                if recorded is not None:
+                    self._start(self.backend.play_command(recorded))
+                else:
+                    self._start(self.backend.speak_command(hebrew_text, self.voice))
+            elif (rendered := self._recorded_clip(hebrew_text, lemma_id)) is not None:
+                self._start(self.backend.play_command(rendered))
+            elif self.pool is None:
+                path = self.render(hebrew_text, lemma_id)
+                self.record_audio_paths()
+                self._start(self.backend.play_command(path))
+            else:
+                self.stop()
+                return self.pool.submit(lambda: self._render_quietly(hebrew_text, lemma_id), self._play_clip)
         except Exception as e:
             print(f"Audio playback error: {e}")
+        return None
+    
+    def render(self, hebrew_text, lemma_id=None):
+        """Path of the text's clip: its recording, or a render cached on first use
+        
+        Safe on worker threads: the audio_path update waits for record_audio_paths().
+        """
+        recorded = self.backend.recorded(hebrew_text)
+        if recorded is not None:
+            return recorded
+        path = self.cache.put(
+            hebrew_text, self.voice, self.backend.name,
+            lambda out: self.backend.render(hebrew_text, self.voice, out), self.backend.suffix
+        )
+        if self.db is not None and lemma_id is not None:
+            with self.lock:
+                self.unrecorded.append((lemma_id, path.relative_to(self.cache.directory).as_posix()))
+        return path
+    
+    def record_audio_paths(self):
+        """Store clips rendered since the last call in lemmas.audio_path"""
+        with self.lock:
+            unrecorded, self.unrecorded = self.unrecorded, []
+        for lemma_id, audio_path in unrecorded:
+            if self.db.get_audio_path(lemma_id) != audio_path:
+                self.db.set_audio_path(lemma_id, audio_path)
+    
+    def stop(self):
+        """Stop the word that is playing, if any"""
+        with self.lock:
+            process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+    
+    def close(self):
+        """Drop pending renders and stop playback, then close the cache"""
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.stop()
+        if self.pack is not None:
+            self.pack.close()
+        if self.cache is not None:
+            self.record_audio_paths()
+            self.cache.close()
+    
+    def _recorded_clip(self, hebrew_text, lemma_id):
+        """The clip in lemmas.audio_path if it is this voice's and still cached, else None
+        
+        A recorded clip the cache has since evicted is forgotten, so the column
+        only names files that exist (or are about to be rendered again).
+        """
+        if self.db is None or lemma_id is None:
+            return None
+        audio_path = self.db.get_audio_path(lemma_id)
+        if audio_path is None or Path(audio_path).stem != self.cache.key(hebrew_text, self.voice, self.backend.name):
+            return None
+        path = self.cache.touch(audio_path)
+        if path is None:
+            self.db.set_audio_path(lemma_id, None)
+        return path
+    
+    def _render_quietly(self, hebrew_text, lemma_id):
+        try:
+            return self.render(hebrew_text, lemma_id)
+        except Exception as e:
+            print(f"Audio playback error: {e}")
+            return None
+    
+    def _play_clip(self, path):
+        if path is not None:
+            self._start(self.backend.play_command(path))
+    
+    def _stream(self, data, format):
+        """Play a packed clip: piped from the pack's pages to a player reading stdin,
+        or through a scratch file where there is none (afplay)"""
+        command = find_stream_player()
+        if command is None:
+            self.stop()
+            scratch = Path(tempfile.gettempdir()) / f'hebrew_learning_clip{format}'
+            try:
+                scratch.write_bytes(data)
+            finally:
+                data.release()
+            self._start(self.backend.play_command(scratch))
+            return
+        process = self._start(command, stdin=subprocess.PIPE)
+        threading.Thread(target=self._feed, args=(process, data), name='audio-feed', daemon=True).start()
+    
+    @staticmethod
+    def _feed(process, data):
+        try:
+            process.stdin.write(data)
+            process.stdin.close()
+        except OSError:
+            pass  # Stopped for the next word
+        finally:
+            data.release()
+    
+    def _start(self, command, stdin=None):
+        self.stop()
+        process = subprocess.Popen(
+            command,
+            stdin=stdin,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        with self.lock:
+            self.process = process
+        return process
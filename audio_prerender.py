@@ -0,0 +1,166 @@
+"""
+Audio Pre-rendering
+Synthesizes many words into the audio cache ahead of playback on a process pool
+The app pre-renders each new session's cards and the next day's queue in the
+background, so auto-play finds every clip cached. The prerender-audio command
+covers a whole deck; clips are cached one by one, so an interrupted run resumes
+where it stopped and words already cached are skipped.
+
+Usage: python audio_prerender.py [--db hebrew_vocabulary.db] [--engine espeak-ng] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from audio_cache import AudioCache
+from config import Config
+from daily_queue import DailyQueue
+from data_manager import get_database_path
+from database_manager import DatabaseManager
+from tts_backends import select_backend
+
+
+def render_clip(backend, text, voice, partial):
+    """Pool task: render one word into the file reserved for it"""
+    backend.render(text, voice, partial)
+    return partial
+
+
+class Prerenderer:
+    """Renders the uncached words of a list into an AudioCache, a few processes at a time"""
+    
+    def __init__(self, cache, backend, voice=None, workers=None, executor=ProcessPoolExecutor):
+        self.cache = cache
+        self.backend = backend
+        self.voice = voice or backend.default_voice
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.cancelled = threading.Event()
+        self.failed = []  # Words whose render raised, with the error
+    
+    def cancel(self):
+        """Stop submitting renders; run() returns once those in flight finish"""
+        self.cancelled.set()
+    
+    def missing(self, words):
+        """{text: [lemma_id, ...]} of words with neither a recording nor a cached clip, plus
+        {lemma_id: audio_path} of those already cached"""
+        missing, cached = {}, {}
+        engine = self.backend.name
+        for lemma_id, text in words:
+            if not text or self.backend.recorded(text) is not None:
+                continue
+            path = self.cache.get(text, self.voice, engine, touch=False)
+            if path is not None:
+                cached[lemma_id] = path.relative_to(self.cache.directory).as_posix()
+            else:
+                missing.setdefault(text, []).append(lemma_id)
+        return missing, cached
+    
+    def run(self, words, progress=None):
+        """Render (lemma_id, hebrew) pairs missing from the cache
+        
+        Calls progress(done, total) after each render. Returns {lemma_id: audio_path}
+        for every word that is now cached, for lemmas.audio_path.
+        """
+        missing, clips = self.missing(words)
+        texts = iter(missing)
+        total, done = len(missing), 0
+        if progress:
+            progress(done, total)
+        in_flight = {}
+        pool = self.executor(max_workers=self.workers)
+        try:
+            while True:
+                # Keep only a couple of renders per worker queued, so cancelling is prompt
+                while not self.cancelled.is_set() and len(in_flight) < 2 * self.workers:
+                    text = next(texts, None)
+                    if text is None:
+                        break
+                    partial = self.cache.reserve(text, self.voice, self.backend.name, self.backend.suffix)
+                    future = pool.submit(render_clip, self.backend, text, self.voice, partial)
+                    in_flight[future] = (text, partial)
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    text, partial = in_flight.pop(future)
+                    try:
+                        future.result()
+                        path = self.cache.store(text, self.voice, self.backend.name, partial)
+                    except Exception as e:
+                        self.failed.append((text, e))
+                    else:
+                        for lemma_id in missing[text]:
+                            clips[lemma_id] = path.relative_to(self.cache.directory).as_posix()
+                    finally:
+                        if partial.exists():
+                            partial.unlink()
+                    done += 1
+                    if progress:
+                        progress(done, total)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for text, partial in in_flight.values():
+                if partial.exists():
+                    partial.unlink()
+        return clips
+
+
+def session_words(db, lemma_ids):
+    """(lemma_id, hebrew) of a session's cards followed by the next day's queue"""
+    lemma_ids = list(dict.fromkeys([*lemma_ids, *DailyQueue(db).upcoming()]))
+    return [(word['lemma_id'], word['hebrew']) for word in db.get_words(lemma_ids)]
+
+
+def report_progress(out):
+    """A progress callback printing 'done/total' on one updating line"""
+    started = time.perf_counter()
+
+    def progress(done, total):
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        out.write(f"\r{done}/{total} clips ({rate:.1f}/s)")
+        if done == total:
+            out.write('\n')
+        out.flush()
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='prerender-audio', description=__doc__.strip().splitlines()[0])
+    paths = Config.get_paths()
+    parser.add_argument('--db', type=Path, default=get_database_path(paths['vocab']), help='database file')
+    parser.add_argument('--cache', type=Path, default=paths['audio_cache'], help='audio cache directory')
+    parser.add_argument('--engine', default=Config.TTS_ENGINE, help="'say', 'espeak-ng' or 'file' (default: first installed)")
+    parser.add_argument('--voice', default=Config.AUDIO_VOICE)
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    backend = select_backend(args.engine, paths['recordings'])
+    db = DatabaseManager(args.db)
+    cache = AudioCache(args.cache)
+    prerenderer = Prerenderer(cache, backend, args.voice, args.workers)
+    try:
+        words = [(word['lemma_id'], word['hebrew']) for word in db.get_all_vocabulary()]
+        print(f"{len(words)} words, engine {backend.name}, {prerenderer.workers} workers")
+        clips = prerenderer.run(words, report_progress(sys.stdout))
+        db.set_audio_paths(clips.items())
+    except KeyboardInterrupt:
+        print("\nInterrupted - run again to resume")
+        return 130
+    finally:
+        cache.close()
+        db.close()
+    for text, error in prerenderer.failed[:10]:
+        print(f"failed: {text}: {error}")
+    print(f"{len(clips)} words cached, {len(prerenderer.failed)} failed")
+    return 1 if prerenderer.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
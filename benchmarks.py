@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Benchmarks
+Timings for the database, session and scheduling hot paths on synthetic decks
+Each benchmark runs against a writable copy of a cached synthetic deck, is
+repeated with time.perf_counter, and reports its best per-call time. Results
+are JSON; compare mode flags benchmarks slower than a stored baseline.
+Memory retained per subsystem (memory_profile.py) is recorded alongside as
+'memory:<subsystem>' entries in bytes, so growth is flagged the same way.
+
+Usage:
+    python benchmarks.py run --sizes 10000 100000 --out results.json
+    python benchmarks.py run --only 'start_*' --baseline baseline.json
+    python benchmarks.py compare results.json baseline.json --threshold 0.25
+"""
+
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from database_manager import DatabaseManager
+from memory_profile import profile_subsystems
+from session_filters import DEFAULT_FILTERS
+from session_manager import SessionManager
+from synthetic_deck import cached_deck, generate
+
+DEFAULT_SIZES = (10000, 100000)
+DEFAULT_REPEAT = 5
+# Each repeat runs the benchmark enough times to take at least this long
+MIN_TIME = 0.2
+# A benchmark regresses when its best time grows by more than this fraction
+DEFAULT_THRESHOLD = 0.25
+# Importing regenerates a whole deck per call, so it only runs up to this size
+MAX_IMPORT_LEMMAS = 100000
+# Memory growth smaller than this is allocator noise, never a regression
+MEMORY_NOISE_BYTES = 64 * 1024
+
+
+class BenchmarkContext:
+    """A writable deck copy plus the shared objects benchmarks act on"""
+    
+    def __init__(self, db, size, workdir):
+        self.db = db
+        self.size = size
+        self.workdir = workdir
+        self.rng = random.Random(size)
+        self.session = SessionManager(db)
+        cursor = db.connection.cursor()
+        cursor.execute('''
+            SELECT root FROM lemmas WHERE root IS NOT NULL
+            GROUP BY root ORDER BY COUNT(*) DESC LIMIT 1
+        ''')
+        row = cursor.fetchone()
+        self.root = row[0] if row else ''
+        cursor.execute('SELECT name FROM categories ORDER BY category_id LIMIT 1')
+        row = cursor.fetchone()
+        self.category = row[0] if row else ''
+    
+    def lemma_id(self):
+        return self.rng.randint(1, self.size)
+
+
+def _session(start):
+    """Benchmark a session mode: start it and fetch the first card"""
+    def setup(ctx):
+        def run():
+            start(ctx.session, ctx)
+            ctx.session.get_next_word()
+        return run
+    return setup
+
+
+def _answers(ctx):
+    def run():
+        ctx.db.update_progress(ctx.lemma_id(), ctx.rng.randint(1, 4), duration_ms=1500)
+    return run
+
+
+def _detail(ctx):
+    def run():
+        lemma_id = ctx.lemma_id()
+        ctx.db.get_word(lemma_id)
+        ctx.db.get_lemma_variants(lemma_id)
+        ctx.db.get_lemma_categories(lemma_id)
+        ctx.db.get_lemma_translations(lemma_id)
+    return run
+
+
+def _import(ctx):
+    if ctx.size > MAX_IMPORT_LEMMAS:
+        return None
+    builds = iter(range(sys.maxsize))
+
+    def run():
+        path = ctx.workdir / f'import-{next(builds)}.db'
+        generate(path, ctx.size, today=0)
+        path.unlink()
+    return run
+
+
+# name -> setup(ctx) returning the callable to time (or None to skip at this size)
+BENCHMARKS = {
+    'get_all_vocabulary': lambda ctx: ctx.db.get_all_vocabulary,
+    'update_progress': _answers,
+    'get_vocabulary_stats': lambda ctx: ctx.db.get_vocabulary_stats,
+    'detail_lookup': _detail,
+    'import': _import,
+    'start_session': _session(lambda s, ctx: s.start_session()),
+    'start_session_top_1000': _session(lambda s, ctx: s.start_session(1000)),
+    'start_custom_session': _session(lambda s, ctx: s.start_custom_session(ctx.size // 4, ctx.size // 2)),
+    'start_register_session': _session(lambda s, ctx: s.start_register_session('biblical')),
+    'start_part_of_speech_session': _session(lambda s, ctx: s.start_part_of_speech_session('verb')),
+    'start_root_family_session': _session(lambda s, ctx: s.start_root_family_session(ctx.root)),
+    'start_category_session': _session(lambda s, ctx: s.start_category_session(ctx.category)),
+    'start_weak_words_session': _session(lambda s, ctx: s.start_weak_words_session()),
+    'start_strong_words_session': _session(lambda s, ctx: s.start_strong_words_session()),
+    'start_difficult_words': _session(lambda s, ctx: s.practice_difficult_words(1000)),
+    'start_random_session': _session(lambda s, ctx: s.start_random_session(20)),
+    'start_smart_random_session': _session(lambda s, ctx: s.start_smart_random_session(20)),
+    'start_new_words_session': _session(lambda s, ctx: s.start_new_words_session()),
+    'start_srs_session': _session(lambda s, ctx: s.start_srs_session()),
+    'start_saved_filter_session': _session(
+        lambda s, ctx: s.start_saved_filter_session(next(iter(DEFAULT_FILTERS)))),
+}
+
+
+def time_call(func, repeat=DEFAULT_REPEAT, min_time=MIN_TIME):
+    """Best and median seconds per call, timing `number` calls per repeat
+
+    `number` doubles until one repeat takes at least min_time, as timeit's autorange does.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {'best': min(samples), 'median': statistics.median(samples), 'number': number, 'repeat': repeat}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, only=None, repeat=DEFAULT_REPEAT, min_time=MIN_TIME, log=None,
+                   memory=True):
+    """Run the selected benchmarks (and memory profiles) at each deck size and return the results document"""
+    selected = lambda name: not only or any(fnmatch.fnmatch(name, pattern) for pattern in only)
+    names = [name for name in BENCHMARKS if selected(name)]
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            workdir = Path(workdir)
+            path = workdir / 'deck.db'
+            shutil.copyfile(cached_deck(size), path)
+            db = DatabaseManager(path)
+            try:
+                ctx = BenchmarkContext(db, size, workdir)
+                for name in names:
+                    func = BENCHMARKS[name](ctx)
+                    if func is None:
+                        continue
+                    result = {'name': name, 'size': size, 'unit': 'seconds', **time_call(func, repeat, min_time)}
+                    results.append(result)
+                    if log:
+                        log(f"{name:32s} {size:>9d}  {format_value(result['best'], 'seconds')}")
+            finally:
+                db.close()
+            if memory and (not only or any(pattern.startswith('memory') for pattern in only)):
+                results.extend(_memory_results(path, size, selected, log))
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def _memory_results(path, size, selected, log=None):
+    """Bytes each subsystem retains on a fresh connection to the deck copy"""
+    db = DatabaseManager(path)
+    try:
+        reports = profile_subsystems(db)
+    finally:
+        db.close()
+    results = []
+    for report in reports:
+        name = f'memory:{report.label}'
+        if not selected(name):
+            continue
+        results.append({'name': name, 'size': size, 'unit': 'bytes', 'best': max(report.net_bytes, 0),
+                        'peak': report.peak_bytes, 'bytes_per_lemma': report.bytes_per_lemma})
+        if log:
+            log(f"{name:32s} {size:>9d}  {format_value(report.net_bytes, 'bytes')}  "
+                f"({report.bytes_per_lemma:.1f} B/lemma)")
+    return results
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """[(name, size, unit, baseline, current, ratio, regressed)] for benchmarks in both documents"""
+    previous = {(r['name'], r['size']): r['best'] for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        key = (result['name'], result['size'])
+        if key not in previous:
+            continue
+        unit = result.get('unit', 'seconds')
+        before, after = previous[key], result['best']
+        ratio = after / before if before else (1.0 if not after else float('inf'))
+        regressed = ratio > 1 + threshold
+        if unit == 'bytes':
+            regressed = regressed and after - before > MEMORY_NOISE_BYTES
+        rows.append((*key, unit, before, after, ratio, regressed))
+    return rows
+
+
+def format_value(value, unit):
+    if unit == 'bytes':
+        return f"{value / 1024:8.1f} KiB"
+    for suffix, scale in (('s', 1), ('ms', 1e3), ('µs', 1e6)):
+        if value * scale >= 1:
+            return f"{value * scale:8.2f} {suffix}"
+    return f"{value * 1e9:8.2f} ns"
+
+
+def print_comparison(rows, out=None):
+    out = out or sys.stdout
+    for name, size, unit, before, after, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        out.write(f"{name:32s} {size:>9d}  {format_value(before, unit)} -> {format_value(after, unit)}  "
+                  f"x{ratio:5.2f}{flag}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark database and session hot paths")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run benchmarks')
+    run.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='deck sizes in lemmas')
+    run.add_argument('--only', nargs='+', help='benchmark name patterns, e.g. start_*')
+    run.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    run.add_argument('--min-time', type=float, default=MIN_TIME, help='seconds per repeat')
+    run.add_argument('--no-memory', action='store_false', dest='memory', help='skip memory profiles')
+    run.add_argument('--out', type=Path, help='write results JSON here')
+    run.add_argument('--baseline', type=Path, help='compare against this results file')
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    check = commands.add_parser('compare', help='compare two results files')
+    check.add_argument('current', type=Path)
+    check.add_argument('baseline', type=Path)
+    check.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        current = run_benchmarks(args.sizes, args.only, args.repeat, args.min_time, log=print, memory=args.memory)
+        if args.out:
+            args.out.write_text(json.dumps(current, indent=2))
+        baseline_path = args.baseline
+    else:
+        current = json.loads(args.current.read_text())
+        baseline_path = args.baseline
+    if not baseline_path:
+        return 0
+    rows = compare(current, json.loads(baseline_path.read_text()), args.threshold)
+    print_comparison(rows)
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"\n{regressions} regression(s) over {args.threshold:.0%} in {len(rows)} benchmark(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
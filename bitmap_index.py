@@ -0,0 +1,233 @@
+"""
+Bitmap Index
+In-memory bitsets over lemma ordinals for low-cardinality attributes
+Ordinals follow frequency rank, so set bits come out in rank order and
+intersections like "Torah & verb & due" are single bitwise operations
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+
+from scheduler import day_number
+from session_filters import Field, Category, Due, New, All, And, Or, Not
+
+NO_REVIEW = 2 ** 62  # next_review placeholder for words never scheduled
+NO_RANK = -2 ** 62  # SQLite sorts NULL ranks first, so they get the smallest key
+
+
+def iter_ordinals(bits):
+    """Yield the positions of set bits in ascending order"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index * 8
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield base + bit
+
+
+def _bits_from_buffer(buffer):
+    """Convert a bytearray bitset into a Python int in one step"""
+    return int.from_bytes(buffer, 'little')
+
+
+class BitmapIndex:
+    """Per-value bitsets (Python big ints) for register, part of speech, familiarity,
+    category and due status. Rebuild after importing or deleting lemmas."""
+    
+    FIELDS = ('register', 'part_of_speech', 'familiarity', 'category')
+    
+    def __init__(self):
+        self.lemma_ids = array('q')     # ordinal -> lemma_id
+        self.ranks = array('q')         # ordinal -> frequency_rank (ascending)
+        self.familiarity = []           # ordinal -> familiarity (None if unstudied)
+        self.next_review = array('q')   # ordinal -> next_review day number
+        self.ordinals = {}              # lemma_id -> ordinal
+        self.bitmaps = {field: {} for field in self.FIELDS}
+        self.universe = 0
+        self.due_day = None
+        self.due_bits = 0
+    
+    @classmethod
+    def build(cls, db):
+        """Build every bitmap with one pass over lemmas and one over categories"""
+        index = cls()
+        buffers = {field: {} for field in cls.FIELDS}
+        
+        def set_bit(field, value, ordinal):
+            buffer = buffers[field].get(value)
+            if buffer is None:
+                buffer = buffers[field][value] = bytearray(size_bytes)
+            buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+        
+        cursor = db.connection.cursor()
+        cursor.execute('SELECT COUNT(*) FROM lemmas')
+        size_bytes = (cursor.fetchone()[0] + 7) // 8
+        
+        cursor.execute('''
+            SELECT l.lemma_id, l.frequency_rank, l.register, l.part_of_speech,
+                   up.familiarity, up.next_review
+            FROM lemmas l
+            LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+            ORDER BY l.frequency_rank
+        ''')
+        for ordinal, (lemma_id, rank, register, pos, familiarity, next_review) in enumerate(cursor):
+            index.lemma_ids.append(lemma_id)
+            index.ranks.append(rank if rank is not None else NO_RANK)
+            index.familiarity.append(familiarity)
+            index.next_review.append(next_review if next_review is not None else NO_REVIEW)
+            index.ordinals[lemma_id] = ordinal
+            set_bit('register', register, ordinal)
+            set_bit('part_of_speech', pos, ordinal)
+            set_bit('familiarity', familiarity, ordinal)
+        
+        cursor.execute('''
+            SELECT c.name, lc.lemma_id FROM lemma_categories lc
+            JOIN categories c ON lc.category_id = c.category_id
+        ''')
+        for name, lemma_id in cursor:
+            ordinal = index.ordinals.get(lemma_id)
+            if ordinal is not None:
+                set_bit('category', name, ordinal)
+        
+        for field, values in buffers.items():
+            index.bitmaps[field] = {value: _bits_from_buffer(buf) for value, buf in values.items()}
+        index.universe = (1 << len(index.lemma_ids)) - 1
+        index._rebuild_due_bits(day_number())
+        return index
+    
+    def _rebuild_due_bits(self, today):
+        """Recompute the due bitmap (once per study day)"""
+        buffer = bytearray((len(self.next_review) + 7) // 8)
+        for ordinal, due in enumerate(self.next_review):
+            if due <= today:
+                buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+        self.due_bits = _bits_from_buffer(buffer)
+        self.due_day = today
+    
+    def __len__(self):
+        return len(self.lemma_ids)
+    
+    # ==================== UPDATES ====================
+    
+    def update_progress(self, lemma_id, progress):
+        """Progress listener: move a lemma between familiarity and due bitmaps"""
+        ordinal = self.ordinals.get(lemma_id)
+        if ordinal is None:
+            return
+        bit = 1 << ordinal
+        
+        familiarity_bits = self.bitmaps['familiarity']
+        old = self.familiarity[ordinal]
+        new = progress['familiarity']
+        if old != new:
+            familiarity_bits[old] = familiarity_bits.get(old, 0) & ~bit
+            familiarity_bits[new] = familiarity_bits.get(new, 0) | bit
+            self.familiarity[ordinal] = new
+        
+        self.next_review[ordinal] = progress['next_review']
+        if progress['next_review'] <= self.due_day:
+            self.due_bits |= bit
+        else:
+            self.due_bits &= ~bit
+    
+    # ==================== QUERIES ====================
+    
+    def get(self, field, value):
+        """Bitmap for one attribute value"""
+        return self.bitmaps[field].get(value, 0)
+    
+    def rank_range(self, low=None, high=None):
+        """Bitmap of ordinals whose frequency rank lies in [low, high]"""
+        # Words without a rank never match a rank comparison, as in SQL
+        start = bisect_right(self.ranks, NO_RANK) if low is None else bisect_left(self.ranks, low)
+        stop = len(self.ranks) if high is None else bisect_right(self.ranks, high)
+        if stop <= start:
+            return 0
+        return ((1 << stop) - 1) ^ ((1 << start) - 1)
+    
+    def due(self):
+        """Bitmap of words due today"""
+        today = day_number()
+        if today != self.due_day:
+            self._rebuild_due_bits(today)
+        return self.due_bits
+    
+    def evaluate(self, flt):
+        """Evaluate a session filter to a bitmap, or None if it needs SQL"""
+        if isinstance(flt, Or):
+            return self._combine(flt.children, lambda a, b: a | b, 0)
+        if isinstance(flt, And):
+            return self._combine(flt.children, lambda a, b: a & b, self.universe)
+        if isinstance(flt, Not):
+            inner = self.evaluate(flt.child)
+            return None if inner is None else self.universe & ~inner
+        if isinstance(flt, All):
+            return self.universe
+        if isinstance(flt, New):
+            return self.get('familiarity', None) | self.get('familiarity', 0)
+        if isinstance(flt, Due):
+            return self.due() if flt.days_ahead == 0 else None
+        if isinstance(flt, Category):
+            return self.get('category', flt.name)
+        if isinstance(flt, Field):
+            return self._evaluate_field(flt)
+        return None
+    
+    def _combine(self, children, operator, empty):
+        result = None
+        for child in children:
+            bits = self.evaluate(child)
+            if bits is None:
+                return None
+            result = bits if result is None else operator(result, bits)
+        return empty if result is None else result
+    
+    def _evaluate_field(self, flt):
+        if flt.field == 'rank':
+            ranges = {
+                'between': lambda v: (v[0], v[1]),
+                '<=': lambda v: (None, v),
+                '<': lambda v: (None, v - 1),
+                '>=': lambda v: (v, None),
+                '>': lambda v: (v + 1, None),
+                '=': lambda v: (v, v),
+            }
+            if flt.op not in ranges:
+                return None
+            return self.rank_range(*ranges[flt.op](flt.value))
+        if flt.field not in self.bitmaps:
+            return None
+        values = flt.value if flt.op == 'in' else (flt.value,)
+        if None in values:
+            return None  # SQL's "= NULL" matches nothing, unlike the unstudied bitmap
+        if flt.op == '=':
+            return self.get(flt.field, flt.value)
+        if flt.op == 'in':
+            bits = 0
+            for value in flt.value:
+                bits |= self.get(flt.field, value)
+            return bits
+        return None
+    
+    def lemma_ids_by_due(self, bits, limit=None):
+        """lemma_ids for the set bits ordered by next review day, then rank
+        
+        Unscheduled words come first, as NULLs do in SQL's ORDER BY next_review.
+        """
+        def key(ordinal):
+            due = self.next_review[ordinal]
+            return (due != NO_REVIEW, due, ordinal)
+        ordinals = iter_ordinals(bits)
+        ordered = sorted(ordinals, key=key) if limit is None else heapq.nsmallest(limit, ordinals, key=key)
+        return [self.lemma_ids[ordinal] for ordinal in ordered]
+    
+    def lemma_ids_for(self, bits, limit=None):
+        """lemma_ids for the set bits, in rank order"""
+        result = []
+        for ordinal in iter_ordinals(bits):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self.lemma_ids[ordinal])
+        return result
@@ -4,6 +4,7 @@ Manages file paths and app settings
 NOTE: All UI configuration (colors, fonts, spacing) is now in ui_components.py
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -25,6 +26,47 @@ class Config:
     ICON_FILE = 'icon.png'
     USER_DIR = '.hebrew_learning'
     
+    # Study day boundaries (scheduling uses integer day numbers)
+    DAY_ROLLOVER_HOUR = 4  # A new study day starts at 4 AM
+    TIMEZONE = None  # IANA name such as 'Asia/Jerusalem'; None uses system local time
+    
+    # Session selection
+    USE_BITMAP_INDEX = True  # Build in-memory bitmaps at load for fast set-algebra filters
+    FAST_START = False  # Draw the last session's card from a snapshot, then load the rest (--fast-start)
+    
+    # In-session learning: a card answered "again" returns after each step in turn
+    # Steps are (amount, unit) with unit 'cards' (after N other cards) or 'minutes'
+    LEARNING_STEPS = ((3, 'cards'), (10, 'cards'))
+    # Relative share of each card type when several are ready to be shown
+    SESSION_MIX = {'learning': 1, 'review': 3, 'new': 1}
+    INTERLEAVE_LOOKAHEAD = 50  # Session cards scanned ahead to find the next new/review card
+    
+    # Daily queue: built once per study day, then read slice by slice
+    REVIEWS_PER_DAY = 200
+    NEW_CARDS_PER_DAY = 20
+    
+    # Review history
+    MAX_ANSWER_SECONDS = 60  # Longer pauses count as this much study time (the user walked away)
+    HEATMAP_DAYS = 365
+    LEECH_THRESHOLD = 8  # Words failed this many times are flagged as leeches
+    
+    # Audio: each word is synthesized once per (text, voice, engine) and replayed from disk
+    TTS_ENGINE = None  # 'say', 'espeak-ng' or 'file'; None picks the first installed engine
+    TTS_WORKERS = 2  # Synthesis processes that may run at once
+    AUDIO_VOICE = None  # None uses the engine's Hebrew voice
+    AUDIO_RECORDINGS_DIR = 'recordings'  # Pre-recorded clips next to the app, named <hebrew>.wav
+    AUDIO_PACK_FILE = 'hebrew_audio.pack'  # Packed clips beside the database (python audio_pack.py build)
+    PRERENDER_AUDIO = True  # Render each session's cards and tomorrow's queue in the background
+    PRERENDER_AHEAD = 500  # Session cards pre-rendered, from the first one
+    AUDIO_CACHE_DIR = 'audio_cache'  # Next to the progress file
+    AUDIO_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently played clips are evicted beyond this
+    
+    # Diagnostics
+    TRACE_QUERIES = os.environ.get('HEBREW_TRACE_SQL') == '1'  # Time every SQL statement (Vocabulary > Diagnostics)
+    QUERY_TRACE_FILE = 'query_trace.json'  # Written next to the progress file on exit when tracing
+    METRICS_ENABLED = os.environ.get('HEBREW_METRICS') == '1'  # Study-loop latency histograms (metrics.py)
+    METRICS_FILES = ('metrics.prom', 'metrics.json')  # Exported next to the progress file on exit
+    
     @staticmethod
     def get_paths():
         """Get file paths based on runtime environment"""
@@ -52,5 +94,7 @@ class Config:
             'vocab': base_path / Config.VOCAB_FILE,
             'csv': base_path / Config.VOCAB_FILE,
             'icon': base_path / Config.ICON_FILE,
-            'progress': progress_file
+            'progress': progress_file,
+            'audio_cache': progress_file.parent / Config.AUDIO_CACHE_DIR,
+            'recordings': base_path / Config.AUDIO_RECORDINGS_DIR
         }
@@ -0,0 +1,119 @@
+"""
+Daily Queue
+Today's study queue, materialized once per study day
+Due reviews and the day's new-card quota are written to daily_queue in study
+order at the first use after rollover; later sessions read the next unanswered
+slice, and per-day counters answer "how many left" without recounting
+"""
+
+from config import Config
+from scheduler import day_number
+from session_filters import New
+
+
+class DailyQueue:
+    """Builds and reads the daily_queue / daily_counters tables"""
+    
+    def __init__(self, db):
+        self.db = db
+        self.day = None  # Study day the queue was last checked for
+    
+    def ensure_built(self):
+        """Build today's queue if this is the first use today - O(1) otherwise"""
+        today = day_number()
+        if self.day == today:
+            return today
+        cursor = self.db.connection.cursor()
+        cursor.execute('SELECT 1 FROM daily_counters WHERE day = ?', (today,))
+        if cursor.fetchone() is None:
+            self._build(cursor, today)
+        self.day = today
+        return today
+    
+    def _build(self, cursor, today):
+        """Write due reviews (most overdue first), then new cards by rank, in one transaction"""
+        cursor.execute('DELETE FROM daily_queue WHERE day < ?', (today,))
+        cursor.execute('DELETE FROM daily_counters WHERE day < ?', (today,))
+        
+        cursor.execute('''
+            INSERT INTO daily_queue (day, lemma_id, position, kind)
+            SELECT ?, lemma_id, ROW_NUMBER() OVER (ORDER BY next_review, lemma_id) - 1, 'review'
+            FROM user_progress
+            WHERE next_review <= ?
+            ORDER BY next_review, lemma_id
+            LIMIT ?
+        ''', (today, today, Config.REVIEWS_PER_DAY))
+        reviews = cursor.rowcount
+        
+        where, params = New().compile()
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO daily_queue (day, lemma_id, position, kind)
+            SELECT ?, l.lemma_id, ? + ROW_NUMBER() OVER (ORDER BY l.frequency_rank) - 1, 'new'
+            FROM lemmas l
+            LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+            WHERE {where}
+            ORDER BY l.frequency_rank
+            LIMIT ?
+        ''', (today, reviews) + params + (Config.NEW_CARDS_PER_DAY,))
+        new = cursor.rowcount
+        
+        cursor.execute('''
+            INSERT INTO daily_counters (day, reviews_total, new_total) VALUES (?, ?, ?)
+        ''', (today, reviews, new))
+        self.db.connection.commit()
+    
+    def remaining(self, limit=None):
+        """lemma_ids not yet answered today, in queue order (an index range read)"""
+        today = self.ensure_built()
+        cursor = self.db.connection.cursor()
+        cursor.execute('''
+            SELECT lemma_id FROM daily_queue
+            WHERE day = ? AND done = 0
+            ORDER BY position
+            LIMIT ?
+        ''', (today, -1 if limit is None else limit))
+        return [row['lemma_id'] for row in cursor]
+    
+    def upcoming(self):
+        """lemma_ids likely in the next study day's queue, for pre-rendering (nothing is written)
+        
+        Reviews due by then, plus twice the new-card quota: today's unanswered new
+        cards come first in rank order, tomorrow's follow them.
+        """
+        cursor = self.db.connection.cursor()
+        cursor.execute('''
+            SELECT lemma_id FROM user_progress
+            WHERE next_review <= ?
+            ORDER BY next_review, lemma_id
+            LIMIT ?
+        ''', (day_number() + 1, Config.REVIEWS_PER_DAY))
+        reviews = [row['lemma_id'] for row in cursor]
+        where, params = New().compile()
+        return reviews + self.db.select_lemma_ids(where, params, 'l.frequency_rank', 2 * Config.NEW_CARDS_PER_DAY)
+    
+    def counts(self):
+        """Today's queue sizes and answers from the counters row"""
+        today = self.ensure_built()
+        cursor = self.db.connection.cursor()
+        cursor.execute('SELECT * FROM daily_counters WHERE day = ?', (today,))
+        counts = dict(cursor.fetchone())
+        counts['reviews_left'] = counts['reviews_total'] - counts['reviews_done']
+        counts['new_left'] = counts['new_total'] - counts['new_done']
+        return counts
+    
+    def update_progress(self, lemma_id, progress):
+        """Progress listener: mark a queued card answered and bump its counter"""
+        if self.day is None or progress['last_reviewed'] != self.day:
+            return  # Queue not built yet, or built for an earlier day
+        cursor = self.db.connection.cursor()
+        cursor.execute('''
+            UPDATE daily_queue SET done = 1
+            WHERE day = ? AND lemma_id = ? AND done = 0
+            RETURNING kind
+        ''', (self.day, lemma_id))
+        row = cursor.fetchone()
+        if row is None:
+            return  # Not in today's queue, or already counted
+        column = 'new_done' if row['kind'] == 'new' else 'reviews_done'
+        cursor.execute(f'UPDATE daily_counters SET {column} = {column} + 1 WHERE day = ?', (self.day,))
+        self.db.connection.commit()
@@ -28,6 +28,16 @@ class VocabularyManager:
             self.vocabulary = self.db.get_all_vocabulary()
         print(f"✓ Loaded {len(self.vocabulary)} vocabulary entries from database")
         return self.vocabulary
+    
+    def count(self):
+        """Count vocabulary entries without loading them (sessions fetch words on demand)"""
+        total = self.db.count_lemmas()
+        if not total:
+            print("Database is empty. Populating with sample data...")
+            self.db.populate_sample_data()
+            total = self.db.count_lemmas()
+        print(f"✓ Found {total} vocabulary entries in database")
+        return total
 
 
 class ProgressManager:
@@ -48,7 +58,7 @@ class ProgressManager:
         """Create empty progress structure"""
         return {'easy': 0, 'good': 0, 'hard': 0, 'again': 0, 'not_studied': 0}
     
-    def mark_word(self, progress, word_key, confidence_level):
+    def mark_word(self, progress, word_key, confidence_level, duration_ms=0):
         """Mark a word with confidence level in database"""
         confidence_values = {'again': 1, 'hard': 2, 'good': 3, 'easy': 4}
         familiarity = confidence_values[confidence_level]
@@ -65,7 +75,7 @@ class ProgressManager:
                 lemma_id = int(word_key)
             
             if lemma_id:
-                return self.db.update_progress(lemma_id, familiarity)
+                return self.db.update_progress(lemma_id, familiarity, duration_ms=duration_ms)
             return 2.5
         except Exception as e:
             import traceback
@@ -5,21 +5,53 @@ Handles SQLite database operations for Hebrew vocabulary learning
 
 import sqlite3
 from pathlib import Path
-from datetime import datetime, timedelta
 import random
 
+from config import Config
+from query_trace import TracingConnection
+from scheduler import DueLoadBalancer, day_number
+
 
 class DatabaseManager:
     """Manages SQLite database for vocabulary and progress"""
     
-    def __init__(self, db_path):
+    # Columns of a vocabulary word (shared by full loads and per-session fetches)
+    WORD_COLUMNS = '''
+        l.lemma_id,
+        l.lemma as hebrew,
+        l.transliteration,
+        l.english,
+        l.part_of_speech,
+        l.register,
+        l.notes,
+        l.root,
+        l.frequency_rank as rank,
+        up.familiarity,
+        up.easiness,
+        up.interval,
+        up.last_reviewed,
+        up.next_review,
+        up.streak
+    '''
+    
+    # SQLite's default limit on bound parameters per statement
+    MAX_QUERY_PARAMS = 900
+    
+    def __init__(self, db_path, trace=None):
         self.db_path = Path(db_path)
         self.connection = None
+        # Opt-in statement timing (see query_trace); None follows Config.TRACE_QUERIES
+        self.trace = Config.TRACE_QUERIES if trace is None else trace
         self._initialize_database()
+        self.load_balancer = DueLoadBalancer(self.connection)
+        self.progress_listeners = []  # Called as listener(lemma_id, progress_dict) after each update
     
     def _initialize_database(self):
         """Create database and tables if they don't exist"""
-        self.connection = sqlite3.connect(self.db_path)
+        if self.trace:
+            self.connection = sqlite3.connect(self.db_path, factory=TracingConnection)
+        else:
+            self.connection = sqlite3.connect(self.db_path)
         self.connection.row_factory = sqlite3.Row  # Enable column access by name
         
         cursor = self.connection.cursor()
@@ -88,8 +120,8 @@ class DatabaseManager:
                 familiarity INTEGER DEFAULT 0,
                 easiness REAL DEFAULT 2.5,
                 interval INTEGER DEFAULT 0,
-                last_reviewed DATE,
-                next_review DATE,
+                last_reviewed INTEGER,
+                next_review INTEGER,
                 streak INTEGER DEFAULT 0,
                 FOREIGN KEY (lemma_id) REFERENCES lemmas(lemma_id)
             )
@@ -103,8 +135,198 @@ class DatabaseManager:
             )
         ''')
         
+        # Table 8: Session Checkpoints (enough to rebuild a session lazily, not its card list)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_checkpoints (
+                session_id INTEGER PRIMARY KEY,
+                mode TEXT NOT NULL,
+                filter TEXT NOT NULL,
+                ordering TEXT NOT NULL,
+                row_limit INTEGER,
+                shuffle INTEGER NOT NULL,
+                seed INTEGER,
+                position INTEGER NOT NULL DEFAULT 0,
+                cards_shown INTEGER NOT NULL DEFAULT 0,
+                repeats INTEGER NOT NULL DEFAULT 0,
+                pending TEXT,
+                correct INTEGER NOT NULL DEFAULT 0,
+                incorrect INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Table 9: Daily Queue (today's due reviews and new cards, in study order)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_queue (
+                day INTEGER NOT NULL,
+                lemma_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, lemma_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Table 10: Daily Counters (per-day queue sizes and answers, read instead of recounting)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_counters (
+                day INTEGER PRIMARY KEY,
+                reviews_total INTEGER NOT NULL DEFAULT 0,
+                new_total INTEGER NOT NULL DEFAULT 0,
+                reviews_done INTEGER NOT NULL DEFAULT 0,
+                new_done INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Table 12: Daily Review Stats (one row per study day, updated with each answer)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_review_stats (
+                day INTEGER PRIMARY KEY,
+                reviews INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                lapses INTEGER NOT NULL DEFAULT 0,
+                new_cards INTEGER NOT NULL DEFAULT 0,
+                time_ms INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Table 13: Review Log (every answer, for retention and leech analytics)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_log (
+                review_id INTEGER PRIMARY KEY,
+                lemma_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                familiarity INTEGER NOT NULL,
+                duration_ms INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Table 11: Stats Summary (words per familiarity level, 0 = not studied)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_summary (
+                familiarity INTEGER PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self._create_stats_triggers(cursor)
+        
+        # Table 14: Audio Pack (where each lemma's clip sits in the single-file audio pack)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS audio_pack (
+                lemma_id INTEGER PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                format TEXT NOT NULL,
+                sha256 TEXT NOT NULL
+            )
+        ''')
+        
+        # One-off migrations, recorded in PRAGMA user_version so each open skips them
+        cursor.execute('PRAGMA user_version')
+        version = cursor.fetchone()[0]
+        if version < 1:
+            self._migrate_day_numbers(cursor)
+        if version < 2:
+            self.rebuild_stats(cursor)
+            cursor.execute('PRAGMA user_version = 2')
+        
+        self._create_indexes(cursor)
+        
+        self.connection.commit()
+    
+    def _create_indexes(self, cursor):
+        """Create indexes used by session selection and detail lookups"""
+        indexes = [
+            # Session filters: each ends in frequency_rank so ORDER BY rank needs no sort
+            ('idx_lemmas_rank', 'lemmas(frequency_rank)'),
+            ('idx_lemmas_register', 'lemmas(register, frequency_rank)'),
+            ('idx_lemmas_pos', 'lemmas(part_of_speech, frequency_rank)'),
+            ('idx_lemmas_root', 'lemmas(root, frequency_rank)'),
+            ('idx_lemma_categories_category', 'lemma_categories(category_id, lemma_id)'),
+            # Due-card filters compare integer day numbers against this index
+            ('idx_user_progress_next_review', 'user_progress(next_review)'),
+            ('idx_user_progress_familiarity', 'user_progress(familiarity, easiness)'),
+            # Next slice of today's queue
+            ('idx_daily_queue_position', 'daily_queue(day, done, position)'),
+            # Per-card answer sequences for analytics window functions
+            ('idx_review_log_lemma', 'review_log(lemma_id, review_id)'),
+            # Audio pack: clips shared by identical words, and compaction in file order
+            ('idx_audio_pack_sha256', 'audio_pack(sha256)'),
+            ('idx_audio_pack_offset', 'audio_pack(offset)'),
+            # Per-card detail lookups
+            ('idx_variants_lemma', 'variants(lemma_id)'),
+            ('idx_translations_lemma', 'translations(lemma_id)'),
+        ]
+        for name, target in indexes:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+    
+    def _create_stats_triggers(self, cursor):
+        """Keep stats_summary current as lemmas and progress rows change
+        
+        Each lemma counts once, under its familiarity (0 when it has no progress row).
+        """
+        # INSERT OR REPLACE only fires the delete trigger with recursive triggers on
+        cursor.execute('PRAGMA recursive_triggers = ON')
+        level = "CASE WHEN {0} IN (1, 2, 3, 4) THEN {0} ELSE 0 END"
+        progress_level = level.format(
+            "(SELECT familiarity FROM user_progress WHERE lemma_id = {0}.lemma_id)"
+        )
+        has_lemma = "EXISTS (SELECT 1 FROM lemmas WHERE lemma_id = {0}.lemma_id)"
+        triggers = {
+            'stats_lemma_insert': ('AFTER INSERT ON lemmas', [
+                f"UPDATE stats_summary SET count = count + 1 WHERE familiarity = {progress_level.format('NEW')}",
+            ]),
+            'stats_lemma_delete': ('AFTER DELETE ON lemmas', [
+                f"UPDATE stats_summary SET count = count - 1 WHERE familiarity = {progress_level.format('OLD')}",
+            ]),
+            'stats_progress_insert': (f"AFTER INSERT ON user_progress WHEN {has_lemma.format('NEW')}", [
+                "UPDATE stats_summary SET count = count - 1 WHERE familiarity = 0",
+                f"UPDATE stats_summary SET count = count + 1 WHERE familiarity = {level.format('NEW.familiarity')}",
+            ]),
+            'stats_progress_update': (
+                f"AFTER UPDATE OF familiarity ON user_progress WHEN {has_lemma.format('NEW')}", [
+                f"UPDATE stats_summary SET count = count - 1 WHERE familiarity = {level.format('OLD.familiarity')}",
+                f"UPDATE stats_summary SET count = count + 1 WHERE familiarity = {level.format('NEW.familiarity')}",
+            ]),
+            'stats_progress_delete': (f"AFTER DELETE ON user_progress WHEN {has_lemma.format('OLD')}", [
+                f"UPDATE stats_summary SET count = count - 1 WHERE familiarity = {level.format('OLD.familiarity')}",
+                "UPDATE stats_summary SET count = count + 1 WHERE familiarity = 0",
+            ]),
+        }
+        for name, (event, statements) in triggers.items():
+            body = ';\n'.join(statements)
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body}; END')
+    
+    def rebuild_stats(self, cursor=None):
+        """Recount stats_summary from scratch (first open, or after bulk changes with triggers off)"""
+        cursor = cursor or self.connection.cursor()
+        cursor.execute('DELETE FROM stats_summary')
+        cursor.execute('INSERT INTO stats_summary (familiarity, count) VALUES (0, 0), (1, 0), (2, 0), (3, 0), (4, 0)')
+        cursor.execute('''
+            UPDATE stats_summary SET count = (
+                SELECT COUNT(*) FROM lemmas l
+                LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+                WHERE CASE WHEN up.familiarity IN (1, 2, 3, 4) THEN up.familiarity ELSE 0 END
+                    = stats_summary.familiarity
+            )
+        ''')
         self.connection.commit()
     
+    def _migrate_day_numbers(self, cursor):
+        """Convert ISO date strings from older databases to integer day numbers"""
+        # julianday() of 1970-01-01 is 2440587.5, so this yields days since the epoch
+        cursor.execute('''
+            UPDATE user_progress SET
+                last_reviewed = CASE WHEN typeof(last_reviewed) = 'text'
+                    THEN CAST(julianday(last_reviewed) - 2440587.5 AS INTEGER)
+                    ELSE last_reviewed END,
+                next_review = CASE WHEN typeof(next_review) = 'text'
+                    THEN CAST(julianday(next_review) - 2440587.5 AS INTEGER)
+                    ELSE next_review END
+            WHERE typeof(last_reviewed) = 'text' OR typeof(next_review) = 'text'
+        ''')
+    
     def populate_sample_data(self):
         """Populate database with 50 sample words for testing"""
         cursor = self.connection.cursor()
@@ -383,7 +605,7 @@ class DatabaseManager:
         ''', translations_data)
         
         # Add sample user progress
-        today = datetime.now().date()
+        today = day_number()
         progress_data = []
         
         for lemma_id in range(1, 51):
@@ -393,21 +615,21 @@ class DatabaseManager:
                 easiness = 2.8 + random.random() * 0.5
                 interval = random.randint(7, 30)
                 streak = random.randint(3, 10)
-                last_reviewed = today - timedelta(days=random.randint(1, 5))
-                next_review = today + timedelta(days=interval)
+                last_reviewed = today - random.randint(1, 5)
+                next_review = today + interval
             elif lemma_id <= 20:
                 familiarity = random.choice([2, 3])  # Hard/Good
                 easiness = 2.3 + random.random() * 0.4
                 interval = random.randint(1, 7)
                 streak = random.randint(1, 5)
-                last_reviewed = today - timedelta(days=random.randint(0, 3))
-                next_review = today + timedelta(days=interval)
+                last_reviewed = today - random.randint(0, 3)
+                next_review = today + interval
             else:
                 familiarity = random.choice([1, 2])  # Again/Hard
                 easiness = 2.0 + random.random() * 0.3
                 interval = random.randint(0, 3)
                 streak = random.randint(0, 2)
-                last_reviewed = today - timedelta(days=random.randint(0, 2))
+                last_reviewed = today - random.randint(0, 2)
                 next_review = today
             
             progress_data.append((
@@ -415,8 +637,8 @@ class DatabaseManager:
                 familiarity,
                 round(easiness, 2),
                 interval,
-                last_reviewed.isoformat(),
-                next_review.isoformat(),
+                last_reviewed,
+                next_review,
                 streak
             ))
         
@@ -432,51 +654,112 @@ class DatabaseManager:
     def get_all_vocabulary(self):
         """Get all vocabulary as list of dictionaries (compatible with old format)"""
         cursor = self.connection.cursor()
-        cursor.execute('''
-            SELECT 
-                l.lemma_id,
-                l.lemma as hebrew,
-                l.transliteration,
-                l.english,
-                l.part_of_speech,
-                l.register,
-                l.notes,
-                l.root,
-                l.frequency_rank as rank,
-                up.familiarity,
-                up.easiness,
-                up.interval,
-                up.last_reviewed,
-                up.next_review,
-                up.streak
+        cursor.execute(f'''
+            SELECT {self.WORD_COLUMNS}
             FROM lemmas l
             LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
             ORDER BY l.frequency_rank
         ''')
-        
-        rows = cursor.fetchall()
-        vocabulary = []
-        for row in rows:
-            vocab_dict = {
-                'lemma_id': row['lemma_id'],
-                'hebrew': row['hebrew'],
-                'transliteration': row['transliteration'],
-                'english': row['english'],
-                'rank': row['rank'],
-                'part_of_speech': row['part_of_speech'],
-                'register': row['register'],
-                'notes': row['notes'],
-                'root': row['root'],
-                'familiarity': row['familiarity'],
-                'easiness': row['easiness'],
-                'interval': row['interval'],
-                'last_reviewed': row['last_reviewed'],
-                'next_review': row['next_review'],
-                'streak': row['streak']
-            }
-            vocabulary.append(vocab_dict)
-        
-        return vocabulary
+        return [self._row_to_word(row) for row in cursor.fetchall()]
+    
+    def _row_to_word(self, row):
+        """Convert a WORD_COLUMNS row into a vocabulary dictionary"""
+        return {
+            'lemma_id': row['lemma_id'],
+            'hebrew': row['hebrew'],
+            'transliteration': row['transliteration'],
+            'english': row['english'],
+            'rank': row['rank'],
+            'part_of_speech': row['part_of_speech'],
+            'register': row['register'],
+            'notes': row['notes'],
+            'root': row['root'],
+            'familiarity': row['familiarity'],
+            'easiness': row['easiness'],
+            'interval': row['interval'],
+            'last_reviewed': row['last_reviewed'],
+            'next_review': row['next_review'],
+            'streak': row['streak']
+        }
+    
+    def get_words(self, lemma_ids):
+        """Get vocabulary dictionaries for the given lemma_ids, in the same order"""
+        cursor = self.connection.cursor()
+        words = {}
+        for start in range(0, len(lemma_ids), self.MAX_QUERY_PARAMS):
+            chunk = lemma_ids[start:start + self.MAX_QUERY_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT {self.WORD_COLUMNS}
+                FROM lemmas l
+                LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+                WHERE l.lemma_id IN ({placeholders})
+            ''', chunk)
+            for row in cursor.fetchall():
+                words[row['lemma_id']] = self._row_to_word(row)
+        return [words[lemma_id] for lemma_id in lemma_ids if lemma_id in words]
+    
+    def get_word(self, lemma_id):
+        """Get one vocabulary dictionary by lemma_id (None if it does not exist)"""
+        words = self.get_words([lemma_id])
+        return words[0] if words else None
+    
+    def count_lemmas(self):
+        """Number of lemmas, without loading them"""
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT COUNT(*) FROM lemmas')
+        return cursor.fetchone()[0]
+    
+    def lemma_id_range(self):
+        """All lemma_ids as a range, without reading the table (gaps from deletions included)"""
+        cursor = self.connection.cursor()
+        # Separate subqueries: each is one rowid seek, where MIN and MAX together scan an index
+        cursor.execute('SELECT (SELECT MIN(lemma_id) FROM lemmas), (SELECT MAX(lemma_id) FROM lemmas)')
+        low, high = cursor.fetchone()
+        return range(low, high + 1) if low is not None else range(0)
+    
+    @staticmethod
+    def lemma_ids_query(where='1', params=(), order_by='l.frequency_rank', limit=None):
+        """(sql, params) of a session query - select_lemma_ids runs it, query_plans explains it"""
+        sql = f'''
+            SELECT l.lemma_id FROM lemmas l
+            LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+            WHERE {where}
+            ORDER BY {order_by}
+        '''
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params = (*params, limit)
+        return sql, params
+    
+    def select_lemma_ids(self, where='1', params=(), order_by='l.frequency_rank', limit=None):
+        """Run an indexed session query and return only the matching lemma_ids"""
+        cursor = self.connection.cursor()
+        cursor.execute(*self.lemma_ids_query(where, params, order_by, limit))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def sample_lemma_ids(self, count):
+        """Pick up to `count` random lemma_ids without reading the whole table"""
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT MIN(lemma_id), MAX(lemma_id), COUNT(*) FROM lemmas')
+        low, high, total = cursor.fetchone()
+        count = min(count, total)
+        chosen = set()
+        while len(chosen) < count:
+            # Draw candidate ids from the id range; gaps left by deleted rows are retried
+            needed = count - len(chosen)
+            candidates = random.sample(range(low, high + 1), min(needed * 2, high - low + 1))
+            candidates = [c for c in candidates if c not in chosen][:self.MAX_QUERY_PARAMS]
+            if not candidates:
+                continue
+            placeholders = ','.join('?' * len(candidates))
+            cursor.execute(f'SELECT lemma_id FROM lemmas WHERE lemma_id IN ({placeholders})', candidates)
+            for row in cursor.fetchall():
+                if len(chosen) < count:
+                    chosen.add(row[0])
+        result = list(chosen)
+        random.shuffle(result)
+        return result
     
     def get_lemma_variants(self, lemma_id):
         """Get all variants for a lemma"""
@@ -501,10 +784,20 @@ class DatabaseManager:
         cursor.execute(query, (lemma_id,))
         return [dict(row) for row in cursor.fetchall()]
     
-    def update_progress(self, lemma_id, familiarity, easiness=None, interval=None):
-        """Update user progress for a lemma"""
+    def update_progress(self, lemma_id, familiarity, easiness=None, interval=None, duration_ms=0):
+        """Update user progress for a lemma (duration_ms: time spent answering, for history)"""
         cursor = self.connection.cursor()
-        today = datetime.now().date()
+        today = day_number()
+        
+        # Read the current state in one lookup
+        cursor.execute(
+            'SELECT familiarity, streak, easiness, next_review FROM user_progress WHERE lemma_id = ?', (lemma_id,)
+        )
+        row = cursor.fetchone()
+        is_new = row is None or not row['familiarity']
+        current_streak = row['streak'] if row else 0
+        current_easiness = row['easiness'] if row else 2.5
+        old_due = row['next_review'] if row else None
         
         # Calculate next review based on interval
         if interval is None:
@@ -516,23 +809,17 @@ class DatabaseManager:
                 interval = 3
             else:  # Easy (4)
                 interval = 7
-        
-        next_review = today + timedelta(days=interval)
-        
-        # Get current streak
-        cursor.execute('SELECT streak FROM user_progress WHERE lemma_id = ?', (lemma_id,))
-        row = cursor.fetchone()
-        current_streak = row['streak'] if row else 0
+            # Spread scheduled reviews over the least-loaded nearby day
+            next_review = self.load_balancer.pick_due_date(today, interval)
+            interval = next_review - today
+        else:
+            next_review = today + interval
         
         # Update streak
         new_streak = current_streak + 1 if familiarity >= 3 else 0
         
         # Calculate easiness (simplified SRS)
         if easiness is None:
-            cursor.execute('SELECT easiness FROM user_progress WHERE lemma_id = ?', (lemma_id,))
-            row = cursor.fetchone()
-            current_easiness = row['easiness'] if row else 2.5
-            
             # Adjust easiness based on performance
             if familiarity == 1:  # Again
                 easiness = max(1.3, current_easiness - 0.2)
@@ -556,28 +843,59 @@ class DatabaseManager:
                 next_review = excluded.next_review,
                 streak = excluded.streak
         ''', (lemma_id, familiarity, round(easiness, 2), interval, 
-              today.isoformat(), next_review.isoformat(), new_streak))
+              today, next_review, new_streak))
+        
+        # Log the answer and add it to today's review history in the same transaction
+        cursor.execute('''
+            INSERT INTO review_log (lemma_id, day, familiarity, duration_ms) VALUES (?, ?, ?, ?)
+        ''', (lemma_id, today, familiarity, int(duration_ms)))
+        cursor.execute('''
+            INSERT INTO daily_review_stats (day, reviews, correct, lapses, new_cards, time_ms)
+            VALUES (?, 1, ?, ?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                reviews = reviews + 1,
+                correct = correct + excluded.correct,
+                lapses = lapses + excluded.lapses,
+                new_cards = new_cards + excluded.new_cards,
+                time_ms = time_ms + excluded.time_ms
+        ''', (today, int(familiarity >= 3), int(familiarity == 1), int(is_new), int(duration_ms)))
         
         self.connection.commit()
+        self.load_balancer.move(old_due, next_review)
+        
+        progress = {
+            'familiarity': familiarity, 'easiness': round(easiness, 2), 'interval': interval,
+            'last_reviewed': today, 'next_review': next_review, 'streak': new_streak
+        }
+        for listener in list(self.progress_listeners):  # A listener may be removed meanwhile
+            listener(lemma_id, progress)
         return round(easiness, 2)
     
-    def get_vocabulary_stats(self):
-        """Get statistics about vocabulary progress"""
+    def get_review_history(self, first_day, last_day):
+        """Per-day review aggregates between two day numbers (a primary-key range read)"""
         cursor = self.connection.cursor()
-        
-        # Count by familiarity level
         cursor.execute('''
-            SELECT 
-                COUNT(CASE WHEN familiarity = 4 THEN 1 END) as easy,
-                COUNT(CASE WHEN familiarity = 3 THEN 1 END) as good,
-                COUNT(CASE WHEN familiarity = 2 THEN 1 END) as hard,
-                COUNT(CASE WHEN familiarity = 1 THEN 1 END) as again,
-                COUNT(CASE WHEN familiarity IS NULL OR familiarity = 0 THEN 1 END) as not_studied
-            FROM lemmas l
-            LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
-        ''')
-        
-        return dict(cursor.fetchone())
+            SELECT day, reviews, correct, lapses, new_cards, time_ms FROM daily_review_stats
+            WHERE day BETWEEN ? AND ?
+            ORDER BY day
+        ''', (first_day, last_day))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def add_progress_listener(self, listener):
+        """Register a callback to keep in-memory indexes current after progress updates"""
+        self.progress_listeners.append(listener)
+    
+    def remove_progress_listener(self, listener):
+        """Stop calling a listener registered with add_progress_listener"""
+        self.progress_listeners.remove(listener)
+    
+    def get_vocabulary_stats(self):
+        """Get statistics about vocabulary progress (five rows kept current by triggers)"""
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT familiarity, count FROM stats_summary')
+        counts = dict(cursor.fetchall())
+        names = {4: 'easy', 3: 'good', 2: 'hard', 1: 'again', 0: 'not_studied'}
+        return {name: counts.get(level, 0) for level, name in names.items()}
     
     def get_setting(self, key, default=None):
         """Get a setting value from database"""
@@ -603,6 +921,81 @@ class DatabaseManager:
         ''', (key, str(value)))
         self.connection.commit()
     
+    def get_setting_keys(self, prefix):
+        """List setting keys starting with a prefix (range scan on the primary key)"""
+        cursor = self.connection.cursor()
+        cursor.execute(
+            'SELECT key FROM user_settings WHERE key >= ? AND key < ? ORDER BY key',
+            (prefix, prefix + '\uffff')
+        )
+        return [row['key'] for row in cursor.fetchall()]
+    
+    # ==================== SESSION CHECKPOINTS ====================
+    
+    CHECKPOINT_COLUMNS = (
+        'session_id', 'mode', 'filter', 'ordering', 'row_limit', 'shuffle', 'seed', 'position',
+        'cards_shown', 'repeats', 'pending', 'correct', 'incorrect', 'total'
+    )
+    
+    def save_checkpoint(self, checkpoint):
+        """Upsert a session checkpoint and return its session_id
+        
+        A checkpoint without a session_id starts a new session and replaces any
+        older checkpoint, so only the latest session is offered for resuming.
+        """
+        cursor = self.connection.cursor()
+        if checkpoint.get('session_id') is None:
+            cursor.execute('DELETE FROM session_checkpoints')
+        values = [checkpoint.get(column) for column in self.CHECKPOINT_COLUMNS]
+        updates = ', '.join(f"{column} = excluded.{column}" for column in self.CHECKPOINT_COLUMNS[1:])
+        cursor.execute(f'''
+            INSERT INTO session_checkpoints ({', '.join(self.CHECKPOINT_COLUMNS)})
+            VALUES ({', '.join('?' * len(values))})
+            ON CONFLICT(session_id) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP
+        ''', values)
+        self.connection.commit()
+        return checkpoint.get('session_id') or cursor.lastrowid
+    
+    def load_checkpoint(self):
+        """Latest session checkpoint as a dict, or None (primary key lookup)"""
+        cursor = self.connection.cursor()
+        cursor.execute(f'''
+            SELECT {', '.join(self.CHECKPOINT_COLUMNS)} FROM session_checkpoints
+            ORDER BY session_id DESC LIMIT 1
+        ''')
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def delete_checkpoint(self, session_id):
+        """Forget a finished session"""
+        cursor = self.connection.cursor()
+        cursor.execute('DELETE FROM session_checkpoints WHERE session_id = ?', (session_id,))
+        self.connection.commit()
+    
+    def get_audio_path(self, lemma_id):
+        """Rendered clip recorded for a lemma (relative to the audio cache), or None
+        
+        Only a hint: the cache may have evicted the clip since, which AudioPlayer
+        notices (and clears) the next time the word is played.
+        """
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT audio_path FROM lemmas WHERE lemma_id = ?', (lemma_id,))
+        row = cursor.fetchone()
+        return row['audio_path'] if row else None
+    
+    def set_audio_path(self, lemma_id, audio_path):
+        """Record where a lemma's clip was rendered (None forgets it)"""
+        cursor = self.connection.cursor()
+        cursor.execute('UPDATE lemmas SET audio_path = ? WHERE lemma_id = ?', (audio_path, lemma_id))
+        self.connection.commit()
+    
+    def set_audio_paths(self, audio_paths):
+        """Record many lemmas' clips at once from (lemma_id, audio_path) pairs"""
+        cursor = self.connection.cursor()
+        cursor.executemany('UPDATE lemmas SET audio_path = ? WHERE lemma_id = ?',
+                           [(audio_path, lemma_id) for lemma_id, audio_path in audio_paths])
+        self.connection.commit()
+    
     def get_lemma_id_by_rank(self, rank):
         """Get lemma_id by frequency rank - efficient single lookup"""
         cursor = self.connection.cursor()
@@ -610,6 +1003,15 @@ class DatabaseManager:
         row = cursor.fetchone()
         return row['lemma_id'] if row else None
     
+    @property
+    def tracer(self):
+        """The connection's QueryTracer, or None when tracing is off"""
+        return getattr(self.connection, 'tracer', None)
+    
+    def query_stats(self):
+        """Per-statement counts, latency and rows since the database was opened ([] when not tracing)"""
+        return self.tracer.report() if self.tracer else []
+    
     def close(self):
         """Close database connection"""
         if self.connection:
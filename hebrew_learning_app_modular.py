@@ -5,20 +5,42 @@ Modular version with separated concerns
 Rewritten for Flet
 """
 
+# Imported first so the startup profile measures every import after it
+from startup import IMPORTS_STARTED, StartupProfiler, load_snapshot, save_snapshot
+
+import argparse
 import flet as ft
+import multiprocessing
 import random
+import threading
+import time
+from functools import partial
 
 from config import Config
 from database_manager import DatabaseManager
 from data_manager import VocabularyManager, ProgressManager, get_database_path
+from audio_cache import AudioCache
+from audio_pack import AudioPack, pack_path
 from audio_player import AudioPlayer
+from audio_prerender import Prerenderer, session_words
+from tts_backends import SynthesisPool, select_backend
 from session_manager import SessionManager
+from session_filters import list_saved_filters
+from bitmap_index import BitmapIndex
+from scheduler import day_number
+from metrics import metrics
+import review_history
 from ui_components import UIBuilder, DialogHelper, Themes
 
 class HebrewLearningApp:
     """Main application class"""
     
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, profiler=None, fast_start=None):
+        self.started_at = time.perf_counter()  # For the time-to-first-card metric
+        self.first_card_shown = False
+        self.profiler = profiler or StartupProfiler()
+        self.profiler.record('imports', IMPORTS_STARTED, self.started_at)
+        fast_start = Config.FAST_START if fast_start is None else fast_start
         self.page = page
         self.page.title = Config.APP_NAME
         self.page.window_width = Config.WINDOW_WIDTH
@@ -29,20 +51,26 @@ class HebrewLearningApp:
         self.paths = Config.get_paths()
         
         # Create shared database connection
-        db_path = get_database_path(self.paths['vocab'])
-        self.db = DatabaseManager(db_path)
+        with self.profiler.phase('database'):
+            db_path = get_database_path(self.paths['vocab'])
+            self.db = DatabaseManager(db_path)
         
         # Initialize managers with shared database
         self.vocab_manager = VocabularyManager(self.db)
         self.progress_manager = ProgressManager(self.db)
-        self.audio_player = AudioPlayer()
-        
-        # Load data
-        self.vocabulary = self.vocab_manager.load()
-        self.progress = self.progress_manager.load()
+        self.audio_player = AudioPlayer(
+            Config.AUDIO_VOICE, AudioCache(self.paths['audio_cache']), self.db,
+            backend=select_backend(Config.TTS_ENGINE, self.paths['recordings']), pool=SynthesisPool(),
+            pack=AudioPack(self.db, pack_path(db_path))
+        )
+        self.session = SessionManager(self.db)
+        self.prerender = None  # (Prerenderer, thread) of the current session's audio
+        self.prerendered_words = None
         
-        # Initialize session manager with shared database
-        self.session = SessionManager(self.vocabulary, self.progress, self.db)
+        # Fast start draws the last session's card before loading anything else
+        snapshot = load_snapshot(self.db) if fast_start else None
+        if snapshot is None:
+            self._load_data(background_index=False)
         
         # Load settings from database
         self.settings = self._load_settings()
@@ -64,11 +92,102 @@ class HebrewLearningApp:
             self.page.window.icon = str(self.paths['icon'])
         
         # Build interface
-        self.widgets = self.create_main_interface()
+        with self.profiler.phase('interface'):
+            self.widgets = self.create_main_interface()
         self.setup_keyboard_shortcuts()
         
         # Handle window close
         self.page.on_window_event = self.on_window_event
+        
+        if snapshot is not None:
+            self._show_snapshot(snapshot)
+            self._load_data(background_index=True)
+            self._resume_from_snapshot(snapshot)
+        else:
+            # Offer to continue the last unfinished session
+            with self.profiler.phase('resume offer'):
+                self.offer_resume_session()
+        if snapshot is None or not Config.USE_BITMAP_INDEX:
+            self.profiler.dump()  # Otherwise dumped once the background index is built
+    
+    def _load_data(self, background_index):
+        """Count the deck, load stats and build the bitmap index (in a worker thread if asked)"""
+        with self.profiler.phase('vocabulary count'):
+            self.word_count = self.vocab_manager.count()
+        with self.profiler.phase('statistics'):
+            self.progress = self.progress_manager.load()
+        if not Config.USE_BITMAP_INDEX:
+            return
+        if background_index:
+            self._build_bitmap_index_in_background()
+        else:
+            with self.profiler.phase('bitmap index'):
+                self.session.attach_bitmap_index(BitmapIndex.build(self.db))
+    
+    def _build_bitmap_index_in_background(self):
+        """Build the bitmap index on its own connection, replaying answers given meanwhile
+        
+        The shared connection stays on the UI thread, and the finished index is
+        handed back to the page's handler threads to be attached, so session state
+        is only changed there; sessions started before then use the SQL path.
+        """
+        lock = threading.Lock()
+        state = {'pending': [], 'index': None}  # Answers given during the build, then the attached index
+        
+        def buffer_progress(lemma_id, progress):
+            with lock:
+                if state['index'] is None:
+                    state['pending'].append((lemma_id, progress))
+                    return
+            # A notification that began before the hand-over (applying it twice is harmless)
+            state['index'].update_progress(lemma_id, progress)
+        
+        def build():
+            started = time.perf_counter()
+            db = DatabaseManager(self.db.db_path)
+            try:
+                index = BitmapIndex.build(db)
+            finally:
+                db.close()
+            self.profiler.record('bitmap index (background)', started, time.perf_counter())
+            self.page.run_thread(attach, index)
+        
+        def attach(index):
+            with lock:
+                for lemma_id, progress in state['pending']:
+                    index.update_progress(lemma_id, progress)
+                state['index'] = index
+                self.session.attach_bitmap_index(index)
+                self.db.remove_progress_listener(buffer_progress)
+            self.profiler.dump()
+        
+        self.db.add_progress_listener(buffer_progress)
+        threading.Thread(target=build, name='bitmap-index', daemon=True).start()
+    
+    def _show_snapshot(self, snapshot):
+        """Draw the snapshot card with a single page update"""
+        word = snapshot['word']
+        self.widgets['hebrew_text'].value = word['hebrew']
+        self.widgets['trans_text'].value = word['transliteration'] or ""
+        self.widgets['english_text'].value = ""
+        self.progress_label.value = snapshot['label'] or ""
+        self.page.update()
+        self.first_card_shown = True
+        metrics.observe_since('time_to_first_card', self.started_at)
+        self.profiler.mark('first card (snapshot)')
+    
+    def _resume_from_snapshot(self, snapshot):
+        """Rebuild the snapshot's session; show_next_word then draws its real first card"""
+        with self.profiler.phase('resume session'):
+            if snapshot['source'] == 'srs':
+                self.start_srs_session()
+                return
+            checkpoint = self.session.get_resumable_session()
+            if checkpoint is None:
+                self._show_welcome_message(self.widgets)
+                self.page.update()
+                return
+            self._resume(checkpoint)
     
     def _load_settings(self):
         """Load settings from database"""
@@ -122,8 +241,15 @@ class HebrewLearningApp:
             'pos_adjective': lambda: self.start_part_of_speech_session("adjective"),
             'pos_preposition': lambda: self.start_part_of_speech_session("preposition"),
             
+            # Saved Filters (built-in and user-defined, stored in user_settings)
+            'saved_filters': [
+                (name, lambda name=name: self.start_saved_filter_session(name))
+                for name in list_saved_filters(self.db)
+            ],
+            
             # Random
             'random_10': self.start_random_session,
+            'smart_random_10': self.start_smart_random_session,
             
             # Settings
             'toggle_variants': self.toggle_variants,
@@ -133,6 +259,8 @@ class HebrewLearningApp:
             
             # Vocabulary
             'show_statistics': self.show_statistics,
+            'show_review_history': self.show_review_history,
+            'show_diagnostics': self.show_diagnostics,
             
             # Help
             'show_about': self.show_about,
@@ -169,36 +297,32 @@ class HebrewLearningApp:
         self._hide_response_buttons(widgets)
         self._set_button_state(widgets, 'audio_btn', True) # Disabled
         self._set_button_state(widgets, 'show_answer_btn', True) # Disabled
+        self.page.update()
         
         return widgets
     
     def _set_button_state(self, widgets, button_name, disabled):
         """Set button state"""
         if button_name in widgets:
-            button = widgets[button_name]
-            button.disabled = disabled
-            button.update()
+            widgets[button_name].disabled = disabled
     
     def _show_welcome_message(self, widgets):
         """Show welcome message"""
         widgets['hebrew_text'].value = "Welcome! 🎓"
         widgets['trans_text'].value = "Click 'Study' above to begin learning Hebrew!"
         widgets['english_text'].value = ""
-        self.page.update()
     
     def _hide_response_buttons(self, widgets):
         """Hide all response buttons"""
         for btn_name in ['again_btn', 'hard_btn', 'good_btn', 'easy_btn']:
             widgets[btn_name].visible = False
             widgets[btn_name].disabled = True
-        self.page.update()
     
     def _show_response_buttons(self, widgets):
         """Show all response buttons"""
         for btn_name in ['again_btn', 'hard_btn', 'good_btn', 'easy_btn']:
             widgets[btn_name].visible = True
             widgets[btn_name].disabled = False
-        self.page.update()
     
     def start_session(self, limit):
         """Start a study session"""
@@ -243,7 +367,10 @@ class HebrewLearningApp:
             self.page.snack_bar.open = True
             self.page.update()
             return
-        self.progress_label.value = f"SRS Review: {count} words due today"
+        counts = self.session.daily_queue.counts()
+        self.progress_label.value = (
+            f"SRS Review: {counts['reviews_left']} reviews + {counts['new_left']} new words left today"
+        )
         self.show_next_word()
     
     def start_new_words_session(self):
@@ -313,15 +440,69 @@ class HebrewLearningApp:
         self.progress_label.value = f"Reviewing 20 Strongest Words ({count} found)"
         self.show_next_word()
     
+    def start_saved_filter_session(self, name):
+        """Start a session from a saved filter"""
+        count = self.session.start_saved_filter_session(name)
+        if count == 0:
+            self.page.snack_bar = ft.SnackBar(ft.Text(f"No words match filter: {name}"))
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+        self.progress_label.value = f"{name}: {count} words"
+        self.show_next_word()
+    
+    def offer_resume_session(self):
+        """Ask whether to resume the last checkpointed session"""
+        checkpoint = self.session.get_resumable_session()
+        if checkpoint is None:
+            return
+        
+        def on_yes(e):
+            self.page.dialog.open = False
+            self._resume(checkpoint)
+        
+        def on_no(e):
+            self.page.dialog.open = False
+            self.page.update()
+        
+        dlg = ft.AlertDialog(
+            title=ft.Text("Resume Session"),
+            content=ft.Text(
+                f"Continue '{checkpoint['mode']}' where you left off?\n"
+                f"{checkpoint['total']} words answered so far."
+            ),
+            actions=[
+                ft.TextButton("Resume", on_click=on_yes),
+                ft.TextButton("Not now", on_click=on_no),
+            ],
+        )
+        self.page.dialog = dlg
+        dlg.open = True
+        self.page.update()
+    
+    def _resume(self, checkpoint):
+        """Continue a checkpointed session"""
+        count = self.session.resume_session(checkpoint)
+        self.progress_label.value = f"{checkpoint['mode']}: {count} words (resumed)"
+        self.show_next_word()
+    
     def start_random_session(self):
         """Start random words session"""
         count = self.session.start_random_session(count=10)
         self.progress_label.value = f"Random Selection: {count} words"
         self.show_next_word()
     
+    def start_smart_random_session(self):
+        """Start weakness-weighted random session"""
+        count = self.session.start_smart_random_session(count=10)
+        self.progress_label.value = f"Smart Random: {count} words"
+        self.show_next_word()
+    
+    @metrics.timed('show_next_word')
     def show_next_word(self):
         """Display the next word"""
-        word = self.session.get_next_word()
+        with metrics.span('show_next_word.db'):
+            word = self.session.get_next_word()
         
         if word is None or self.session.is_complete():
             self.show_session_complete()
@@ -352,12 +533,56 @@ class HebrewLearningApp:
         self._set_button_state(self.widgets, 'show_answer_btn', False) # Enabled
         self._hide_response_buttons(self.widgets)
         
-        self.page.update()
+        with metrics.span('show_next_word.ui'):
+            self.page.update()
+        if Config.PRERENDER_AUDIO and self.session.current_words is not self.prerendered_words:
+            self._prerender_session_audio()  # First card of a new session, whichever menu started it
+        if not self.first_card_shown:
+            self.first_card_shown = True
+            metrics.observe_since('time_to_first_card', self.started_at)
+            self.profiler.mark('first card')
         
         # Auto-play audio
         if self.auto_play_audio:
-            self.play_audio()
-    
+            with metrics.span('show_next_word.audio'):
+                self.play_audio()
+    
+    def _prerender_session_audio(self):
+        """Render the session's next cards and tomorrow's queue into the audio cache (unless packed)
+        
+        Runs on its own connection and a process pool, like the bitmap index build;
+        starting another session cancels the previous run.
+        """
+        words = self.prerendered_words = self.session.current_words
+        lemma_ids = [words.lemma_id_at(position) for position in range(min(len(words), Config.PRERENDER_AHEAD))]
+        self._cancel_prerender()
+        prerenderer = Prerenderer(self.audio_player.cache, self.audio_player.backend, self.audio_player.voice)
+        
+        def run():
+            db = DatabaseManager(self.db.db_path)
+            pack = AudioPack(db, self.audio_player.pack.path)
+            try:
+                words = [(lemma_id, text) for lemma_id, text in session_words(db, lemma_ids) if lemma_id not in pack]
+                clips = prerenderer.run(words)
+                db.set_audio_paths(clips.items())
+            finally:
+                pack.close()
+                db.close()
+            if prerenderer.failed:
+                print(f"Audio pre-render: {len(prerenderer.failed)} words failed ({prerenderer.failed[0][1]})")
+        
+        thread = threading.Thread(target=run, name='audio-prerender', daemon=True)
+        self.prerender = (prerenderer, thread)
+        thread.start()
+    
+    def _cancel_prerender(self, wait=False):
+        if self.prerender is not None:
+            prerenderer, thread = self.prerender
+            prerenderer.cancel()
+            if wait:
+                thread.join()
+    
+    @metrics.timed('show_answer')
     def show_answer(self):
         """Reveal the answer"""
         if not self.answer_shown and self.session.current_word:
@@ -381,7 +606,8 @@ class HebrewLearningApp:
             
             # Show variants if enabled
             if self.show_variants and 'variants_text' in self.widgets and word.get('lemma_id'):
-                variants = self.vocab_manager.db.get_lemma_variants(word['lemma_id'])
+                with metrics.span('show_answer.db'):
+                    variants = self.vocab_manager.db.get_lemma_variants(word['lemma_id'])
                 if variants:
                     variant_text = "📝 Variants: " + ", ".join(
                         f"{v['form']} ({v['description']})" for v in variants
@@ -390,7 +616,8 @@ class HebrewLearningApp:
             
             # Show translations if enabled
             if self.show_translations and 'translations_text' in self.widgets and word.get('lemma_id'):
-                translations = self.vocab_manager.db.get_lemma_translations(word['lemma_id'])
+                with metrics.span('show_answer.db'):
+                    translations = self.vocab_manager.db.get_lemma_translations(word['lemma_id'])
                 if translations:
                     trans_text = "🌍 Translations: " + ", ".join(
                         f"{t['language']}: {t['translation']}" for t in translations
@@ -398,8 +625,10 @@ class HebrewLearningApp:
                     self.widgets['translations_text'].value = trans_text
             
             self._show_response_buttons(self.widgets)
-            self.page.update()
+            with metrics.span('show_answer.ui'):
+                self.page.update()
     
+    @metrics.timed('mark_answer')
     def mark_answer(self, confidence_level):
         """Mark answer with confidence level"""
         if not self.session.current_word:
@@ -409,9 +638,12 @@ class HebrewLearningApp:
         word_key = self.session.current_word.get('lemma_id', f"{self.session.current_word['rank']}_{self.session.current_word['hebrew']}")
         
         # Update progress
-        score = self.progress_manager.mark_word(self.progress, word_key, confidence_level)
-        self.session.record_answer(confidence_level)
-        self.progress_manager.save(self.progress)
+        with metrics.span('mark_answer.db'):
+            score = self.progress_manager.mark_word(
+                self.progress, word_key, confidence_level, duration_ms=self.session.answer_time_ms()
+            )
+            self.session.record_answer(confidence_level)
+            self.progress_manager.save(self.progress)
         
         print(f"Marked '{word_key}' as {confidence_level.upper()} (score: {score:.2f})")
         
@@ -437,7 +669,8 @@ class HebrewLearningApp:
     def play_audio(self):
         """Play audio for current word"""
         if self.session.current_word:
-            self.audio_player.play(self.session.current_word['hebrew'])
+            word = self.session.current_word
+            self.audio_player.play(word['hebrew'], word['lemma_id'])
     
     def toggle_theme(self):
         """Toggle dark/light mode"""
@@ -467,7 +700,6 @@ class HebrewLearningApp:
         def on_yes(e):
             self.progress = self.progress_manager._create_empty_progress()
             self.progress_manager.save(self.progress)
-            self.session.progress = self.progress
             self.page.dialog.open = False
             self.page.snack_bar = ft.SnackBar(ft.Text("Your progress has been reset."))
             self.page.snack_bar.open = True
@@ -491,12 +723,30 @@ class HebrewLearningApp:
     
     def show_about(self):
         """Show about dialog"""
-        DialogHelper.show_about_dialog(self.page, len(self.vocabulary))
+        DialogHelper.show_about_dialog(self.page, self.word_count)
     
     def show_statistics(self):
         """Show statistics dialog"""
-        DialogHelper.show_statistics(self.page, len(self.vocabulary), self.progress)
+        self.progress = self.progress_manager.load()  # O(1) read, so always show the latest answers
+        DialogHelper.show_statistics(self.page, self.word_count, self.progress)
 
+    def show_review_history(self):
+        """Show review heatmap and trends from the per-day aggregates"""
+        today = day_number()
+        history = review_history.load_history(self.db, today)
+        DialogHelper.show_review_history(
+            self.page,
+            review_history.heatmap_weeks(history, today),
+            review_history.trend(history, today),
+            review_history.summary(history, today),
+            self.theme,
+        )
+    
+    def show_diagnostics(self):
+        """Show per-statement SQL timings collected by the query tracer"""
+        tracer = self.db.tracer
+        DialogHelper.show_diagnostics(self.page, self.db.query_stats(), tracer.engine_only() if tracer else [])
+    
     def setup_keyboard_shortcuts(self):
         """Setup keyboard shortcuts"""
         def on_keyboard(e: ft.KeyboardEvent):
@@ -522,17 +772,43 @@ class HebrewLearningApp:
         """Handle window events"""
         if e.data == "close":
             self._save_settings()
+            self._save_startup_snapshot()
+            if self.db.tracer:
+                print(self.db.tracer.format_report())
+                self.db.tracer.dump(self.paths['progress'].parent / Config.QUERY_TRACE_FILE)
+            if metrics.enabled:
+                for name in Config.METRICS_FILES:
+                    metrics.write(self.paths['progress'].parent / name)
+            self._cancel_prerender(wait=True)
+            self.audio_player.close()
             self.db.close()
             self.page.window_destroy()
 
-def main(page: ft.Page):
-    app = HebrewLearningApp(page)
+    def _save_startup_snapshot(self):
+        """Remember the card on screen if its session can be rebuilt at the next launch"""
+        word = self.session.current_word if self.session.showing else None
+        if self.session.checkpoint_id is not None:
+            source = 'checkpoint'
+        elif self.session.session_mode == "SRS Review":
+            source = 'srs'
+        else:
+            source = None
+        save_snapshot(self.db, source, self.progress_label.value, word)
+
+def main(page: ft.Page, profile_startup=False, fast_start=None):
+    app = HebrewLearningApp(page, StartupProfiler(enabled=profile_startup), fast_start)
     page.title = "Hebrew Learning App"
     page.window.icon = "icon.png"
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Audio pre-render workers in the bundled app
+    parser = argparse.ArgumentParser(description=Config.APP_NAME)
+    parser.add_argument('--profile-startup', action='store_true', help='print how long each startup phase takes')
+    parser.add_argument('--fast-start', action='store_true', default=None,
+                        help="draw the last session's card first and load the rest after it")
+    args, _ = parser.parse_known_args()
     ft.app(
-        target=main,
+        target=partial(main, profile_startup=args.profile_startup, fast_start=args.fast_start),
         name="Hebrew Learning App",
         assets_dir="assets"
         )
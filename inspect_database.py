@@ -1,189 +1,333 @@
 #!/usr/bin/env python3
 """
 Database Inspector - Query your Hebrew vocabulary database
-Usage: python inspect_database.py
+Usage:
+    python inspect_database.py                              # every section, as text
+    python inspect_database.py show due roots --format json # selected sections
+    python inspect_database.py analytics leeches --threshold 5 --format csv
+    python inspect_database.py sections                     # list section names
+
+Rows stream from SQLite cursors straight to stdout, and every section is a single
+query, so the inspector stays fast on million-lemma databases. JSON output is one
+object per line (JSON Lines) with a "section" field; CSV output starts each section
+with a header row whose first column is "section".
 """
 
-import sqlite3
+import argparse
+import csv
+import json
+import sys
 from pathlib import Path
 
-db_path = Path(__file__).parent / 'hebrew_vocabulary.db'
-conn = sqlite3.connect(db_path)
-conn.row_factory = sqlite3.Row
-c = conn.cursor()
-
-def print_header(title):
-    print(f"\n{'='*60}")
-    print(f"  {title}")
-    print('='*60)
-
-# 1. All lemmas with their info
-print_header("ALL LEMMAS")
-c.execute('''
-    SELECT lemma_id, lemma, transliteration, english, 
-           part_of_speech, register, root, frequency_rank
-    FROM lemmas 
-    ORDER BY frequency_rank
-''')
-for row in c.fetchall():
-    print(f"{row['frequency_rank']:2d}. {row['lemma']:8s} ({row['transliteration']:12s}) "
-          f"= {row['english']:30s} [{row['part_of_speech']:12s}, {row['register']:10s}]")
-    if row['root']:
-        print(f"    Root: {row['root']}")
-
-# 2. Words with variants
-print_header("WORDS WITH VARIANTS")
-c.execute('''
-    SELECT l.lemma, l.transliteration, v.form, v.description
-    FROM lemmas l
-    JOIN variants v ON l.lemma_id = v.lemma_id
-    ORDER BY l.frequency_rank, v.variant_id
-''')
-current_lemma = None
-for row in c.fetchall():
-    if row['lemma'] != current_lemma:
-        print(f"\n{row['lemma']} ({row['transliteration']}):")
-        current_lemma = row['lemma']
-    print(f"  → {row['form']} ({row['description']})")
-
-# 3. Categories and their words
-print_header("CATEGORIES")
-c.execute('SELECT category_id, name FROM categories ORDER BY name')
-categories = c.fetchall()
-for cat in categories:
-    c.execute('''
-        SELECT l.lemma, l.transliteration
+from analytics import Analytics, DIFFICULTY_GROUPS
+from database_manager import DatabaseManager
+from scheduler import day_number, day_to_date
+
+DEFAULT_DB_PATH = Path(__file__).parent / 'hebrew_vocabulary.db'
+
+FAMILIARITY_LEVELS = {0: 'Not Studied', 1: 'Again (Need Review)', 2: 'Hard (Struggling)',
+                      3: 'Good (Confident)', 4: 'Easy (Mastered)'}
+
+
+def _text(value):
+    """Format a possibly-NULL column for fixed-width text output"""
+    return '' if value is None else str(value)
+
+
+# ==================== SECTIONS ====================
+# Each section is (title, sql, params factory, text formatter). Formatters take
+# the row iterator and yield lines, so nothing is materialized.
+
+def _format_lemmas(rows):
+    for row in rows:
+        yield (f"{_text(row['frequency_rank']):>2s}. {_text(row['lemma']):8s} "
+               f"({_text(row['transliteration']):12s}) = {_text(row['english']):30s} "
+               f"[{_text(row['part_of_speech']):12s}, {_text(row['register']):10s}]")
+        if row['root']:
+            yield f"    Root: {row['root']}"
+
+
+def _format_grouped(key, header, line):
+    """Formatter for rows ordered by `key`: a heading per group, then one line per row"""
+    def formatter(rows):
+        current = object()
+        for row in rows:
+            if row[key] != current:
+                current = row[key]
+                yield header(row)
+            yield line(row)
+    return formatter
+
+
+def _format_progress(rows):
+    for row in rows:
+        yield f"\n{FAMILIARITY_LEVELS.get(row['familiarity'], row['familiarity'])}: {row['count']} words"
+        yield f"  Avg Easiness: {row['avg_easiness']}"
+        yield f"  Avg Interval: {row['avg_interval']} days"
+        yield f"  Avg Streak: {row['avg_streak']}"
+
+
+def _format_due(rows):
+    empty = True
+    for row in rows:
+        empty = False
+        yield (f"{_text(row['lemma']):8s} ({_text(row['transliteration']):12s}) - "
+               f"Level: {row['familiarity']}, Streak: {row['streak']}, "
+               f"Due: {day_to_date(row['next_review']).isoformat()}")
+    if empty:
+        yield "No words due for review today!"
+
+
+def _format_biblical(rows):
+    for row in rows:
+        note = f" - {row['notes']}" if row['notes'] else ""
+        yield f"{_text(row['lemma']):10s} ({_text(row['transliteration']):12s}) = {_text(row['english']):30s}{note}"
+
+
+def _format_pos(rows):
+    for row in rows:
+        yield f"{_text(row['part_of_speech']):15s}: {row['count']} words"
+
+
+def _format_summary(rows):
+    for row in rows:
+        yield f"\nTotal Lemmas: {row['lemmas']}"
+        yield f"Total Variants: {row['variants']}"
+        yield f"Total Categories: {row['categories']}"
+        yield f"Total Translations: {row['translations']}"
+        yield f"Words with Progress: {row['progress']}"
+
+
+SECTIONS = {
+    'lemmas': ("ALL LEMMAS", '''
+        SELECT lemma_id, lemma, transliteration, english,
+               part_of_speech, register, root, frequency_rank
+        FROM lemmas
+        ORDER BY frequency_rank
+    ''', lambda args: (), _format_lemmas),
+
+    'variants': ("WORDS WITH VARIANTS", '''
+        SELECT l.lemma_id, l.lemma, l.transliteration, v.form, v.description
         FROM lemmas l
-        JOIN lemma_categories lc ON l.lemma_id = lc.lemma_id
-        WHERE lc.category_id = ?
-        ORDER BY l.frequency_rank
-        LIMIT 10
-    ''', (cat['category_id'],))
-    words = c.fetchall()
-    if words:
-        word_list = ', '.join([f"{w['lemma']} ({w['transliteration']})" for w in words])
-        print(f"\n{cat['name']}: {word_list}")
-
-# 4. Words with translations
-print_header("WORDS WITH TRANSLATIONS")
-c.execute('''
-    SELECT l.lemma, l.transliteration, t.language, t.translation
-    FROM lemmas l
-    JOIN translations t ON l.lemma_id = t.lemma_id
-    ORDER BY l.frequency_rank, t.language
-''')
-current_lemma = None
-for row in c.fetchall():
-    if row['lemma'] != current_lemma:
-        print(f"\n{row['lemma']} ({row['transliteration']}):")
-        current_lemma = row['lemma']
-    print(f"  {row['language']:8s}: {row['translation']}")
-
-# 5. Progress statistics
-print_header("LEARNING PROGRESS")
-c.execute('''
-    SELECT 
-        familiarity,
-        COUNT(*) as count,
-        ROUND(AVG(easiness), 2) as avg_easiness,
-        ROUND(AVG(interval), 1) as avg_interval,
-        ROUND(AVG(streak), 1) as avg_streak
-    FROM user_progress
-    GROUP BY familiarity
-    ORDER BY familiarity DESC
-''')
-levels = {1: 'Again (Need Review)', 2: 'Hard (Struggling)', 
-          3: 'Good (Confident)', 4: 'Easy (Mastered)'}
-for row in c.fetchall():
-    print(f"\n{levels[row['familiarity']]}: {row['count']} words")
-    print(f"  Avg Easiness: {row['avg_easiness']}")
-    print(f"  Avg Interval: {row['avg_interval']} days")
-    print(f"  Avg Streak: {row['avg_streak']}")
-
-# 6. Due for review
-print_header("DUE FOR REVIEW TODAY")
-c.execute('''
-    SELECT l.lemma, l.transliteration, l.english, 
-           up.familiarity, up.next_review, up.streak
-    FROM lemmas l
-    JOIN user_progress up ON l.lemma_id = up.lemma_id
-    WHERE DATE(up.next_review) <= DATE('now')
-    ORDER BY up.next_review
-''')
-due = c.fetchall()
-if due:
-    for row in due:
-        print(f"{row['lemma']:8s} ({row['transliteration']:12s}) - "
-              f"Level: {row['familiarity']}, Streak: {row['streak']}, "
-              f"Due: {row['next_review']}")
-else:
-    print("No words due for review today!")
-
-# 7. Biblical Hebrew words
-print_header("BIBLICAL HEBREW WORDS")
-c.execute('''
-    SELECT lemma, transliteration, english, notes
-    FROM lemmas
-    WHERE register IN ('biblical', 'both')
-    ORDER BY frequency_rank
-''')
-for row in c.fetchall():
-    note = f" - {row['notes']}" if row['notes'] else ""
-    print(f"{row['lemma']:10s} ({row['transliteration']:12s}) = {row['english']:30s}{note}")
-
-# 8. Word families (same root)
-print_header("WORD FAMILIES (BY ROOT)")
-c.execute('''
-    SELECT root, COUNT(*) as count
-    FROM lemmas
-    WHERE root IS NOT NULL
-    GROUP BY root
-    HAVING count > 1
-    ORDER BY count DESC
-''')
-roots = c.fetchall()
-for root_row in roots:
-    c.execute('''
-        SELECT lemma, transliteration, english, part_of_speech
+        JOIN variants v ON l.lemma_id = v.lemma_id
+        ORDER BY l.frequency_rank, v.variant_id
+    ''', lambda args: (), _format_grouped(
+        'lemma_id',
+        lambda row: f"\n{row['lemma']} ({_text(row['transliteration'])}):",
+        lambda row: f"  → {row['form']} ({_text(row['description'])})",
+    )),
+
+    # Top words per category in one pass: rank within each category, keep the first N
+    'categories': ("CATEGORIES", '''
+        SELECT category, lemma, transliteration FROM (
+            SELECT c.name AS category, l.lemma, l.transliteration,
+                   ROW_NUMBER() OVER (PARTITION BY c.category_id ORDER BY l.frequency_rank) AS position
+            FROM categories c
+            JOIN lemma_categories lc ON lc.category_id = c.category_id
+            JOIN lemmas l ON l.lemma_id = lc.lemma_id
+        )
+        WHERE position <= ?
+        ORDER BY category, position
+    ''', lambda args: (args.per_group,), _format_grouped(
+        'category',
+        lambda row: f"\n{row['category']}:",
+        lambda row: f"  {row['lemma']} ({_text(row['transliteration'])})",
+    )),
+
+    'translations': ("WORDS WITH TRANSLATIONS", '''
+        SELECT l.lemma_id, l.lemma, l.transliteration, t.language, t.translation
+        FROM lemmas l
+        JOIN translations t ON l.lemma_id = t.lemma_id
+        ORDER BY l.frequency_rank, t.language
+    ''', lambda args: (), _format_grouped(
+        'lemma_id',
+        lambda row: f"\n{row['lemma']} ({_text(row['transliteration'])}):",
+        lambda row: f"  {row['language']:8s}: {row['translation']}",
+    )),
+
+    'progress': ("LEARNING PROGRESS", '''
+        SELECT
+            familiarity,
+            COUNT(*) as count,
+            ROUND(AVG(easiness), 2) as avg_easiness,
+            ROUND(AVG(interval), 1) as avg_interval,
+            ROUND(AVG(streak), 1) as avg_streak
+        FROM user_progress
+        GROUP BY familiarity
+        ORDER BY familiarity DESC
+    ''', lambda args: (), _format_progress),
+
+    'due': ("DUE FOR REVIEW TODAY", '''
+        SELECT l.lemma, l.transliteration, l.english,
+               up.familiarity, up.next_review, up.streak
+        FROM user_progress up
+        JOIN lemmas l ON l.lemma_id = up.lemma_id
+        WHERE up.next_review <= ?
+        ORDER BY up.next_review
+    ''', lambda args: (day_number(),), _format_due),
+
+    'biblical': ("BIBLICAL HEBREW WORDS", '''
+        SELECT lemma, transliteration, english, notes
         FROM lemmas
-        WHERE root = ?
+        WHERE register IN ('biblical', 'both')
         ORDER BY frequency_rank
-    ''', (root_row['root'],))
-    words = c.fetchall()
-    print(f"\nRoot: {root_row['root']} ({root_row['count']} words)")
-    for word in words:
-        print(f"  {word['lemma']:8s} ({word['transliteration']:12s}) "
-              f"= {word['english']:25s} [{word['part_of_speech']}]")
-
-# 9. Parts of speech distribution
-print_header("PARTS OF SPEECH DISTRIBUTION")
-c.execute('''
-    SELECT part_of_speech, COUNT(*) as count
-    FROM lemmas
-    GROUP BY part_of_speech
-    ORDER BY count DESC
-''')
-for row in c.fetchall():
-    print(f"{row['part_of_speech']:15s}: {row['count']} words")
-
-# 10. Summary
-print_header("DATABASE SUMMARY")
-c.execute('SELECT COUNT(*) FROM lemmas')
-total_lemmas = c.fetchone()[0]
-c.execute('SELECT COUNT(*) FROM variants')
-total_variants = c.fetchone()[0]
-c.execute('SELECT COUNT(*) FROM categories')
-total_categories = c.fetchone()[0]
-c.execute('SELECT COUNT(*) FROM translations')
-total_translations = c.fetchone()[0]
-c.execute('SELECT COUNT(*) FROM user_progress')
-total_progress = c.fetchone()[0]
-
-print(f"\nTotal Lemmas: {total_lemmas}")
-print(f"Total Variants: {total_variants}")
-print(f"Total Categories: {total_categories}")
-print(f"Total Translations: {total_translations}")
-print(f"Words with Progress: {total_progress}")
-
-conn.close()
-print("\n" + "="*60 + "\n")
+    ''', lambda args: (), _format_biblical),
+
+    # Word families in one pass: family size from a window count, no query per root
+    'roots': ("WORD FAMILIES (BY ROOT)", '''
+        SELECT root, family_size, lemma, transliteration, english, part_of_speech FROM (
+            SELECT root, lemma, transliteration, english, part_of_speech, frequency_rank,
+                   COUNT(*) OVER (PARTITION BY root) AS family_size
+            FROM lemmas
+            WHERE root IS NOT NULL
+        )
+        WHERE family_size > 1
+        ORDER BY family_size DESC, root, frequency_rank
+    ''', lambda args: (), _format_grouped(
+        'root',
+        lambda row: f"\nRoot: {row['root']} ({row['family_size']} words)",
+        lambda row: (f"  {_text(row['lemma']):8s} ({_text(row['transliteration']):12s}) "
+                     f"= {_text(row['english']):25s} [{_text(row['part_of_speech'])}]"),
+    )),
+
+    'pos': ("PARTS OF SPEECH DISTRIBUTION", '''
+        SELECT part_of_speech, COUNT(*) as count
+        FROM lemmas
+        GROUP BY part_of_speech
+        ORDER BY count DESC
+    ''', lambda args: (), _format_pos),
+
+    'summary': ("DATABASE SUMMARY", '''
+        SELECT
+            (SELECT COUNT(*) FROM lemmas) AS lemmas,
+            (SELECT COUNT(*) FROM variants) AS variants,
+            (SELECT COUNT(*) FROM categories) AS categories,
+            (SELECT COUNT(*) FROM translations) AS translations,
+            (SELECT COUNT(*) FROM user_progress) AS progress
+    ''', lambda args: (), _format_summary),
+}
+
+ANALYTICS_REPORTS = {
+    'retention': ("RETENTION BY INTERVAL", lambda analytics, args: analytics.retention_by_interval()),
+    'lapses': ("LAPSES BY WORD", lambda analytics, args: analytics.card_lapses(limit=args.limit)),
+    'leeches': ("LEECHES", lambda analytics, args: analytics.leeches(args.threshold)),
+    'difficulty': ("DIFFICULTY", lambda analytics, args: analytics.difficulty(args.by)),
+}
+
+
+# ==================== OUTPUT ====================
+
+class Writer:
+    """Streams sections to a text, JSON Lines or CSV output"""
+
+    def __init__(self, out, fmt):
+        self.out = out
+        self.fmt = fmt
+        self.csv = csv.writer(out) if fmt == 'csv' else None
+
+    def section(self, name, title, columns, rows, formatter=None):
+        if self.fmt == 'text':
+            self.out.write(f"\n{'='*60}\n  {title}\n{'='*60}\n")
+            lines = formatter(rows) if formatter else (
+                '  '.join(f"{column}: {_text(row[column])}" for column in columns) for row in rows
+            )
+            for line in lines:
+                self.out.write(line + '\n')
+        elif self.fmt == 'json':
+            for row in rows:
+                record = {'section': name}
+                record.update(zip(columns, (row[column] for column in columns)))
+                self.out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            self.csv.writerow(['section'] + list(columns))
+            for row in rows:
+                self.csv.writerow([name] + [row[column] for column in columns])
+
+    def close(self):
+        if self.fmt == 'text':
+            self.out.write("\n" + "="*60 + "\n\n")
+
+
+def stream_section(db, name, args):
+    """(title, columns, row cursor, formatter) for a section - rows are read lazily"""
+    title, sql, params, formatter = SECTIONS[name]
+    cursor = db.connection.cursor()
+    cursor.arraysize = 1000
+    cursor.execute(sql, params(args))
+    columns = [description[0] for description in cursor.description]
+    return title, columns, cursor, formatter
+
+
+# ==================== COMMAND LINE ====================
+
+def _common_options(suppress=False):
+    """--db/--format, accepted before or after the subcommand
+
+    The subcommands' copies suppress their defaults, so they do not overwrite
+    values given before the subcommand.
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', type=Path, default=argparse.SUPPRESS if suppress else DEFAULT_DB_PATH,
+                        help='database file')
+    common.add_argument('--format', choices=('text', 'json', 'csv'), dest='fmt',
+                        default=argparse.SUPPRESS if suppress else 'text')
+    return common
+
+
+def build_parser():
+    common = _common_options(suppress=True)
+    parser = argparse.ArgumentParser(description="Inspect the Hebrew vocabulary database",
+                                     parents=[_common_options()])
+    commands = parser.add_subparsers(dest='command')
+
+    show = commands.add_parser('show', parents=[common], help='print database sections')
+    show.add_argument('sections', nargs='*', metavar='SECTION',
+                      help=f"sections to print (default: all): {', '.join(SECTIONS)}")
+    show.add_argument('--per-group', type=int, default=10, help='words listed per category')
+
+    report = commands.add_parser('analytics', parents=[common], help='retention, lapse and difficulty reports')
+    report.add_argument('report', choices=list(ANALYTICS_REPORTS))
+    report.add_argument('--threshold', type=int, default=None, help='failures that make a leech')
+    report.add_argument('--limit', type=int, default=None, help='rows for the lapses report')
+    report.add_argument('--by', choices=list(DIFFICULTY_GROUPS), default='part_of_speech')
+
+    commands.add_parser('sections', help='list section names')
+    parser.set_defaults(sections=[], per_group=10)
+    return parser
+
+
+def main(argv=None, out=None):
+    out = out or sys.stdout
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.sections if name not in SECTIONS]
+    if unknown:
+        parser.error(f"unknown section(s): {', '.join(unknown)} (choose from {', '.join(SECTIONS)})")
+    if args.command == 'sections':
+        for name, (title, *_) in SECTIONS.items():
+            out.write(f"{name:14s}{title}\n")
+        return 0
+
+    # Opening through DatabaseManager applies schema migrations (e.g. integer day numbers)
+    db = DatabaseManager(args.db)
+    writer = Writer(out, args.fmt)
+    try:
+        if args.command == 'analytics':
+            title, report = ANALYTICS_REPORTS[args.report]
+            rows = report(Analytics(db), args)
+            columns = list(rows[0]) if rows else []
+            writer.section(args.report, title, columns, rows)
+        else:
+            for name in args.sections or SECTIONS:
+                title, columns, rows, formatter = stream_section(db, name, args)
+                writer.section(name, title, columns, rows, formatter)
+        writer.close()
+    except BrokenPipeError:
+        pass  # Output piped into head/less and closed early
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
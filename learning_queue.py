@@ -0,0 +1,82 @@
+"""
+Learning Queue
+In-session re-queueing of failed cards
+Cards in learning wait in heaps keyed by the card count or clock time at which
+they fall due, so finding the next due card is O(log n) however many are waiting
+"""
+
+import heapq
+import time
+
+STEP_UNITS = ('cards', 'minutes')
+
+
+class LearningQueue:
+    """Failed cards waiting to be shown again within the current session"""
+    
+    def __init__(self, steps, clock=time.monotonic):
+        for amount, unit in steps:
+            if unit not in STEP_UNITS:
+                raise ValueError(f"Unknown learning step unit: {unit}")
+        self.steps = tuple(steps)
+        self.clock = clock
+        self.card_heap = []  # (due card count, sequence, step, word)
+        self.time_heap = []  # (due clock time, sequence, step, word)
+        self.sequence = 0    # Tie-breaker: equal due keys come back in queueing order
+    
+    def __len__(self):
+        return len(self.card_heap) + len(self.time_heap)
+    
+    def push(self, word, step, cards_shown):
+        """Queue a card for learning step `step`, counting from now - O(log n)"""
+        amount, unit = self.steps[step]
+        self.sequence += 1
+        if unit == 'cards':
+            heapq.heappush(self.card_heap, (cards_shown + amount, self.sequence, step, word))
+        else:
+            heapq.heappush(self.time_heap, (self.clock() + amount * 60, self.sequence, step, word))
+    
+    def snapshot(self):
+        """[(lemma_id, step, due)] in queueing order, for checkpoints
+        
+        `due` is a card count for card steps and the seconds left for minute steps.
+        """
+        now = self.clock()
+        entries = [(seq, word['lemma_id'], step, due) for due, seq, step, word in self.card_heap]
+        entries += [(seq, word['lemma_id'], step, max(due - now, 0)) for due, seq, step, word in self.time_heap]
+        return [entry[1:] for entry in sorted(entries)]
+    
+    def restore(self, word, step, due):
+        """Re-queue a card from snapshot() - O(log n)"""
+        self.sequence += 1
+        if self.steps[step][1] == 'cards':
+            heapq.heappush(self.card_heap, (due, self.sequence, step, word))
+        else:
+            heapq.heappush(self.time_heap, (self.clock() + due, self.sequence, step, word))
+    
+    def has_due(self, cards_shown):
+        """True if a card's step has elapsed - O(1)"""
+        return bool(
+            (self.card_heap and self.card_heap[0][0] <= cards_shown) or
+            (self.time_heap and self.time_heap[0][0] <= self.clock())
+        )
+    
+    def pop(self, cards_shown, force=False):
+        """Remove and return (word, step) for the next due card - O(log n)
+        
+        With force=True the earliest-queued waiting card is returned even if its
+        step has not elapsed (used when nothing else is left to study).
+        """
+        card_due = self.card_heap and self.card_heap[0][0] <= cards_shown
+        time_due = self.time_heap and self.time_heap[0][0] <= self.clock()
+        if card_due and time_due:
+            heap = min(self.card_heap, self.time_heap, key=lambda h: h[0][1])
+        elif card_due or time_due:
+            heap = self.card_heap if card_due else self.time_heap
+        elif force and len(self):
+            waiting = [h for h in (self.card_heap, self.time_heap) if h]
+            heap = min(waiting, key=lambda h: h[0][1])
+        else:
+            return None
+        _, _, step, word = heapq.heappop(heap)
+        return word, step
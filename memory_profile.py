@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Memory Profile
+tracemalloc snapshots around each subsystem that holds vocabulary in memory
+Each measurement diffs snapshots taken before and after a call while its result
+is still alive, so the report shows what the subsystem retains, grouped by the
+module that allocated it, plus bytes per lemma of the deck.
+
+Usage:
+    python memory_profile.py --size 100000
+    python memory_profile.py --db hebrew_vocabulary.db --top 5
+"""
+
+import argparse
+import gc
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from bitmap_index import BitmapIndex
+from data_manager import VocabularyManager
+from database_manager import DatabaseManager
+from session_manager import SessionManager
+from synthetic_deck import cached_deck
+from weighted_sampler import WeaknessSampler
+
+TOP_MODULES = 8
+# Frames kept per allocation; enough to reach the module that asked for the memory
+TRACEBACK_FRAMES = 1
+
+
+class MemoryReport:
+    """Memory a call retained: net and peak bytes, split by allocating module"""
+    
+    def __init__(self, label, net_bytes, peak_bytes, by_module, lemmas):
+        self.label = label
+        self.net_bytes = net_bytes
+        self.peak_bytes = peak_bytes
+        self.by_module = by_module  # [(module, bytes, allocations)], largest first
+        self.lemmas = lemmas
+    
+    @property
+    def bytes_per_lemma(self):
+        return self.net_bytes / self.lemmas if self.lemmas else None
+    
+    def as_dict(self):
+        return {
+            'label': self.label, 'net_bytes': self.net_bytes, 'peak_bytes': self.peak_bytes,
+            'bytes_per_lemma': self.bytes_per_lemma, 'lemmas': self.lemmas,
+            'by_module': [{'module': m, 'bytes': b, 'allocations': n} for m, b, n in self.by_module],
+        }
+    
+    def format(self, top=TOP_MODULES):
+        per_lemma = f"{self.bytes_per_lemma:8.1f} B/lemma" if self.lemmas else ""
+        lines = [f"{self.label:32s} {self.net_bytes / 1024:10.1f} KiB net  "
+                 f"{self.peak_bytes / 1024:10.1f} KiB peak  {per_lemma}"]
+        lines.extend(f"    {module:28s} {size / 1024:10.1f} KiB  {count:8d} blocks"
+                     for module, size, count in self.by_module[:top])
+        return '\n'.join(lines)
+
+
+def _module_name(filename):
+    """Group key for an allocation: the module stem, or the interpreter for frozen/built-ins"""
+    if not filename or filename.startswith('<'):
+        return filename or '<unknown>'
+    return Path(filename).stem
+
+
+def measure(label, func, lemmas=0):
+    """Run func() under tracemalloc and report what its result keeps alive
+
+    Returns (result, MemoryReport). Tracing is started and stopped here unless
+    the caller is already tracing.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(TRACEBACK_FRAMES)
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = func()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    modules = {}
+    # Leave out the profiler's own bookkeeping
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    for stat in after.filter_traces(filters).compare_to(before.filter_traces(filters), 'filename'):
+        module = _module_name(stat.traceback[0].filename)
+        size, count = modules.get(module, (0, 0))
+        modules[module] = (size + stat.size_diff, count + stat.count_diff)
+    by_module = sorted(((m, size, count) for m, (size, count) in modules.items() if size > 0),
+                       key=lambda item: item[1], reverse=True)
+    return result, MemoryReport(label, current - base, peak - base, by_module, lemmas)
+
+
+def profile_subsystems(db):
+    """MemoryReports for loading, indexing and starting sessions on this database"""
+    lemmas = db.count_lemmas()
+    reports = []
+
+    def run(label, func):
+        result, report = measure(label, func, lemmas)
+        reports.append(report)
+        return result
+
+    run('VocabularyManager.load', lambda: VocabularyManager(db).load())
+    run('VocabularyManager.count', lambda: VocabularyManager(db).count())
+    session = run('SessionManager()', lambda: SessionManager(db))
+    run('BitmapIndex.build', lambda: BitmapIndex.build(db))
+    run('WeaknessSampler.build', lambda: WeaknessSampler.build(db))
+    # Session starts: what the session state holds once started
+    starts = (
+        ('start_session (all words)', lambda: session.start_session()),
+        ('start_category_session', lambda: session.start_category_session('Nouns')),
+        ('start_weak_words_session', lambda: session.start_weak_words_session()),
+        ('start_srs_session', lambda: session.start_srs_session()),
+    )
+    for label, start in starts:
+        run(label, lambda: (start(), session.get_next_word(), session.current_words))
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report memory retained by each subsystem")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--size', type=int, default=10000, help='synthetic deck size in lemmas')
+    source.add_argument('--db', type=Path, help='profile a copy of this database instead')
+    parser.add_argument('--top', type=int, default=TOP_MODULES, help='modules listed per subsystem')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / 'profile.db'
+        shutil.copyfile(args.db or cached_deck(args.size), path)
+        db = DatabaseManager(path)
+        try:
+            for report in profile_subsystems(db):
+                print(report.format(args.top))
+        finally:
+            db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
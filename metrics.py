@@ -0,0 +1,162 @@
+"""
+Metrics
+Lightweight spans and fixed-bucket latency histograms for the study loop
+Spans time a block into a named histogram; with metrics disabled, span() hands
+back one shared no-op object, so instrumented code costs an attribute check.
+Snapshots export as JSON or as Prometheus text for a local scrape file.
+"""
+
+import json
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from config import Config
+
+# Upper bounds in milliseconds; anything slower lands in the overflow bucket
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    """Counts of observations per fixed bucket, plus their sum"""
+    
+    __slots__ = ('counts', 'count', 'sum')
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+    
+    def percentile(self, q):
+        """Estimated q-th percentile (0-100), interpolated within its bucket"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS_MS[index - 1] if index else 0
+                upper = BUCKETS_MS[index] if index < len(BUCKETS_MS) else lower * 2
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS_MS[-1] * 2
+    
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum_ms': self.sum,
+            'mean_ms': self.sum / self.count if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': dict(zip([*map(str, BUCKETS_MS), '+Inf'], self.counts)),
+        }
+
+
+class Span:
+    """Times a with-block into a histogram"""
+    
+    __slots__ = ('histogram', 'start')
+    
+    def __init__(self, histogram):
+        self.histogram = histogram
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """Named latency histograms"""
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+    
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+    
+    def span(self, name):
+        """Context manager timing its block into histogram `name`"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self.histogram(name))
+    
+    def timed(self, name):
+        """Decorator: time each call into histogram `name`"""
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Span(self.histogram(name)):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+    
+    def observe(self, name, ms):
+        if self.enabled:
+            self.histogram(name).observe(ms)
+    
+    def observe_since(self, name, start):
+        """Record the milliseconds since a time.perf_counter() reading"""
+        self.observe(name, (time.perf_counter() - start) * 1000)
+    
+    def reset(self):
+        self.histograms.clear()
+    
+    def snapshot(self):
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+    
+    def to_prometheus(self, prefix='hebrew_learning'):
+        """Prometheus text exposition: one histogram family, labelled by span, in seconds"""
+        family = f'{prefix}_span_seconds'
+        lines = [f'# HELP {family} Latency of instrumented study-loop spans',
+                 f'# TYPE {family} histogram']
+        for name, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip([*BUCKETS_MS, None], histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound is None else repr(bound / 1000)
+                lines.append(f'{family}_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{family}_sum{{span="{name}"}} {histogram.sum / 1000!r}')
+            lines.append(f'{family}_count{{span="{name}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, path):
+        """Export to path: Prometheus text for .prom/.txt files, otherwise a JSON snapshot"""
+        path = str(path)
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, indent=2)
+
+
+# Shared registry for the app
+metrics = Metrics(Config.METRICS_ENABLED)
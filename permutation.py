@@ -0,0 +1,50 @@
+"""
+Permutation
+Seeded pseudo-random permutations of range(n) in constant memory
+A small Feistel network with cycle-walking maps position -> shuffled index on demand
+"""
+
+import random
+
+
+class ShuffledRange:
+    """Random-access permutation of range(n), reproducible from (n, seed)"""
+    
+    ROUNDS = 4
+    
+    def __init__(self, n, seed):
+        self.n = n
+        self.seed = seed
+        # Smallest even-width bit domain covering n (at most 4n values, so cycle-walking is short)
+        self.half_bits = max(1, ((max(n, 2) - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.round_keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+    
+    def _round(self, value, key):
+        """Round function: a deterministic 32-bit integer mix"""
+        x = (value ^ key) & 0xFFFFFFFF
+        x = ((x >> 16) ^ x) * 0x45D9F3B & 0xFFFFFFFF
+        x = ((x >> 16) ^ x) * 0x45D9F3B & 0xFFFFFFFF
+        return ((x >> 16) ^ x) & self.half_mask
+    
+    def _encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for key in self.round_keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+    
+    def __getitem__(self, position):
+        if not 0 <= position < self.n:
+            raise IndexError(position)
+        value = self._encrypt(position)
+        # Cycle-walk until we land back inside range(n); the permutation is preserved
+        while value >= self.n:
+            value = self._encrypt(value)
+        return value
+    
+    def __len__(self):
+        return self.n
+    
+    def __iter__(self):
+        return (self[i] for i in range(self.n))
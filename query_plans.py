@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Query Plans
+Registry of every SQL statement the data layer runs, and the EXPLAIN QUERY PLAN check
+Each entry is a statement as its code issues it, plus the large tables it may
+read in full and whether it may sort for ORDER BY. tests/test_query_plans.py
+explains every entry on a synthetic deck, and traces a run of the data layer to
+fail on any statement missing here, so a new or changed query has to be
+registered - and have its plan checked - before the tests pass.
+
+Usage:
+    python query_plans.py --size 100000
+    python query_plans.py --db hebrew_vocabulary.db --verbose
+"""
+
+import argparse
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from analytics import ANSWERS_CTE, DIFFICULTY_GROUPS, _bucket_case
+from database_manager import DatabaseManager
+from query_trace import normalize_sql
+from session_filters import DEFAULT_FILTERS, ORDERINGS, Category, Field, Filter, New, Not
+from synthetic_deck import cached_deck
+
+# Tables that grow with the deck or the review history; anything else stays small
+LARGE_TABLES = frozenset({'lemmas', 'user_progress', 'lemma_categories', 'variants', 'translations', 'review_log',
+                          'audio_pack'})
+
+# Statement kinds that are registered; schema setup and PRAGMAs are not
+CHECKED_KINDS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_SCAN = re.compile(r'SCAN (?:TABLE )?(\w+)')
+_ORDER_BY_SORT = re.compile(r'USE TEMP B-TREE FOR (?:.* )?ORDER BY')
+_TABLES = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_KEYWORDS = frozenset({'ON', 'WHERE', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'GROUP', 'ORDER', 'LIMIT', 'WINDOW',
+                       'USING', 'SET', 'VALUES', 'SELECT', 'DEFAULT', 'HAVING'})
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+
+
+class Statement:
+    """A registered statement and the plan steps it is allowed"""
+    
+    def __init__(self, sql, scans=(), sorts=False):
+        self.sql = sql
+        self.scans = frozenset(scans)  # Large tables it reads in full on purpose
+        self.sorts = sorts             # Whether it may sort its rows for ORDER BY
+    
+    @property
+    def key(self):
+        return normalize_sql(self.sql)
+
+
+def _session(flt, order='rank', limit=None, **allowed):
+    """The select_lemma_ids statement a session filter compiles to"""
+    where, params = flt.compile()
+    sql, _ = DatabaseManager.lemma_ids_query(where, params, ORDERINGS[order], limit)
+    return Statement(sql, **allowed)
+
+
+def _saved_filter(name, **allowed):
+    spec = DEFAULT_FILTERS[name]
+    return _session(Filter.from_dict(spec['filter']), spec['order'], spec['limit'], **allowed)
+
+
+def _checkpoint_upsert():
+    columns = DatabaseManager.CHECKPOINT_COLUMNS
+    updates = ', '.join(f"{column} = excluded.{column}" for column in columns[1:])
+    return f'''
+        INSERT INTO session_checkpoints ({', '.join(columns)})
+        VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT(session_id) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP
+    '''
+
+
+def _words(count):
+    return f'''
+        SELECT {DatabaseManager.WORD_COLUMNS}
+        FROM lemmas l
+        LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+        WHERE l.lemma_id IN ({','.join('?' * count)})
+    '''
+
+
+def _difficulty(group_by):
+    column, joins = DIFFICULTY_GROUPS[group_by]
+    return f'''
+        WITH grouped AS (
+            SELECT {column} AS name,
+                   COUNT(DISTINCT r.lemma_id) AS words,
+                   COUNT(*) AS reviews,
+                   AVG(r.familiarity = 1) AS failure_rate,
+                   AVG(r.familiarity) AS avg_answer
+            FROM review_log r
+            JOIN lemmas l ON l.lemma_id = r.lemma_id{joins}
+            GROUP BY name
+        )
+        SELECT *, RANK() OVER (ORDER BY failure_rate DESC) AS rank
+        FROM grouped
+        ORDER BY rank, name
+    '''
+
+
+STATEMENTS = {
+    # ==================== DATABASE MANAGER ====================
+    'db.get_all_vocabulary': Statement(f'''
+        SELECT {DatabaseManager.WORD_COLUMNS}
+        FROM lemmas l
+        LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+        ORDER BY l.frequency_rank
+    ''', scans={'lemmas'}),
+    'db.get_word': Statement(_words(1)),
+    'db.get_words': Statement(_words(2)),
+    'db.count_lemmas': Statement('SELECT COUNT(*) FROM lemmas', scans={'lemmas'}),
+    'db.lemma_id_range': Statement(
+        'SELECT (SELECT MIN(lemma_id) FROM lemmas), (SELECT MAX(lemma_id) FROM lemmas)'),
+    # COUNT(*) reads an index in full; it caps the sample at the deck size
+    'db.sample_lemma_ids.range': Statement('SELECT MIN(lemma_id), MAX(lemma_id), COUNT(*) FROM lemmas',
+                                           scans={'lemmas'}),
+    'db.sample_lemma_ids.lookup': Statement('SELECT lemma_id FROM lemmas WHERE lemma_id IN (?,?)'),
+    'db.get_lemma_variants': Statement('SELECT form, description FROM variants WHERE lemma_id = ?'),
+    'db.get_lemma_categories': Statement('''
+        SELECT c.name FROM categories c
+        JOIN lemma_categories lc ON c.category_id = lc.category_id
+        WHERE lc.lemma_id = ?
+    '''),
+    'db.get_lemma_translations': Statement('SELECT language, translation FROM translations WHERE lemma_id = ?'),
+    'db.get_lemma_id_by_rank': Statement('SELECT lemma_id FROM lemmas WHERE frequency_rank = ?'),
+    'db.get_audio_path': Statement('SELECT audio_path FROM lemmas WHERE lemma_id = ?'),
+    'db.set_audio_path': Statement('UPDATE lemmas SET audio_path = ? WHERE lemma_id = ?'),
+    'db.update_progress.read': Statement(
+        'SELECT familiarity, streak, easiness, next_review FROM user_progress WHERE lemma_id = ?'),
+    'db.update_progress.upsert': Statement('''
+        INSERT INTO user_progress
+        (lemma_id, familiarity, easiness, interval, last_reviewed, next_review, streak)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(lemma_id) DO UPDATE SET
+            familiarity = excluded.familiarity,
+            easiness = excluded.easiness,
+            interval = excluded.interval,
+            last_reviewed = excluded.last_reviewed,
+            next_review = excluded.next_review,
+            streak = excluded.streak
+    '''),
+    'db.update_progress.log': Statement(
+        'INSERT INTO review_log (lemma_id, day, familiarity, duration_ms) VALUES (?, ?, ?, ?)'),
+    'db.update_progress.history': Statement('''
+        INSERT INTO daily_review_stats (day, reviews, correct, lapses, new_cards, time_ms)
+        VALUES (?, 1, ?, ?, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            reviews = reviews + 1,
+            correct = correct + excluded.correct,
+            lapses = lapses + excluded.lapses,
+            new_cards = new_cards + excluded.new_cards,
+            time_ms = time_ms + excluded.time_ms
+    '''),
+    'db.get_review_history': Statement('''
+        SELECT day, reviews, correct, lapses, new_cards, time_ms FROM daily_review_stats
+        WHERE day BETWEEN ? AND ?
+        ORDER BY day
+    '''),
+    'db.get_vocabulary_stats': Statement('SELECT familiarity, count FROM stats_summary'),
+    'db.get_setting': Statement('SELECT value FROM user_settings WHERE key = ?'),
+    'db.save_setting': Statement('''
+        INSERT INTO user_settings (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    '''),
+    'db.get_setting_keys': Statement('SELECT key FROM user_settings WHERE key >= ? AND key < ? ORDER BY key'),
+    'db.save_checkpoint.clear': Statement('DELETE FROM session_checkpoints'),
+    'db.save_checkpoint.upsert': Statement(_checkpoint_upsert()),
+    'db.load_checkpoint': Statement(f'''
+        SELECT {', '.join(DatabaseManager.CHECKPOINT_COLUMNS)} FROM session_checkpoints
+        ORDER BY session_id DESC LIMIT 1
+    '''),
+    'db.delete_checkpoint': Statement('DELETE FROM session_checkpoints WHERE session_id = ?'),
+    # Recounting every lemma is the point of a rebuild
+    'db.rebuild_stats.clear': Statement('DELETE FROM stats_summary'),
+    'db.rebuild_stats.levels': Statement(
+        'INSERT INTO stats_summary (familiarity, count) VALUES (0, 0), (1, 0), (2, 0), (3, 0), (4, 0)'),
+    'db.rebuild_stats.count': Statement('''
+        UPDATE stats_summary SET count = (
+            SELECT COUNT(*) FROM lemmas l
+            LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+            WHERE CASE WHEN up.familiarity IN (1, 2, 3, 4) THEN up.familiarity ELSE 0 END
+                = stats_summary.familiarity
+        )
+    ''', scans={'lemmas'}),
+    'db.populate_sample_data.lemmas': Statement('''
+        INSERT INTO lemmas (lemma_id, lemma, part_of_speech, transliteration,
+                          english, register, notes, root, audio_path, frequency_rank)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''),
+    'db.populate_sample_data.variants': Statement(
+        'INSERT INTO variants (lemma_id, form, description) VALUES (?, ?, ?)'),
+    'db.populate_sample_data.categories': Statement('INSERT INTO categories (name) VALUES (?)'),
+    'db.populate_sample_data.lemma_categories': Statement(
+        'INSERT INTO lemma_categories (lemma_id, category_id) VALUES (?, ?)'),
+    'db.populate_sample_data.translations': Statement(
+        'INSERT INTO translations (lemma_id, language, translation) VALUES (?, ?, ?)'),
+    'db.populate_sample_data.progress': Statement('''
+        INSERT INTO user_progress
+        (lemma_id, familiarity, easiness, interval, last_reviewed, next_review, streak)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''),
+    'scheduler.due_counts': Statement('''
+        SELECT next_review, COUNT(*) FROM user_progress
+        WHERE next_review IS NOT NULL
+        GROUP BY next_review
+    '''),
+
+    # ==================== SESSIONS ====================
+    'session.rank_range': _session(Field('rank', 'between', (1, 50))),
+    'session.register': _session(Field('register', '=', 'biblical')),
+    'session.part_of_speech': _session(Field('part_of_speech', '=', 'verb')),
+    'session.root': _session(Field('root', '=', '')),
+    # The subquery finds the category's lemma_ids by index; only those are sorted by rank
+    'session.category': _session(Category(''), sorts=True),
+    'session.weakest': _session(Field('familiarity', 'between', (1, 4)), 'weakest', 20),
+    'session.strongest': _session(Field('familiarity', 'between', (1, 4)), 'strongest', 20),
+    'session.difficult': _session(Field('rank', '<=', 100) & (New() | Field('familiarity', 'in', (1, 2)))),
+    # Walks idx_lemmas_rank until LIMIT unstudied words are found
+    'session.new_words': _session(New(), limit=10, scans={'lemmas'}),
+    # Saved filters: their matches are few, so sorting them by due date or strength is cheap
+    'session.saved.biblical_verbs_due': _saved_filter('Biblical Verbs Due (Top 500)', sorts=True),
+    'session.saved.weak_nouns': _saved_filter('Weak Nouns (Top 1000)', sorts=True),
+    'session.resumed.weak_nouns': _session(
+        Filter.from_dict(DEFAULT_FILTERS['Weak Nouns (Top 1000)']['filter'])
+        & Not(Field('lemma_id', 'in', (1, 2))), 'weakest', 20, sorts=True),
+
+    # ==================== DAILY QUEUE ====================
+    'daily_queue.exists': Statement('SELECT 1 FROM daily_counters WHERE day = ?'),
+    'daily_queue.expire': Statement('DELETE FROM daily_queue WHERE day < ?'),
+    'daily_queue.expire_counters': Statement('DELETE FROM daily_counters WHERE day < ?'),
+    'daily_queue.reviews': Statement('''
+        INSERT INTO daily_queue (day, lemma_id, position, kind)
+        SELECT ?, lemma_id, ROW_NUMBER() OVER (ORDER BY next_review, lemma_id) - 1, 'review'
+        FROM user_progress
+        WHERE next_review <= ?
+        ORDER BY next_review, lemma_id
+        LIMIT ?
+    '''),
+    # Walks idx_lemmas_rank until the day's new-card quota is filled
+    'daily_queue.new_cards': Statement(f'''
+        INSERT OR IGNORE INTO daily_queue (day, lemma_id, position, kind)
+        SELECT ?, l.lemma_id, ? + ROW_NUMBER() OVER (ORDER BY l.frequency_rank) - 1, 'new'
+        FROM lemmas l
+        LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+        WHERE {New().compile()[0]}
+        ORDER BY l.frequency_rank
+        LIMIT ?
+    ''', scans={'lemmas'}),
+    'daily_queue.counters': Statement(
+        'INSERT INTO daily_counters (day, reviews_total, new_total) VALUES (?, ?, ?)'),
+    'daily_queue.remaining': Statement('''
+        SELECT lemma_id FROM daily_queue
+        WHERE day = ? AND done = 0
+        ORDER BY position
+        LIMIT ?
+    '''),
+    'daily_queue.upcoming_reviews': Statement('''
+        SELECT lemma_id FROM user_progress
+        WHERE next_review <= ?
+        ORDER BY next_review, lemma_id
+        LIMIT ?
+    '''),
+    'daily_queue.counts': Statement('SELECT * FROM daily_counters WHERE day = ?'),
+    'daily_queue.mark_done': Statement('''
+        UPDATE daily_queue SET done = 1
+        WHERE day = ? AND lemma_id = ? AND done = 0
+        RETURNING kind
+    '''),
+    'daily_queue.count_review': Statement(
+        'UPDATE daily_counters SET reviews_done = reviews_done + 1 WHERE day = ?'),
+    'daily_queue.count_new': Statement('UPDATE daily_counters SET new_done = new_done + 1 WHERE day = ?'),
+
+    # ==================== IN-MEMORY INDEXES (built from one full read) ====================
+    'bitmap_index.rows': Statement('''
+        SELECT l.lemma_id, l.frequency_rank, l.register, l.part_of_speech,
+               up.familiarity, up.next_review
+        FROM lemmas l
+        LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+        ORDER BY l.frequency_rank
+    ''', scans={'lemmas'}),
+    'bitmap_index.categories': Statement('''
+        SELECT c.name, lc.lemma_id FROM lemma_categories lc
+        JOIN categories c ON lc.category_id = c.category_id
+    '''),
+    'weighted_sampler.rows': Statement('''
+        SELECT l.lemma_id, up.familiarity, up.easiness, up.streak, up.next_review
+        FROM lemmas l
+        LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+    ''', scans={'lemmas'}),
+
+    # ==================== AUDIO PACK (playback lookups; the rest are batch commands) ====================
+    'audio_pack.read': Statement('SELECT offset, length, format FROM audio_pack WHERE lemma_id = ?'),
+    'audio_pack.find_clip': Statement('SELECT offset FROM audio_pack WHERE sha256 = ? LIMIT 1'),
+    'audio_pack.add': Statement('''
+        INSERT OR REPLACE INTO audio_pack (lemma_id, offset, length, format, sha256)
+        VALUES (?, ?, ?, ?, ?)
+    '''),
+    'audio_pack.reset': Statement('DELETE FROM audio_pack'),
+    'audio_pack.cached_clips': Statement('SELECT lemma_id, audio_path FROM lemmas WHERE audio_path IS NOT NULL',
+                                         scans={'lemmas'}),
+    'audio_pack.count': Statement('SELECT COUNT(*) FROM audio_pack', scans={'audio_pack'}),
+    'audio_pack.live_bytes': Statement(
+        'SELECT COALESCE(SUM(length), 0) FROM (SELECT DISTINCT offset, length FROM audio_pack)',
+        scans={'audio_pack'}),
+    'audio_pack.in_file_order': Statement('SELECT lemma_id, offset, length FROM audio_pack ORDER BY offset',
+                                          scans={'audio_pack'}),
+    'audio_pack.move': Statement('UPDATE audio_pack SET offset = ? WHERE lemma_id = ?'),
+    'audio_pack.drop': Statement('DELETE FROM audio_pack WHERE lemma_id = ?'),
+
+    # ==================== ANALYTICS (reports over the whole review log) ====================
+    'analytics.retention': Statement(ANSWERS_CTE + f'''
+        SELECT {_bucket_case()} AS bucket, COUNT(*) AS reviews, AVG(familiarity >= 3) AS retention
+        FROM answers
+        WHERE gap IS NOT NULL
+        GROUP BY bucket
+        ORDER BY bucket
+    ''', scans={'review_log'}),
+    'analytics.lapses': Statement(ANSWERS_CTE + '''
+        SELECT a.lemma_id, l.lemma, l.english,
+               COUNT(*) AS reviews,
+               SUM(a.familiarity = 1) AS failures,
+               SUM(a.familiarity = 1 AND a.previous >= 3) AS lapses,
+               MAX(a.day) AS last_day
+        FROM answers a
+        JOIN lemmas l ON l.lemma_id = a.lemma_id
+        GROUP BY a.lemma_id
+        HAVING failures >= ?
+        ORDER BY failures DESC, lapses DESC, l.frequency_rank
+        LIMIT ?
+    ''', scans={'review_log'}, sorts=True),
+    'analytics.difficulty.part_of_speech': Statement(_difficulty('part_of_speech'),
+                                                     scans={'review_log', 'lemmas'}, sorts=True),
+    'analytics.difficulty.category': Statement(_difficulty('category'),
+                                               scans={'review_log', 'lemma_categories'}, sorts=True),
+}
+
+
+def checked(sql):
+    """Whether a statement of this kind has to be registered"""
+    return sql.lstrip().upper().startswith(CHECKED_KINDS)
+
+
+def unregistered(statements):
+    """Normalized statements (from any iterable of SQL) that have no registry entry"""
+    registered = {statement.key for statement in STATEMENTS.values()}
+    return sorted({normalize_sql(sql) for sql in statements if checked(sql)} - registered)
+
+
+def table_aliases(sql):
+    """{name in plan output: table} for the tables and aliases a statement names"""
+    aliases = {}
+    for table, alias in _TABLES.findall(_STRINGS.sub("''", sql)):
+        aliases[table] = table
+        if alias and alias.upper() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def explain(connection, sql):
+    """EXPLAIN QUERY PLAN detail lines, with NULL bound to every parameter"""
+    params = (None,) * _STRINGS.sub("''", sql).count('?')
+    return [row[3] for row in connection.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def plan_problems(connection, statement):
+    """Plan lines that scan a large table or sort for ORDER BY without the entry allowing it"""
+    aliases = table_aliases(statement.sql)
+    problems = []
+    for detail in explain(connection, statement.sql):
+        match = _SCAN.match(detail)
+        if match:
+            table = aliases.get(match[1], match[1])
+            if table in LARGE_TABLES and table not in statement.scans:
+                problems.append(f"full scan of {table}: {detail}")
+        elif _ORDER_BY_SORT.match(detail) and not statement.sorts:
+            problems.append(f"sort for ORDER BY: {detail}")
+    return problems
+
+
+def check_plans(connection, statements=None):
+    """{name: problems} for the registered statements whose plans break their allowances"""
+    statements = STATEMENTS if statements is None else statements
+    failures = {}
+    for name, statement in statements.items():
+        problems = plan_problems(connection, statement)
+        if problems:
+            failures[name] = problems
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the query plan of every registered statement")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--size', type=int, default=100000, help='synthetic deck size in lemmas')
+    source.add_argument('--db', type=Path, help='check against a copy of this database instead')
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / 'plans.db'
+        shutil.copyfile(args.db or cached_deck(args.size), path)
+        DatabaseManager(path).close()  # Bring older databases up to the current schema and indexes
+        connection = sqlite3.connect(path)
+        try:
+            if args.verbose:
+                for name, statement in STATEMENTS.items():
+                    print(name)
+                    for detail in explain(connection, statement.sql):
+                        print(f"    {detail}")
+            failures = check_plans(connection)
+        finally:
+            connection.close()
+    for name, problems in failures.items():
+        for problem in problems:
+            print(f"{name}: {problem}")
+    print(f"{len(failures)} of {len(STATEMENTS)} statement(s) with unexpected plans")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Query Trace
+Opt-in per-statement timing for the SQLite connection
+Cursor calls are timed (execute plus fetches) and aggregated by normalized SQL,
+so repeated statements with different values - an N+1 loop - collapse into one
+row with a high count. SQLite's trace callback also counts every statement the
+engine runs: each trigger body it fires is reported as another run of the firing
+statement, and implicit BEGIN/COMMITs never pass through a cursor at all.
+"""
+
+import json
+import re
+import sqlite3
+import time
+
+# Numbers take a unary minus, and NULL counts as a value except after IS/NOT, so
+# the trace callback's SQL (parameters expanded, e.g. LIMIT -1) keys like the cursor's
+_LITERALS = re.compile(
+    r"'(?:[^']|'')*'|(?<![\w.)])-?\b\d+(?:\.\d+)?\b|(?<!IS )(?<!NOT )\bNULL\b", re.IGNORECASE
+)
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Statement text with literals as ?, IN lists collapsed and whitespace squeezed"""
+    sql = _SPACE.sub(' ', _LITERALS.sub('?', sql)).strip()
+    return _IN_LISTS.sub('(?, ...)', sql)
+
+
+class QueryTracer:
+    """Per-statement counts, total and max latency, and rows returned"""
+    
+    def __init__(self):
+        self.statements = {}  # normalized sql -> [calls, total seconds, max seconds, rows]
+        self.traced = {}      # normalized sql -> times SQLite ran it (once more per trigger body fired)
+    
+    def entry(self, sql):
+        key = normalize_sql(sql)
+        entry = self.statements.get(key)
+        if entry is None:
+            entry = self.statements[key] = [0, 0.0, 0.0, 0]
+        entry[0] += 1
+        return entry
+    
+    def trace(self, statement):
+        """sqlite3 trace callback"""
+        key = normalize_sql(statement)
+        self.traced[key] = self.traced.get(key, 0) + 1
+    
+    def reset(self):
+        self.statements.clear()
+        self.traced.clear()
+    
+    def report(self):
+        """Statements as dicts, slowest total first (engine_runs above calls means triggers fired)"""
+        rows = [
+            {'sql': sql, 'calls': calls, 'total_ms': total * 1000, 'max_ms': longest * 1000,
+             'mean_ms': total * 1000 / calls, 'rows': rows, 'engine_runs': self.traced.get(sql, 0)}
+            for sql, (calls, total, longest, rows) in self.statements.items()
+        ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+    
+    def engine_only(self):
+        """Statements SQLite ran that no cursor issued (implicit transactions), most frequent first"""
+        return sorted(
+            ((sql, count) for sql, count in self.traced.items() if sql not in self.statements),
+            key=lambda item: item[1], reverse=True,
+        )
+    
+    def format_report(self, limit=20):
+        lines = [f"{'calls':>7s} {'runs':>7s} {'total ms':>10s} {'max ms':>9s} {'rows':>8s}  statement"]
+        for row in self.report()[:limit]:
+            lines.append(f"{row['calls']:7d} {row['engine_runs']:7d} {row['total_ms']:10.2f} "
+                         f"{row['max_ms']:9.2f} {row['rows']:8d}  {row['sql'][:120]}")
+        engine = self.engine_only()[:limit]
+        if engine:
+            lines.append("\nRun by SQLite only:")
+            lines.extend(f"{count:7d}  {sql[:120]}" for sql, count in engine)
+        return '\n'.join(lines)
+    
+    def dump(self, path):
+        """Write the report as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'statements': self.report(), 'engine_only': self.engine_only()}, f,
+                      ensure_ascii=False, indent=2)
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor that charges execute and fetch time and fetched rows to its statement"""
+    
+    def _run(self, method, sql, *args):
+        start = time.perf_counter()
+        result = method(sql, *args)
+        self._entry = self.connection.tracer.entry(sql)
+        self._elapsed = 0.0
+        self._charge(time.perf_counter() - start, 0)
+        return result
+    
+    def _charge(self, seconds, rows):
+        """Add time and rows to the current statement; max latency covers execute plus fetches"""
+        entry = getattr(self, '_entry', None)
+        if entry is None:
+            return
+        self._elapsed += seconds
+        entry[1] += seconds
+        entry[2] = max(entry[2], self._elapsed)
+        entry[3] += rows
+    
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+    
+    def executescript(self, sql_script):
+        return self._run(super().executescript, sql_script)
+    
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        rows = len(result) if isinstance(result, list) else int(result is not None)
+        self._charge(time.perf_counter() - start, rows)
+        return result
+    
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+    
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+    
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+    
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()  # StopIteration passes straight through
+        self._charge(time.perf_counter() - start, 1)
+        return row
+
+
+class TracingConnection(sqlite3.Connection):
+    """Connection whose cursors (and execute shortcuts) report to `self.tracer`
+    
+    Use as sqlite3.connect(path, factory=TracingConnection).
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tracer = QueryTracer()
+        self.set_trace_callback(self.tracer.trace)
+    
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+    
+    # The shortcuts would otherwise run on an untraced internal cursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
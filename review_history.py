@@ -0,0 +1,75 @@
+"""
+Review History
+Shapes the per-day review aggregates for the heatmap and trend views
+A year of history is one primary-key range read of at most 365 rows
+"""
+
+from config import Config
+from scheduler import day_to_date
+
+HEAT_LEVELS = 4  # Colour steps above "no reviews"
+
+
+def load_history(db, today, days=None):
+    """{day: aggregates} for the last `days` study days, ending today"""
+    days = days or Config.HEATMAP_DAYS
+    return {row['day']: row for row in db.get_review_history(today - days + 1, today)}
+
+
+def retention(row):
+    """Share of answers recalled (good/easy), or None without reviews"""
+    return row['correct'] / row['reviews'] if row and row['reviews'] else None
+
+
+def heatmap_weeks(history, today, days=None):
+    """Calendar columns for the heatmap: weeks of seven (day, reviews, level) cells
+    
+    Weeks run Monday to Sunday; cells outside the range are None. Levels scale
+    review counts to 0..HEAT_LEVELS against the busiest day.
+    """
+    days = days or Config.HEATMAP_DAYS
+    first = today - days + 1
+    first -= day_to_date(first).weekday()  # Back to Monday
+    busiest = max((row['reviews'] for row in history.values()), default=0)
+    weeks = []
+    for week_start in range(first, today + 1, 7):
+        week = []
+        for day in range(week_start, week_start + 7):
+            if day > today or day <= today - days:
+                week.append(None)
+                continue
+            reviews = history[day]['reviews'] if day in history else 0
+            level = -(-reviews * HEAT_LEVELS // busiest) if busiest else 0  # Ceiling division
+            week.append((day, reviews, level))
+        weeks.append(week)
+    return weeks
+
+
+def trend(history, today, days=30):
+    """[(day, reviews, retention, minutes)] for each of the last `days` days"""
+    result = []
+    for day in range(today - days + 1, today + 1):
+        row = history.get(day)
+        reviews = row['reviews'] if row else 0
+        minutes = row['time_ms'] / 60000 if row else 0.0
+        result.append((day, reviews, retention(row), minutes))
+    return result
+
+
+def summary(history, today):
+    """Totals over the loaded history plus the current daily streak"""
+    reviews = sum(row['reviews'] for row in history.values())
+    correct = sum(row['correct'] for row in history.values())
+    streak = 0
+    day = today if today in history else today - 1  # Today may not be studied yet
+    while day in history and history[day]['reviews']:
+        streak += 1
+        day -= 1
+    return {
+        'days_studied': sum(1 for row in history.values() if row['reviews']),
+        'reviews': reviews,
+        'retention': correct / reviews if reviews else None,
+        'new_cards': sum(row['new_cards'] for row in history.values()),
+        'minutes': sum(row['time_ms'] for row in history.values()) / 60000,
+        'streak': streak,
+    }
@@ -0,0 +1,91 @@
+"""
+Review Scheduling
+Study-day numbering and due-date load balancing
+Scheduling columns store integer day numbers (days since 1970-01-01)
+"""
+
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from config import Config
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(moment=None):
+    """Study-day number for a moment, honouring the rollover hour and timezone"""
+    tz = ZoneInfo(Config.TIMEZONE) if Config.TIMEZONE else None
+    if moment is None:
+        moment = datetime.now(tz)
+    elif tz is not None and moment.tzinfo is not None:
+        moment = moment.astimezone(tz)
+    study_date = (moment - timedelta(hours=Config.DAY_ROLLOVER_HOUR)).date()
+    return (study_date - EPOCH).days
+
+
+def date_to_day(value):
+    """Convert a date to its day number"""
+    return (value - EPOCH).days
+
+
+def day_to_date(day):
+    """Convert a day number back to a date (for display)"""
+    return EPOCH + timedelta(days=day)
+
+
+class DueLoadBalancer:
+    """Picks the least-loaded due date using a per-day due-count histogram"""
+    
+    # Intervals shorter than this are never moved (learning / next-day cards)
+    MIN_FUZZ_INTERVAL = 3
+    # Window half-width as a fraction of the interval (at least one day)
+    FUZZ_FACTOR = 0.1
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.due_counts = None  # {day number: cards due}, built on first use
+    
+    def _load(self):
+        """Build the histogram once with a single grouped query"""
+        cursor = self.connection.cursor()
+        cursor.execute('''
+            SELECT next_review, COUNT(*) FROM user_progress
+            WHERE next_review IS NOT NULL
+            GROUP BY next_review
+        ''')
+        self.due_counts = dict(cursor.fetchall())
+    
+    def fuzz_days(self, interval):
+        """Half-width of the tolerance window for an interval"""
+        if interval < self.MIN_FUZZ_INTERVAL:
+            return 0
+        return max(1, round(interval * self.FUZZ_FACTOR))
+    
+    def pick_due_date(self, today, interval):
+        """Return the day within the window that has the fewest reviews - O(window)"""
+        if self.due_counts is None:
+            self._load()
+        
+        fuzz = self.fuzz_days(interval)
+        target = today + interval
+        if fuzz == 0:
+            return target
+        
+        # Prefer the emptiest day, then the one closest to the nominal interval
+        return min(
+            range(target - fuzz, target + fuzz + 1),
+            key=lambda day: (self.due_counts.get(day, 0), abs(day - target), day)
+        )
+    
+    def move(self, old_due, new_due):
+        """Keep the histogram current after a card is rescheduled"""
+        if self.due_counts is None:
+            return  # Not built yet - the first lookup will read the current state
+        if old_due is not None:
+            remaining = self.due_counts.get(old_due, 0) - 1
+            if remaining > 0:
+                self.due_counts[old_due] = remaining
+            else:
+                self.due_counts.pop(old_due, None)
+        if new_due is not None:
+            self.due_counts[new_due] = self.due_counts.get(new_due, 0) + 1
@@ -0,0 +1,286 @@
+"""
+Session Filters
+Composable filter expressions for study sessions (and / or / not over word fields)
+Filters compile once into indexed SQL and can be saved to user_settings as JSON
+"""
+
+import json
+
+from scheduler import day_number
+
+# Vocabulary fields that filters may use, mapped to their SQL columns
+# (aliases: l = lemmas, up = user_progress)
+FIELD_COLUMNS = {
+    'lemma_id': 'l.lemma_id',
+    'rank': 'l.frequency_rank',
+    'register': 'l.register',
+    'part_of_speech': 'l.part_of_speech',
+    'root': 'l.root',
+    'familiarity': 'up.familiarity',
+    'easiness': 'up.easiness',
+    'streak': 'up.streak',
+    'next_review': 'up.next_review',
+}
+
+# Session orderings, chosen so the common ones are served by an index
+ORDERINGS = {
+    'rank': 'l.frequency_rank',
+    'due': 'up.next_review',
+    'weakest': 'up.familiarity ASC, up.easiness ASC',
+    'strongest': 'up.familiarity DESC, up.easiness DESC',
+}
+
+# Fields whose values change as words are studied
+PROGRESS_FIELDS = ('familiarity', 'easiness', 'streak', 'next_review')
+
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'in', 'between')
+
+SAVED_FILTER_PREFIX = 'filter:'
+
+
+class Filter:
+    """Base class for filter expressions - combine with &, | and ~"""
+    
+    def __and__(self, other):
+        return And(self, other)
+    
+    def __or__(self, other):
+        return Or(self, other)
+    
+    def __invert__(self):
+        return Not(self)
+    
+    def compile(self):
+        """Return (sql_where_clause, params)"""
+        raise NotImplementedError
+    
+    def to_dict(self):
+        """Return a JSON-serializable description"""
+        raise NotImplementedError
+    
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+    
+    @staticmethod
+    def from_dict(data):
+        """Rebuild a filter from to_dict() output"""
+        if 'and' in data:
+            return And(*[Filter.from_dict(d) for d in data['and']])
+        if 'or' in data:
+            return Or(*[Filter.from_dict(d) for d in data['or']])
+        if 'not' in data:
+            return Not(Filter.from_dict(data['not']))
+        if 'category' in data:
+            return Category(data['category'])
+        if 'due' in data:
+            return Due(data['due'])
+        if 'new' in data:
+            return New()
+        if 'all' in data:
+            return All()
+        value = data['value']
+        if data['op'] in ('in', 'between'):
+            value = tuple(value)
+        return Field(data['field'], data['op'], value)
+    
+    @staticmethod
+    def from_json(text):
+        return Filter.from_dict(json.loads(text))
+    
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_json()})"
+
+
+class Field(Filter):
+    """Compare a word field: Field('register', '=', 'biblical'), Field('rank', 'between', (1, 500))"""
+    
+    def __init__(self, field, op, value):
+        if field not in FIELD_COLUMNS:
+            raise ValueError(f"Cannot filter sessions by field: {field}")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown filter operator: {op}")
+        self.field = field
+        self.op = op
+        self.value = value
+    
+    def compile(self):
+        column = FIELD_COLUMNS[self.field]
+        if self.op == 'in':
+            placeholders = ','.join('?' * len(self.value))
+            return f"{column} IN ({placeholders})", tuple(self.value)
+        if self.op == 'between':
+            return f"{column} BETWEEN ? AND ?", tuple(self.value)
+        return f"{column} {self.op} ?", (self.value,)
+    
+    def to_dict(self):
+        value = list(self.value) if self.op in ('in', 'between') else self.value
+        return {'field': self.field, 'op': self.op, 'value': value}
+
+
+class Category(Filter):
+    """Words in a named category"""
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def compile(self):
+        return '''l.lemma_id IN (
+            SELECT lc.lemma_id FROM lemma_categories lc
+            JOIN categories c ON lc.category_id = c.category_id
+            WHERE c.name = ?
+        )''', (self.name,)
+    
+    def to_dict(self):
+        return {'category': self.name}
+
+
+class Due(Filter):
+    """Words due for review today (or within `days_ahead` days)"""
+    
+    def __init__(self, days_ahead=0):
+        self.days_ahead = days_ahead
+    
+    def compile(self):
+        # "Today" is resolved at compile time so saved filters stay current
+        return 'up.next_review <= ?', (day_number() + self.days_ahead,)
+    
+    def to_dict(self):
+        return {'due': self.days_ahead}
+
+
+class New(Filter):
+    """Words never studied"""
+    
+    def compile(self):
+        return '(up.familiarity IS NULL OR up.familiarity = 0)', ()
+    
+    def to_dict(self):
+        return {'new': True}
+
+
+class All(Filter):
+    """Every word"""
+    
+    def compile(self):
+        return '1', ()
+    
+    def to_dict(self):
+        return {'all': True}
+
+
+class And(Filter):
+    """All sub-filters must match"""
+    
+    KEYWORD = 'and'
+    EMPTY = '1'  # An empty conjunction matches everything
+    
+    def __init__(self, *children):
+        self.children = children
+    
+    def compile(self):
+        parts = [child.compile() for child in self.children]
+        sql = f" {self.KEYWORD.upper()} ".join(f"({clause})" for clause, _ in parts)
+        params = tuple(p for _, child_params in parts for p in child_params)
+        return sql or self.EMPTY, params
+    
+    def to_dict(self):
+        return {self.KEYWORD: [child.to_dict() for child in self.children]}
+
+
+class Or(And):
+    """Any sub-filter may match"""
+    
+    KEYWORD = 'or'
+    EMPTY = '0'  # ...and an empty disjunction matches nothing
+
+
+class Not(Filter):
+    """Negate a filter (unstudied words count as not matching progress fields)"""
+    
+    def __init__(self, child):
+        self.child = child
+    
+    def compile(self):
+        clause, params = self.child.compile()
+        # IFNULL keeps words without progress: NOT (NULL = 1) would drop them
+        return f"NOT IFNULL(({clause}), 0)", params
+    
+    def to_dict(self):
+        return {'not': self.child.to_dict()}
+
+
+def uses_progress(data):
+    """True if a filter (or its to_dict() form) depends on study progress"""
+    if isinstance(data, Filter):
+        data = data.to_dict()
+    if 'due' in data or 'new' in data or data.get('field') in PROGRESS_FIELDS:
+        return True
+    children = data.get('and') or data.get('or') or ([data['not']] if 'not' in data else [])
+    return any(uses_progress(child) for child in children)
+
+
+# ==================== SAVED FILTERS ====================
+
+# Built-in filters offered alongside the user's own
+DEFAULT_FILTERS = {
+    'Biblical Verbs Due (Top 500)': {
+        'filter': {'and': [
+            {'field': 'register', 'op': 'in', 'value': ['biblical', 'both']},
+            {'field': 'part_of_speech', 'op': '=', 'value': 'verb'},
+            {'field': 'rank', 'op': '<=', 'value': 500},
+            {'due': 0},
+        ]},
+        'order': 'due',
+        'limit': None,
+    },
+    'Weak Nouns (Top 1000)': {
+        'filter': {'and': [
+            {'field': 'part_of_speech', 'op': '=', 'value': 'noun'},
+            {'field': 'rank', 'op': '<=', 'value': 1000},
+            {'field': 'familiarity', 'op': 'in', 'value': [1, 2]},
+        ]},
+        'order': 'weakest',
+        'limit': 20,
+    },
+}
+
+
+def save_filter(db, name, flt, order='rank', limit=None):
+    """Store a named filter in user_settings"""
+    if order not in ORDERINGS:
+        raise ValueError(f"Unknown session ordering: {order}")
+    spec = {'filter': flt.to_dict(), 'order': order, 'limit': limit}
+    db.save_setting(SAVED_FILTER_PREFIX + name, json.dumps(spec, ensure_ascii=False))
+
+
+def load_filter(db, name):
+    """Return (filter, order, limit) for a saved or built-in filter, or None if missing or invalid"""
+    stored = db.get_setting(SAVED_FILTER_PREFIX + name)
+    try:
+        spec = json.loads(stored) if stored else DEFAULT_FILTERS.get(name)
+        if spec is None:
+            return None
+        flt = Filter.from_dict(spec['filter'])
+        order = spec.get('order', 'rank')
+        limit = spec.get('limit')
+        if order not in ORDERINGS:
+            raise ValueError(f"Unknown session ordering: {order}")
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError(f"Invalid session limit: {limit}")
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"Ignoring invalid saved filter '{name}': {e}")
+        return None
+    return flt, order, limit
+
+
+def list_saved_filters(db):
+    """Names of built-in and user-saved filters"""
+    names = list(DEFAULT_FILTERS)
+    for key in db.get_setting_keys(SAVED_FILTER_PREFIX):
+        name = key[len(SAVED_FILTER_PREFIX):]
+        if name not in names:
+            names.append(name)
+    return names
@@ -1,62 +1,256 @@
 """
 Session Manager
 Handles study session logic and word selection
+Each study mode is a session filter compiled to an indexed SQL query
 """
 
+import json
 import random
-from datetime import date
+import time
+from array import array
+from collections import deque
+
+from config import Config
+from daily_queue import DailyQueue
+from learning_queue import LearningQueue
+from permutation import ShuffledRange
+from weighted_sampler import WeaknessSampler
+from session_filters import (
+    Filter, Field, Category, New, All, Not, ORDERINGS, load_filter, uses_progress
+)
+
+class LazyWordList:
+    """Session cards fetched on demand, optionally in a seeded shuffled order
+    
+    Holds only lemma_ids (a compact array, or a range for whole-deck sessions), so
+    starting a shuffled million-word session allocates no per-word objects. Positions
+    whose lemma no longer exists (gaps in a lemma_id range) read as None.
+    """
+    
+    def __init__(self, lemma_ids, fetch_word, order=None):
+        self.lemma_ids = lemma_ids
+        self.fetch_word = fetch_word
+        self.order = order  # ShuffledRange over positions, or None for query order
+    
+    def __len__(self):
+        return len(self.lemma_ids)
+    
+    def lemma_id_at(self, position):
+        if self.order is not None:
+            position = self.order[position]
+        return self.lemma_ids[position]
+    
+    def __getitem__(self, position):
+        return self.fetch_word(self.lemma_id_at(position))
+    
+    def __iter__(self):
+        for position in range(len(self)):
+            word = self[position]
+            if word is not None:
+                yield word
 
 
 class SessionManager:
     """Manages learning sessions with multiple study modes"""
     
-    def __init__(self, vocabulary, progress, db=None):
-        self.vocabulary = vocabulary
-        self.progress = progress
+    def __init__(self, db=None):
         self.db = db
         self.current_words = []
         self.current_index = 0
         self.current_word = None
         self.session_stats = {'correct': 0, 'incorrect': 0, 'total': 0}
         self.session_mode = None
+        self.session_seed = None
+        self.bitmap_index = None
+        self.weakness_sampler = None
+        self.session_spec = None  # How to rebuild the current session; None if it cannot be resumed
+        self.checkpoint_id = None
+        self.requery_on_resume = False
+        self.daily_queue = None
+        if db:
+            self.daily_queue = DailyQueue(db)
+            db.add_progress_listener(self.daily_queue.update_progress)
+        self._reset_queues()
+    
+    def attach_bitmap_index(self, index):
+        """Use an in-memory bitmap index for filters it can evaluate, kept current by progress updates"""
+        self.bitmap_index = index
+        if self.db:
+            self.db.add_progress_listener(index.update_progress)
     
     # ==================== CORE SESSION STARTER ====================
     
-    def _start_session(self, words, label, shuffle=True):
-        """Start a session with given words"""
-        self.session_mode = label
-        self.current_words = words
+    def _start_session(self, lemma_ids, label, shuffle=True, seed=None):
+        """Start a session over lemma_ids; shuffled sessions walk a seeded permutation lazily"""
+        if not isinstance(lemma_ids, (range, array)):
+            lemma_ids = array('q', lemma_ids)
+        order = None
         if shuffle:
-            random.shuffle(self.current_words)
+            self.session_seed = seed if seed is not None else random.getrandbits(32)
+            order = ShuffledRange(len(lemma_ids), self.session_seed)
+        else:
+            self.session_seed = None
+        self.session_spec = None
+        self.checkpoint_id = None
+        self.session_mode = label
+        self.current_words = LazyWordList(lemma_ids, self.db.get_word, order)
         self.current_index = 0
+        self.current_word = None
         self.session_stats = {'correct': 0, 'incorrect': 0, 'total': 0}
+        self._reset_queues()
         return len(self.current_words)
     
+    def _reset_queues(self):
+        """Clear the learning heap and interleaving state for a new session"""
+        self.learning = LearningQueue(Config.LEARNING_STEPS)
+        self.buffered = {'new': deque(), 'review': deque()}  # Scanned ahead, not yet shown
+        self.mix_credit = {kind: 0 for kind in Config.SESSION_MIX}
+        self.current_step = None  # Learning step of the card on screen (None if from the main queue)
+        self.showing = False
+        self.shown_at = None
+        self.cards_shown = 0
+        self.repeats = 0
+        self.answered = []  # lemma_ids answered this session, checkpointed for re-queried sessions
+    
+    def start_filter_session(self, flt, label=None, order='rank', limit=None, shuffle=True, seed=None):
+        """Start a session from a filter expression, compiled once into SQL
+        
+        Pass the previous `session_seed` to reproduce a shuffled order when resuming.
+        """
+        if not self.db:
+            return 0
+        if order not in ORDERINGS:
+            raise ValueError(f"Unknown session ordering: {order}")
+        lemma_ids = None
+        if isinstance(flt, All) and limit is None and shuffle:
+            # Whole deck: permute the id range directly - no query, constant memory
+            lemma_ids = self.db.lemma_id_range()
+        elif self.bitmap_index is not None and order in ('rank', 'due'):
+            # Bitmap ordinals are in rank order; due order sorts only the matches by next_review
+            bits = self.bitmap_index.evaluate(flt)
+            if bits is not None and order == 'rank':
+                lemma_ids = self.bitmap_index.lemma_ids_for(bits, limit)
+            elif bits is not None:
+                lemma_ids = self.bitmap_index.lemma_ids_by_due(bits, limit)
+        if lemma_ids is None:
+            where, params = flt.compile()
+            lemma_ids = self.db.select_lemma_ids(where, params, ORDERINGS[order], limit)
+        count = self._start_session(lemma_ids, label or "Custom Filter", shuffle, seed)
+        self.session_spec = {
+            'mode': self.session_mode, 'filter': flt.to_json(), 'ordering': order,
+            'row_limit': limit, 'shuffle': int(shuffle), 'seed': self.session_seed,
+        }
+        # Answering reorders or removes the words of progress-dependent sessions
+        self.requery_on_resume = uses_progress(flt) or order != 'rank'
+        return count
+    
+    # ==================== CHECKPOINTS ====================
+    
+    def checkpoint(self):
+        """Save the session position with one small UPSERT (a no-op for random sessions)"""
+        if not self.db or self.session_spec is None:
+            return
+        if self.is_complete():
+            if self.checkpoint_id is not None:
+                self.db.delete_checkpoint(self.checkpoint_id)
+                self.checkpoint_id = None
+            return
+        # Only cards scanned ahead or waiting in learning are listed - never the session itself
+        pending = {
+            'new': [word['lemma_id'] for word in self.buffered['new']],
+            'review': [word['lemma_id'] for word in self.buffered['review']],
+            'learning': self.learning.snapshot(),
+            'mix': self.mix_credit,
+        }
+        if self.requery_on_resume:
+            pending['answered'] = self.answered
+        self.checkpoint_id = self.db.save_checkpoint(dict(
+            self.session_spec, session_id=self.checkpoint_id, position=self.current_index,
+            cards_shown=self.cards_shown, repeats=self.repeats, pending=json.dumps(pending),
+            **self.session_stats
+        ))
+    
+    def get_resumable_session(self):
+        """The last unfinished session's checkpoint, or None"""
+        return self.db.load_checkpoint() if self.db else None
+    
+    def resume_session(self, checkpoint=None):
+        """Rebuild the last checkpointed session from its filter and seed
+        
+        Sessions over fixed word sets continue at the saved position. Sessions whose
+        words depend on progress (due, new, weakest...) cannot, since answering reorders
+        or removes their words: they are re-queried without the words already answered.
+        Cards waiting in learning come back in both cases.
+        """
+        checkpoint = checkpoint or self.get_resumable_session()
+        if checkpoint is None:
+            return 0
+        flt = Filter.from_json(checkpoint['filter'])
+        pending = json.loads(checkpoint['pending'] or '{}')
+        answered = pending.get('answered', [])
+        query, limit = flt, checkpoint['row_limit']
+        if answered:
+            query = flt & Not(Field('lemma_id', 'in', tuple(answered)))
+            if limit is not None:
+                limit = max(limit - len(answered), 0)
+        self.start_filter_session(
+            query, checkpoint['mode'], checkpoint['ordering'], limit,
+            bool(checkpoint['shuffle']), checkpoint['seed']
+        )
+        self.session_spec = {key: checkpoint[key] for key in self.session_spec}  # Keep the original spec
+        self.checkpoint_id = checkpoint['session_id']
+        self.session_stats = {key: checkpoint[key] for key in ('correct', 'incorrect', 'total')}
+        self.cards_shown = checkpoint['cards_shown']
+        self.repeats = checkpoint['repeats']
+        self.answered = answered
+        self.mix_credit.update(pending.get('mix', {}))
+        if not self.requery_on_resume:
+            # Re-queried sessions list their unseen buffered cards again by themselves
+            self.current_index = checkpoint['position']
+            for kind in self.buffered:
+                self.buffered[kind].extend(self.db.get_words(pending.get(kind, [])))
+        learning = pending.get('learning', [])
+        words = {word['lemma_id']: word for word in self.db.get_words([entry[0] for entry in learning])}
+        for lemma_id, step, due in learning:
+            if lemma_id in words and step < len(self.learning.steps):
+                self.learning.restore(words[lemma_id], step, due)
+        # Learning cards of re-queried sessions are no longer among current_words
+        return len(self.current_words) + (len(self.learning) if self.requery_on_resume else 0)
+    
+    def start_saved_filter_session(self, name):
+        """Start a session from a filter saved in user_settings (or a built-in one)"""
+        saved = load_filter(self.db, name) if self.db else None
+        if saved is None:
+            return 0
+        flt, order, limit = saved
+        # Ordered filters (due, weakest...) keep their order; rank filters are shuffled
+        return self.start_filter_session(flt, name, order, limit, shuffle=(order == 'rank'))
+    
     # ==================== GENERIC FILTERS ====================
     
     def start_by_field(self, field, value, label=None):
         """Generic: filter vocabulary by any field matching a value"""
-        words = [w for w in self.vocabulary if w.get(field) == value]
-        return self._start_session(words, label or f"{field}: {value}")
+        return self.start_filter_session(Field(field, '=', value), label or f"{field}: {value}")
     
     def start_by_rank(self, max_rank=None, min_rank=1):
         """Filter by frequency rank range"""
         if max_rank:
-            words = [w for w in self.vocabulary if min_rank <= int(w.get('rank', 999)) <= max_rank]
             label = f"Rank {min_rank}-{max_rank}" if min_rank > 1 else f"Top {max_rank}"
-        else:
-            words = self.vocabulary.copy()
-            label = "All Words"
-        return self._start_session(words, label)
+            return self.start_filter_session(Field('rank', 'between', (min_rank, max_rank)), label)
+        return self.start_filter_session(All(), "All Words")
     
     def start_by_familiarity(self, levels, limit=20, weakest_first=True, label="By Familiarity"):
         """Filter by familiarity levels, sorted by strength"""
-        words = [w for w in self.vocabulary if w.get('familiarity') in levels]
-        words.sort(
-            key=lambda w: (w.get('familiarity', 0), w.get('easiness', 2.5)),
-            reverse=not weakest_first
+        levels = sorted(levels)
+        if levels and levels == list(range(levels[0], levels[-1] + 1)):
+            # A range lets SQLite walk idx_user_progress_familiarity in order; an IN list scans lemmas
+            flt = Field('familiarity', 'between', (levels[0], levels[-1]))
+        else:
+            flt = Field('familiarity', 'in', tuple(levels))
+        return self.start_filter_session(
+            flt, label,
+            order='weakest' if weakest_first else 'strongest', limit=limit, shuffle=False
         )
-        return self._start_session(words[:limit], label, shuffle=False)
     
     # ==================== CONVENIENCE METHODS ====================
     # These are thin wrappers that call the generic methods above
@@ -67,8 +261,9 @@ class SessionManager:
     
     def start_custom_session(self, start_rank, end_rank):
         """Custom rank range"""
-        words = [w for w in self.vocabulary if start_rank <= int(w.get('rank', 999)) <= end_rank]
-        return self._start_session(words, f"Custom Range: {start_rank}-{end_rank}")
+        return self.start_filter_session(
+            Field('rank', 'between', (start_rank, end_rank)), f"Custom Range: {start_rank}-{end_rank}"
+        )
     
     def start_register_session(self, register):
         """By register: modern, biblical, or both"""
@@ -92,69 +287,136 @@ class SessionManager:
     
     def practice_difficult_words(self, top_n):
         """Words marked Hard/Again in top N"""
-        words = [w for w in self.vocabulary 
-                 if int(w.get('rank', 999)) <= top_n 
-                 and w.get('familiarity') in [None, 0, 1, 2]]
-        return self._start_session(words, f"Difficult (Top {top_n})")
+        flt = Field('rank', '<=', top_n) & (New() | Field('familiarity', 'in', (1, 2)))
+        return self.start_filter_session(flt, f"Difficult (Top {top_n})")
     
     def start_random_session(self, count=10):
         """Random selection"""
-        words = random.sample(self.vocabulary, min(count, len(self.vocabulary)))
-        return self._start_session(words, f"Random {count}", shuffle=False)
+        if not self.db:
+            return 0
+        return self._start_session(self.db.sample_lemma_ids(count), f"Random {count}", shuffle=False)
+    
+    def start_smart_random_session(self, count=10):
+        """Random selection weighted towards weak, overdue and unstudied words"""
+        if not self.db:
+            return 0
+        if self.weakness_sampler is None:
+            # Built once, then re-weighted per answer through the progress listener
+            self.weakness_sampler = WeaknessSampler.build(self.db)
+            self.db.add_progress_listener(self.weakness_sampler.update_progress)
+        lemma_ids = self.weakness_sampler.sample(count)
+        return self._start_session(lemma_ids, f"Smart Random {count}", shuffle=False)
     
     def start_new_words_session(self, limit=10):
         """Words never studied"""
-        words = [w for w in self.vocabulary if not w.get('familiarity')]
-        words.sort(key=lambda w: w.get('rank', 999))
-        return self._start_session(words[:limit], f"New Words ({limit})", shuffle=False)
+        return self.start_filter_session(New(), f"New Words ({limit})", limit=limit, shuffle=False)
     
     def start_srs_session(self):
-        """Words due for SRS review today"""
-        today = date.today().isoformat()
-        words = [w for w in self.vocabulary if w.get('next_review') and w.get('next_review') <= today]
-        words.sort(key=lambda w: w.get('next_review', '9999-99-99'))
-        return self._start_session(words, "SRS Review", shuffle=False)
+        """Today's queue: due reviews plus the daily new-card quota, minus cards already answered
+        
+        The queue is materialized once per study day, so this reads the next slice
+        instead of recomputing the due set (and resumes naturally after a restart).
+        """
+        if not self.db:
+            return 0
+        return self._start_session(self.daily_queue.remaining(), "SRS Review", shuffle=False)
     
     def start_category_session(self, category_name):
         """By category from database"""
-        if not self.db:
-            return 0
-        cursor = self.db.connection.cursor()
-        cursor.execute('''
-            SELECT l.lemma_id FROM lemmas l
-            JOIN lemma_categories lc ON l.lemma_id = lc.lemma_id
-            JOIN categories c ON lc.category_id = c.category_id
-            WHERE c.name = ?
-        ''', (category_name,))
-        ids = {row[0] for row in cursor.fetchall()}
-        words = [w for w in self.vocabulary if w.get('lemma_id') in ids]
-        return self._start_session(words, f"Category: {category_name}")
+        return self.start_filter_session(Category(category_name), f"Category: {category_name}")
     
     # ==================== SESSION STATE ====================
     
     def get_next_word(self):
-        """Get next word in session"""
-        if self.current_index < len(self.current_words):
-            self.current_word = self.current_words[self.current_index]
+        """Get the card to show; repeated calls return the same card until advance()"""
+        if self.showing:
             return self.current_word
-        return None
+        picked = self._pick_card()
+        if picked is None:
+            return None
+        self.current_word, self.current_step = picked
+        self.showing = True
+        self.shown_at = time.monotonic()
+        return self.current_word
+    
+    def _pick_card(self):
+        """Choose between due learning, new and review cards by Config.SESSION_MIX"""
+        available = [kind for kind in Config.SESSION_MIX if self._has_ready(kind)]
+        if not available:
+            # Nothing else left: show waiting learning cards early rather than end the session
+            return self.learning.pop(self.cards_shown, force=True)
+        # Smooth weighted round-robin: spreads each type evenly instead of in bursts
+        total = 0
+        for kind in available:
+            self.mix_credit[kind] += Config.SESSION_MIX[kind]
+            total += Config.SESSION_MIX[kind]
+        kind = max(available, key=self.mix_credit.get)
+        self.mix_credit[kind] -= total
+        if kind == 'learning':
+            return self.learning.pop(self.cards_shown)
+        return self.buffered[kind].popleft(), None
+    
+    def _has_ready(self, kind):
+        """Whether a card of this type can be shown now, scanning ahead in the main queue"""
+        if kind == 'learning':
+            return self.learning.has_due(self.cards_shown)
+        buffered = self.buffered[kind]
+        while not buffered and self.current_index < len(self.current_words):
+            if sum(map(len, self.buffered.values())) >= Config.INTERLEAVE_LOOKAHEAD:
+                break
+            word = self.current_words[self.current_index]
+            self.current_index += 1
+            if word is not None:  # Skip ids left behind by deleted lemmas
+                self.buffered['new' if not word.get('familiarity') else 'review'].append(word)
+        return bool(buffered)
+    
+    def answer_time_ms(self):
+        """Time since the current card was shown, capped at Config.MAX_ANSWER_SECONDS"""
+        if not self.showing:
+            return 0
+        return int(min(time.monotonic() - self.shown_at, Config.MAX_ANSWER_SECONDS) * 1000)
     
     def record_answer(self, confidence_level):
-        """Record answer and update stats"""
+        """Record answer, update stats and re-queue the card if it needs another look"""
         if confidence_level in ['good', 'easy']:
             self.session_stats['correct'] += 1
         else:
             self.session_stats['incorrect'] += 1
         self.session_stats['total'] += 1
+        if self.showing and self.current_step is None:
+            self.answered.append(self.current_word['lemma_id'])
+        
+        if not self.showing or not self.learning.steps:
+            return
+        # again: restart the steps; hard: repeat this step; good: next step; easy: graduate
+        step = self.current_step
+        if confidence_level == 'again':
+            step = 0
+        elif confidence_level == 'good' and step is not None:
+            step += 1
+        elif confidence_level != 'hard':
+            step = None
+        if step is not None and step < len(self.learning.steps):
+            self.learning.push(self.current_word, step, self.cards_shown + 1)
+            self.repeats += 1
     
     def advance(self):
         """Move to next word"""
-        self.current_index += 1
+        if self.showing:
+            self.showing = False
+            self.cards_shown += 1
+            self.checkpoint()
     
     def is_complete(self):
         """Check if session is complete"""
-        return self.current_index >= len(self.current_words)
+        return not self.showing and not (
+            self.current_index < len(self.current_words) or
+            any(self.buffered.values()) or len(self.learning)
+        )
     
     def get_progress_text(self):
         """Get progress description"""
-        return f"Word {self.current_index + 1} of {len(self.current_words)}"
+        text = f"Word {self.cards_shown + 1} of {len(self.current_words) + self.repeats}"
+        if len(self.learning):
+            text += f"  ({len(self.learning)} in learning)"
+        return text
@@ -0,0 +1,91 @@
+"""
+Startup
+Phase timings for app startup, and the first-card snapshot used by fast start
+Import this module before flet so the import phase is measured from here.
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+IMPORTS_STARTED = time.perf_counter()
+
+SNAPSHOT_KEY = 'startup_snapshot'
+# Enough of a word to draw its card before the session is rebuilt
+SNAPSHOT_FIELDS = ('lemma_id', 'hebrew', 'transliteration', 'english', 'root', 'notes')
+# Sessions that can be rebuilt to show the same first card
+SNAPSHOT_SOURCES = ('checkpoint', 'srs')
+
+
+class StartupProfiler:
+    """Records named startup phases as (name, offset, duration) from IMPORTS_STARTED"""
+    
+    def __init__(self, enabled=False, origin=IMPORTS_STARTED, clock=time.perf_counter):
+        self.enabled = enabled
+        self.origin = origin
+        self.clock = clock
+        self.phases = []
+    
+    def record(self, name, start, end):
+        if self.enabled:
+            self.phases.append((name, start - self.origin, end - start))
+    
+    @contextmanager
+    def phase(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, start, self.clock())
+    
+    def mark(self, name):
+        """Record a milestone such as the first card becoming visible"""
+        now = self.clock()
+        self.record(name, now, now)
+    
+    def as_dict(self):
+        return [{'phase': name, 'start_ms': start * 1000, 'duration_ms': duration * 1000}
+                for name, start, duration in self.phases]
+    
+    def report(self):
+        lines = [f"{'start ms':>9s} {'took ms':>9s}  phase"]
+        lines.extend(f"{start * 1000:9.1f} {duration * 1000:9.1f}  {name}"
+                     for name, start, duration in self.phases)
+        if self.phases:
+            end = max(start + duration for _, start, duration in self.phases)
+            lines.append(f"{end * 1000:9.1f} {'':9s}  total")
+        return '\n'.join(lines)
+    
+    def dump(self, out=None):
+        if self.enabled:
+            (out or sys.stderr).write("Startup profile:\n" + self.report() + "\n")
+
+
+def save_snapshot(db, source, label, word):
+    """Remember the card on screen so the next launch can draw it at once
+
+    `source` says how to rebuild its session ('checkpoint' or 'srs'); None clears
+    the snapshot (for sessions that cannot be rebuilt).
+    """
+    if source is None or word is None:
+        db.save_setting(SNAPSHOT_KEY, '')
+        return
+    if source not in SNAPSHOT_SOURCES:
+        raise ValueError(f"Unknown snapshot source: {source}")
+    snapshot = {'source': source, 'label': label, 'word': {field: word.get(field) for field in SNAPSHOT_FIELDS}}
+    db.save_setting(SNAPSHOT_KEY, json.dumps(snapshot, ensure_ascii=False))
+
+
+def load_snapshot(db):
+    """The saved snapshot dict, or None if there is none or it cannot be read"""
+    text = db.get_setting(SNAPSHOT_KEY)
+    if not text:
+        return None
+    try:
+        snapshot = json.loads(text)
+        if snapshot['source'] not in SNAPSHOT_SOURCES or not snapshot['word'].get('hebrew'):
+            return None
+        return snapshot
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Synthetic Deck
+Deterministic large vocabulary databases for benchmarks and performance tests
+A deck of N lemmas has realistic spreads of roots, variants, categories,
+translations and progress states, written in one bulk transaction per table.
+Built decks are cached per (size, seed) so benchmarks reuse them.
+
+Usage:
+    python synthetic_deck.py 100000                # build (or reuse) the cached deck
+    python synthetic_deck.py 100000 --out deck.db  # build into a specific file
+"""
+
+import argparse
+import os
+import random
+import tempfile
+from itertools import islice
+from pathlib import Path
+
+from database_manager import DatabaseManager
+from scheduler import day_number
+
+DEFAULT_SEED = 1
+# Bump when the generator changes so stale cached decks are rebuilt
+DECK_VERSION = 1
+CACHE_DIR = Path(os.environ.get('HEBREW_DECK_CACHE', Path(tempfile.gettempdir()) / 'hebrew-learning-decks'))
+
+LETTERS = 'אבגדהוזחטיכלמנסעפצקרשת'
+TRANSLITERATION = dict(zip(LETTERS, ['a', 'v', 'g', 'd', 'h', 'o', 'z', 'kh', 't', 'i', 'k', 'l',
+                                     'm', 'n', 's', "'", 'p', 'ts', 'k', 'r', 'sh', 't']))
+
+# (value, weight) tables
+PARTS_OF_SPEECH = (('noun', 50), ('verb', 20), ('adjective', 15), ('adverb', 5),
+                   ('pronoun', 3), ('preposition', 3), ('particle', 2), ('interjection', 2))
+REGISTERS = (('both', 50), ('modern', 40), ('biblical', 10))
+VARIANT_COUNTS = ((0, 40), (1, 20), (2, 20), (3, 10), (4, 10))
+CATEGORY_COUNTS = ((0, 20), (1, 50), (2, 25), (3, 5))
+TRANSLATION_COUNTS = ((0, 50), (1, 30), (2, 20))
+FAMILIARITY = ((1, 10), (2, 20), (3, 40), (4, 30))
+VARIANT_DESCRIPTIONS = ('plural', 'feminine singular', 'masculine plural', 'feminine plural',
+                        'construct', 'past 1st person singular', 'future 3rd person')
+LANGUAGES = ('Arabic', 'Latin', 'Greek', 'English', 'Persian', 'Aramaic')
+CATEGORIES = ('Greetings', 'Basic Vocabulary', 'Verbs', 'Nouns', 'Adjectives', 'Biblical Hebrew',
+              'Prepositions', 'Common Words', 'Torah', 'Grammar Particles', 'Family', 'Food',
+              'Travel', 'Work', 'Home', 'Nature', 'Time', 'Numbers', 'Body', 'Clothing',
+              'Emotions', 'Religion', 'Law', 'Military', 'Science', 'Technology', 'Health',
+              'Education', 'Sports', 'Music', 'Animals', 'Plants', 'Weather', 'City', 'Colors',
+              'Government', 'Money', 'Prophets', 'Psalms', 'Wisdom')
+
+BATCH_SIZE = 10000
+
+
+def _chooser(rng, table):
+    """Weighted draw from a (value, weight) table"""
+    values = [value for value, _ in table]
+    weights = [weight for _, weight in table]
+    return lambda: rng.choices(values, weights)[0]
+
+
+def _batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class DeckGenerator:
+    """Row streams for one deck; every table draws from its own seeded RNG so they stay independent"""
+    
+    def __init__(self, lemmas, seed=DEFAULT_SEED, today=None):
+        self.lemmas = lemmas
+        self.seed = seed
+        self.today = day_number() if today is None else today
+        # About four words per root, as in real Hebrew word families
+        root_rng = self._rng('roots')
+        self.roots = [''.join(root_rng.choices(LETTERS, k=3)) for _ in range(max(lemmas // 4, 1))]
+    
+    def _rng(self, table):
+        return random.Random(f'{self.seed}:{table}')
+    
+    def lemma_rows(self):
+        rng = self._rng('lemmas')
+        part_of_speech = _chooser(rng, PARTS_OF_SPEECH)
+        register = _chooser(rng, REGISTERS)
+        for lemma_id in range(1, self.lemmas + 1):
+            # Skewed draw: low-index roots have big families, most have a few words
+            root = self.roots[int(len(self.roots) * rng.random() ** 2)] if rng.random() < 0.85 else None
+            extra = ''.join(rng.choices(LETTERS, k=rng.randint(0, 4)))
+            lemma = (root or '') + extra or rng.choice(LETTERS)
+            transliteration = ''.join(TRANSLITERATION[letter] for letter in lemma)
+            notes = f"Usage note {lemma_id}" if rng.random() < 0.1 else None
+            yield (lemma_id, lemma, part_of_speech(), transliteration, f"gloss {lemma_id}",
+                   register(), notes, root, None, lemma_id)
+    
+    def variant_rows(self):
+        rng = self._rng('variants')
+        count = _chooser(rng, VARIANT_COUNTS)
+        for lemma_id in range(1, self.lemmas + 1):
+            for n in range(count()):
+                yield (lemma_id, f"form {lemma_id}.{n}", rng.choice(VARIANT_DESCRIPTIONS))
+    
+    def category_rows(self):
+        rng = self._rng('categories')
+        count = _chooser(rng, CATEGORY_COUNTS)
+        for lemma_id in range(1, self.lemmas + 1):
+            # Skewed toward the first categories, so category sizes vary widely
+            picks = {int(len(CATEGORIES) * rng.random() ** 2) + 1 for _ in range(count())}
+            for category_id in sorted(picks):
+                yield (lemma_id, category_id)
+    
+    def translation_rows(self):
+        rng = self._rng('translations')
+        count = _chooser(rng, TRANSLATION_COUNTS)
+        for lemma_id in range(1, self.lemmas + 1):
+            for language in rng.sample(LANGUAGES, count()):
+                yield (lemma_id, language, f"{language.lower()} {lemma_id}")
+    
+    def progress_rows(self):
+        """Frequent words are more likely to have been studied; a few are overdue"""
+        rng = self._rng('progress')
+        familiarity = _chooser(rng, FAMILIARITY)
+        for lemma_id in range(1, self.lemmas + 1):
+            if rng.random() >= max(0.05, 0.9 - lemma_id / self.lemmas):
+                continue
+            level = familiarity()
+            interval = {1: 0, 2: rng.randint(1, 3), 3: rng.randint(3, 30), 4: rng.randint(20, 180)}[level]
+            easiness = round(1.3 + level * 0.3 + rng.random() * 0.4, 2)
+            last_reviewed = self.today - rng.randint(0, interval + 3)
+            streak = 0 if level == 1 else rng.randint(1, level * 3)
+            yield (lemma_id, level, easiness, interval, last_reviewed, last_reviewed + interval, streak)
+
+
+def generate(db_path, lemmas, seed=DEFAULT_SEED, today=None):
+    """Build a synthetic deck of `lemmas` words into a new database file
+
+    The same (lemmas, seed, today) always gives the same rows. Stats triggers are
+    dropped for the load and stats_summary recounted once at the end.
+    """
+    db_path = Path(db_path)
+    if db_path.exists():
+        raise FileExistsError(f"Refusing to overwrite existing database: {db_path}")
+    generator = DeckGenerator(lemmas, seed, today)
+
+    db = DatabaseManager(db_path)
+    try:
+        cursor = db.connection.cursor()
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA journal_mode = MEMORY')
+        # Per-row trigger and index maintenance dominates bulk loads; both are recreated on reopen
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('trigger', 'index') AND sql IS NOT NULL")
+        for kind, name in cursor.fetchall():
+            cursor.execute(f'DROP {kind.upper()} {name}')
+
+        cursor.executemany('INSERT INTO categories (category_id, name) VALUES (?, ?)',
+                           enumerate(CATEGORIES, start=1))
+        inserts = (
+            ('''INSERT INTO lemmas (lemma_id, lemma, part_of_speech, transliteration, english,
+                                    register, notes, root, audio_path, frequency_rank)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', generator.lemma_rows()),
+            ('INSERT INTO variants (lemma_id, form, description) VALUES (?, ?, ?)', generator.variant_rows()),
+            ('INSERT INTO lemma_categories (lemma_id, category_id) VALUES (?, ?)', generator.category_rows()),
+            ('INSERT INTO translations (lemma_id, language, translation) VALUES (?, ?, ?)',
+             generator.translation_rows()),
+            ('''INSERT INTO user_progress
+                (lemma_id, familiarity, easiness, interval, last_reviewed, next_review, streak)
+                VALUES (?, ?, ?, ?, ?, ?, ?)''', generator.progress_rows()),
+        )
+        for sql, rows in inserts:
+            for batch in _batches(rows):
+                cursor.executemany(sql, batch)
+        db.connection.commit()
+    finally:
+        db.close()
+
+    # Reopening recreates the triggers and indexes in one pass over the loaded tables
+    db = DatabaseManager(db_path)
+    try:
+        db.rebuild_stats()
+        db.connection.execute('ANALYZE')
+        db.connection.commit()
+    finally:
+        db.close()
+    return db_path
+
+
+def cached_deck(lemmas, seed=DEFAULT_SEED, cache_dir=None):
+    """Path to a pre-built deck of this size, generating it on first use
+
+    Callers that write to the deck should copy it first. Progress dates are
+    relative to the day the deck was built.
+    """
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f'deck-v{DECK_VERSION}-{lemmas}-{seed}.db'
+    if not path.exists():
+        # Build beside the final name and rename, so an interrupted build is never reused
+        partial = path.with_name(f'{path.name}.{os.getpid()}.partial')
+        if partial.exists():
+            partial.unlink()
+        generate(partial, lemmas, seed)
+        os.replace(partial, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a synthetic vocabulary database")
+    parser.add_argument('lemmas', type=int, help='number of lemmas')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--out', type=Path, help='output file (default: the deck cache)')
+    args = parser.parse_args(argv)
+    path = generate(args.out, args.lemmas, args.seed) if args.out else cached_deck(args.lemmas, args.seed)
+    print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
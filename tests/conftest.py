@@ -6,16 +6,19 @@ Shared test fixtures that can be used across all test files
 import pytest
 import tempfile
 import os
+import shutil
 from pathlib import Path
 
 # Add parent directory to path so we can import our modules
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from audio_cache import AudioCache
 from database_manager import DatabaseManager
 from data_manager import VocabularyManager, ProgressManager
 from session_manager import SessionManager
 from config import Config
+from synthetic_deck import cached_deck
 
 
 @pytest.fixture
@@ -65,7 +68,31 @@ def sample_vocabulary(database):
 
 
 @pytest.fixture
-def session_manager(sample_vocabulary, database):
+def session_manager(database):
     """Create a SessionManager with test data"""
-    progress = database.get_vocabulary_stats()
-    return SessionManager(sample_vocabulary, progress, database)
+    return SessionManager(database)
+
+
+@pytest.fixture
+def synthetic_database(tmp_path):
+    """Factory for a writable copy of a cached synthetic deck: synthetic_database(lemmas, trace=True)"""
+    opened = []
+    
+    def open_deck(lemmas, **options):
+        path = tmp_path / f'deck-{lemmas}.db'
+        shutil.copyfile(cached_deck(lemmas), path)
+        db = DatabaseManager(path, **options)
+        opened.append(db)
+        return db
+    
+    yield open_deck
+    for db in opened:
+        db.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """An empty audio cache in the test's temporary directory"""
+    cache = AudioCache(tmp_path / 'audio')
+    yield cache
+    cache.close()
@@ -0,0 +1,82 @@
+"""
+Tests for Analytics
+Tests retention, lapse, leech and difficulty reports and their cache
+"""
+
+import pytest
+
+import database_manager
+from analytics import Analytics
+
+
+@pytest.fixture
+def reviewed(database, monkeypatch):
+    """Sample database with a scripted review history"""
+    day = {'today': 1000}
+    monkeypatch.setattr(database_manager, 'day_number', lambda: day['today'])
+    
+    def answer(on_day, lemma_id, familiarity):
+        day['today'] = on_day
+        database.update_progress(lemma_id, familiarity)
+    
+    # Lemma 1: good, good, lapse, good  (gaps 1, 3, 7)
+    for on_day, familiarity in ((1000, 3), (1001, 3), (1004, 1), (1011, 3)):
+        answer(on_day, 1, familiarity)
+    # Lemma 2: failed three times in a row, all on one day
+    for _ in range(3):
+        answer(1011, 2, 1)
+    return database
+
+
+class TestReports:
+    """Test report contents"""
+    
+    def test_retention_by_interval(self, reviewed):
+        """Test answers are bucketed by days since the previous review"""
+        rows = {row['bucket']: row for row in Analytics(reviewed).retention_by_interval()}
+        assert rows['same day'] == {'bucket': 'same day', 'reviews': 2, 'retention': 0.0}
+        assert rows['1 day']['retention'] == 1.0
+        assert rows['2-3 days']['retention'] == 0.0
+        assert rows['4-7 days']['retention'] == 1.0
+        assert list(rows) == ['same day', '1 day', '2-3 days', '4-7 days']
+    
+    def test_lapses_and_leeches(self, reviewed):
+        """Test failures, lapses and the leech threshold"""
+        analytics = Analytics(reviewed)
+        cards = {row['lemma_id']: row for row in analytics.card_lapses()}
+        assert cards[1]['failures'] == 1 and cards[1]['lapses'] == 1
+        assert cards[2]['failures'] == 3 and cards[2]['lapses'] == 0
+        assert [row['lemma_id'] for row in analytics.leeches(threshold=3)] == [2]
+        assert analytics.leeches() == []
+    
+    def test_difficulty(self, reviewed):
+        """Test failure rates and ranks per part of speech and category"""
+        analytics = Analytics(reviewed)
+        by_pos = analytics.difficulty('part_of_speech')
+        assert sum(row['reviews'] for row in by_pos) == 7
+        assert by_pos[0]['rank'] == 1
+        assert by_pos[0]['failure_rate'] >= by_pos[-1]['failure_rate']
+        assert analytics.difficulty('category')
+        with pytest.raises(ValueError):
+            analytics.difficulty('english')
+
+
+class TestCache:
+    """Test cache invalidation"""
+    
+    def test_cached_until_the_database_changes(self, reviewed, temp_db_path):
+        """Test our own and other connections' writes invalidate results"""
+        analytics = Analytics(reviewed)
+        first = analytics.card_lapses()
+        assert analytics.card_lapses() is first
+        
+        reviewed.update_progress(3, familiarity=1)
+        second = analytics.card_lapses()
+        assert second is not first
+        assert 3 in {row['lemma_id'] for row in second}
+        
+        other = database_manager.DatabaseManager(temp_db_path)
+        other.connection.execute('DELETE FROM review_log WHERE lemma_id = 3')
+        other.connection.commit()
+        other.close()
+        assert 3 not in {row['lemma_id'] for row in analytics.card_lapses()}
@@ -0,0 +1,125 @@
+"""
+Tests for the audio cache
+Tests content addressing, LRU eviction and integrity checks
+"""
+
+import itertools
+
+import pytest
+
+from audio_cache import AudioCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Cache with a 250-byte budget and a clock that ticks once per use"""
+    cache = AudioCache(tmp_path / 'audio', max_bytes=250, clock=itertools.count().__next__)
+    yield cache
+    cache.close()
+
+
+def writer(data=b'x' * 100, calls=None):
+    """A render callable writing fixed bytes, counting its calls"""
+    def render(path):
+        if calls is not None:
+            calls.append(path)
+        path.write_bytes(data)
+    return render
+
+
+class TestAddressing:
+    """Test clips are keyed by text, voice and engine"""
+    
+    def test_key_covers_text_voice_and_engine(self):
+        """Test changing any part of the address changes the key"""
+        keys = {AudioCache.key('שלום', 'Carmit', 'say'), AudioCache.key('שלום', 'he', 'say'),
+                AudioCache.key('שלום', 'Carmit', 'espeak-ng'), AudioCache.key('תודה', 'Carmit', 'say')}
+        assert len(keys) == 4
+    
+    def test_renders_once(self, cache):
+        """Test a second put is a hit that does not render again"""
+        calls = []
+        path = cache.put('שלום', 'Carmit', 'say', writer(calls=calls), '.aiff')
+        assert cache.put('שלום', 'Carmit', 'say', writer(calls=calls), '.aiff') == path
+        assert len(calls) == 1
+        assert path.read_bytes() == b'x' * 100
+        assert path.suffix == '.aiff' and path.parent.name == path.stem[:2]
+        assert cache.get('שלום', 'Carmit', 'say') == path
+        assert cache.get('שלום', 'other', 'say') is None
+    
+    def test_failed_render_leaves_nothing(self, cache):
+        """Test an empty or failed render is not cached and leaves no partial file"""
+        with pytest.raises(OSError):
+            cache.put('שלום', 'Carmit', 'say', writer(b''), '.aiff')
+        
+        def crash(path):
+            path.write_bytes(b'half')
+            raise RuntimeError('synthesizer crashed')
+        with pytest.raises(RuntimeError):
+            cache.put('שלום', 'Carmit', 'say', crash, '.aiff')
+        assert len(cache) == 0
+        assert not [p for p in cache.directory.rglob('*') if p.is_file() and p.name != 'index.db']
+
+
+class TestEviction:
+    """Test the byte budget"""
+    
+    def test_least_recently_used_is_evicted(self, cache):
+        """Test going over budget removes the clip played longest ago"""
+        first = cache.put('one', 'v', 'say', writer(), '.aiff')
+        second = cache.put('two', 'v', 'say', writer(), '.aiff')
+        cache.get('one', 'v', 'say')  # 'two' is now the least recently used
+        cache.put('three', 'v', 'say', writer(), '.aiff')
+        assert first.exists() and not second.exists()
+        assert cache.get('two', 'v', 'say') is None
+        assert cache.total_bytes() == 200 and len(cache) == 2
+    
+    def test_evict_to_smaller_budget(self, cache):
+        """Test evicting explicitly to a lower limit"""
+        for text in ('one', 'two'):
+            cache.put(text, 'v', 'say', writer(), '.aiff')
+        assert len(cache.evict(max_bytes=0)) == 2
+        assert cache.total_bytes() == 0
+    
+    def test_touch_by_recorded_file(self, cache):
+        """Test a file named in audio_path counts as a use, and reads as gone once evicted"""
+        first = cache.put('one', 'v', 'say', writer(), '.aiff')
+        second = cache.put('two', 'v', 'say', writer(), '.aiff')
+        file = first.relative_to(cache.directory).as_posix()
+        assert cache.touch(file) == first
+        cache.put('three', 'v', 'say', writer(), '.aiff')
+        assert first.exists() and not second.exists()
+        assert cache.touch(second.relative_to(cache.directory).as_posix()) is None
+
+
+class TestIntegrity:
+    """Test damaged clips are detected"""
+    
+    def test_missing_or_truncated_file_is_a_miss(self, cache):
+        """Test get drops clips whose file is gone or changed size"""
+        path = cache.put('one', 'v', 'say', writer(), '.aiff')
+        path.write_bytes(b'short')
+        assert cache.get('one', 'v', 'say') is None
+        assert len(cache) == 0
+    
+    def test_verify_checks_contents(self, cache):
+        """Test verify drops same-size corruption and deletes unknown files"""
+        good = cache.put('one', 'v', 'say', writer(), '.aiff')
+        bad = cache.put('two', 'v', 'say', writer(), '.aiff')
+        bad.write_bytes(b'y' * 100)
+        stray = good.parent / '.leftover.aiff'
+        stray.write_bytes(b'partial render')
+        removed = cache.verify()
+        assert len(removed) == 2
+        assert good.exists() and not bad.exists() and not stray.exists()
+        assert cache.get('one', 'v', 'say') == good
+        assert cache.get('two', 'v', 'say') is None
+    
+    def test_index_survives_reopen(self, cache):
+        """Test a new cache over the same directory still hits"""
+        path = cache.put('one', 'v', 'say', writer(), '.aiff')
+        reopened = AudioCache(cache.directory)
+        try:
+            assert reopened.get('one', 'v', 'say') == path
+        finally:
+            reopened.close()
@@ -0,0 +1,168 @@
+"""
+Tests for the audio pack
+Tests mmap reads, deduplication, compaction and recovery, and playback from the pack
+"""
+
+import mmap
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import audio_pack
+from audio_cache import AudioCache
+from audio_pack import AudioPack, main
+from audio_player import AudioPlayer
+
+
+@pytest.fixture
+def pack(database, tmp_path):
+    pack = AudioPack(database, tmp_path / 'hebrew_audio.pack')
+    yield pack
+    pack.close()
+
+
+def contents(pack, lemma_id):
+    data, format = pack.read(lemma_id)
+    try:
+        return bytes(data), format
+    finally:
+        data.release()
+
+
+class TestReading:
+    """Test packing and reading clips"""
+    
+    def test_pack_sits_beside_database(self, database):
+        """Test the default pack location is next to the vocabulary database"""
+        assert audio_pack.pack_path(database.db_path).parent == database.db_path.parent
+    
+    def test_read_is_a_view_of_the_map(self, pack):
+        """Test a clip comes back as a memoryview over the pack's mmap"""
+        pack.add([(1, b'shalom', '.wav'), (2, b'toda', '.aiff')])
+        data, format = pack.read(2)
+        assert isinstance(data, memoryview) and isinstance(data.obj, mmap.mmap)
+        assert bytes(data) == b'toda' and format == '.aiff'
+        data.release()
+        assert pack.read(3) is None
+        assert 1 in pack and 3 not in pack
+    
+    def test_identical_clips_are_stored_once(self, pack):
+        """Test words with the same audio share bytes in the file"""
+        assert pack.add([(1, b'shalom', '.wav'), (2, b'shalom', '.wav')]) == 6
+        assert pack.add([(3, b'shalom', '.wav')]) == 0
+        assert contents(pack, 3) == (b'shalom', '.wav')
+        assert pack.stats()['live_bytes'] == 6
+    
+    def test_cut_short_pack_is_not_read(self, pack):
+        """Test a clip past the end of a truncated file reads as not packed"""
+        pack.add([(1, b'shalom', '.wav'), (2, b'toda', '.wav')])
+        os.truncate(pack.path, pack.path.stat().st_size - 1)
+        pack.close()
+        assert pack.read(2) is None
+        assert contents(pack, 1) == (b'shalom', '.wav')
+    
+    def test_removed_pack_starts_a_new_index(self, pack):
+        """Test rows of a deleted pack file are dropped when packing again"""
+        pack.add([(1, b'shalom', '.wav')])
+        pack.close()
+        pack.path.unlink()
+        pack.add([(2, b'toda', '.wav')])
+        assert 1 not in pack and contents(pack, 2) == (b'toda', '.wav')
+    
+    def test_add_from_cache(self, pack, database, cache):
+        """Test clips recorded in lemmas.audio_path are packed"""
+        path = cache.put('שלום', 'he', 'espeak-ng', lambda out: out.write_bytes(b'clip'), '.wav')
+        database.set_audio_paths([(1, path.relative_to(cache.directory).as_posix()), (2, 'gone/evicted.wav')])
+        assert pack.add_from_cache(cache) == 4
+        assert contents(pack, 1) == (b'clip', '.wav') and 2 not in pack
+
+
+class TestCompaction:
+    """Test rewriting the pack"""
+    
+    def test_compact_drops_replaced_clips(self, pack):
+        """Test re-packed lemmas leave garbage that compaction reclaims"""
+        pack.add([(1, b'old-one', '.wav'), (2, b'two', '.wav')])
+        pack.add([(1, b'new-one', '.wav')])
+        size = pack.path.stat().st_size
+        assert pack.compact() == len(b'old-one')
+        assert pack.path.stat().st_size == size - len(b'old-one')
+        assert contents(pack, 1) == (b'new-one', '.wav') and contents(pack, 2) == (b'two', '.wav')
+        assert pack.generation() == 1
+        pack.add([(3, b'three', '.wav')])  # Appends continue in the new file
+        assert contents(pack, 3) == (b'three', '.wav')
+    
+    def test_interrupted_swap_is_finished(self, pack, database):
+        """Test a crash after the index commit completes the swap at the next read"""
+        pack.add([(1, b'old-one', '.wav'), (2, b'two', '.wav')])
+        pack.add([(1, b'new-one', '.wav')])
+        with patch('audio_pack.os.replace', side_effect=OSError('power cut')):
+            with pytest.raises(OSError):
+                pack.compact()
+        reopened = AudioPack(database, pack.path)
+        assert contents(reopened, 2) == (b'two', '.wav')
+        assert not reopened.compacting_path.exists()
+    
+    def test_uncommitted_compaction_is_discarded(self, pack, database):
+        """Test a half-written compaction leaves the old pack in use"""
+        pack.add([(1, b'one', '.wav')])
+        pack.compacting_path.write_bytes(audio_pack.HEADER.pack(audio_pack.MAGIC, 7) + b'junk')
+        reopened = AudioPack(database, pack.path)
+        assert contents(reopened, 1) == (b'one', '.wav')
+        assert not reopened.compacting_path.exists()
+    
+    def test_command(self, pack, database, tmp_path, capsys):
+        """Test the build, compact and stats commands"""
+        cache = AudioCache(tmp_path / 'audio')
+        try:
+            path = cache.put('שלום', 'he', 'espeak-ng', lambda out: out.write_bytes(b'clip'), '.wav')
+        finally:
+            cache.close()
+        database.set_audio_path(1, path.relative_to(tmp_path / 'audio').as_posix())
+        args = ['--db', str(database.db_path), '--cache', str(tmp_path / 'audio'), '--pack', str(pack.path)]
+        assert main(['build', *args]) == 0
+        assert main(['compact', *args]) == 0
+        assert main(['stats', *args]) == 0
+        out = capsys.readouterr().out
+        assert 'Appended 4 bytes' in out and 'Reclaimed 0 bytes' in out
+        assert '1 lemmas, 4 bytes of clips' in out
+
+
+class TestPackedPlayback:
+    """Test AudioPlayer plays packed words without rendering"""
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.find_stream_player', return_value=['paplay'])
+    def test_clip_is_piped_to_player(self, mock_player, mock_popen, pack):
+        """Test a packed clip is written to the player's stdin from the map"""
+        process = MagicMock()
+        written = []
+        process.stdin.write.side_effect = lambda data: written.append(bytes(data))
+        mock_popen.return_value = process
+        pack.add([(1, b'shalom', '.wav')])
+        player = AudioPlayer(pack=pack)
+        player.play('שלום', lemma_id=1)
+        assert mock_popen.call_args[0][0] == ['paplay']
+        for thread in threading.enumerate():
+            if thread.name == 'audio-feed':
+                thread.join(5)
+        assert written == [b'shalom']
+        process.stdin.close.assert_called_once()
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.find_stream_player', return_value=None)
+    def test_without_stream_player_uses_scratch_file(self, mock_player, mock_popen, pack):
+        """Test players that need a file (afplay) get the clip through a scratch file"""
+        pack.add([(1, b'shalom', '.aiff')])
+        AudioPlayer(pack=pack).play('שלום', lemma_id=1)
+        command = mock_popen.call_args[0][0]
+        assert command[0] == 'afplay' and command[-1].endswith('.aiff')
+        assert open(command[-1], 'rb').read() == b'shalom'
+    
+    @patch('audio_player.subprocess.Popen')
+    def test_unpacked_word_is_spoken(self, mock_popen, pack):
+        """Test words missing from the pack fall back to the engine"""
+        AudioPlayer(pack=pack).play('שלום', lemma_id=1)
+        assert 'Carmit' in mock_popen.call_args[0][0]
@@ -80,3 +80,105 @@ class TestAudioPlayback:
         player = AudioPlayer()
         # Should not raise an exception
         player.play('שלום')
+
+
+class TestCachedPlayback:
+    """Test rendering to the audio cache (mocked synthesis)"""
+    
+    @staticmethod
+    def fake_say(command, **kwargs):
+        """Stand-in for 'say -o <file>': writes a clip to the output path"""
+        with open(command[command.index('-o') + 1], 'wb') as f:
+            f.write(b'clip')
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.subprocess.run')
+    def test_word_is_rendered_once(self, mock_run, mock_popen, cache):
+        """Test the first play renders a file and later plays only read it"""
+        from audio_player import AudioPlayer
+        
+        mock_run.side_effect = self.fake_say
+        player = AudioPlayer(cache=cache)
+        player.play('שלום')
+        player.play('שלום')
+        
+        assert mock_run.call_count == 1
+        assert mock_popen.call_count == 2
+        played = mock_popen.call_args[0][0]
+        assert played[:-1] == player.backend.play_command('clip')[:-1]
+        assert open(played[1], 'rb').read() == b'clip'
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.subprocess.run')
+    def test_clip_is_recorded_in_audio_path(self, mock_run, mock_popen, cache, database):
+        """Test the rendered clip's cache path is stored on the lemma"""
+        from audio_player import AudioPlayer
+        
+        mock_run.side_effect = self.fake_say
+        player = AudioPlayer(cache=cache, db=database)
+        player.play('שלום', lemma_id=1)
+        
+        audio_path = database.get_audio_path(1)
+        assert audio_path and cache.path(audio_path) == player.render('שלום')
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.subprocess.run')
+    def test_recorded_clip_is_played(self, mock_run, mock_popen, cache, database):
+        """Test a word whose audio_path is still cached plays it without rendering"""
+        from audio_player import AudioPlayer
+        
+        mock_run.side_effect = self.fake_say
+        path = AudioPlayer(cache=cache, db=database).render('שלום', lemma_id=1)
+        database.set_audio_path(1, path.relative_to(cache.directory).as_posix())
+        with patch.object(cache, 'get') as mock_get:
+            AudioPlayer(cache=cache, db=database).play('שלום', lemma_id=1)
+        
+        mock_get.assert_not_called()
+        assert mock_run.call_count == 1
+        assert mock_popen.call_args[0][0][-1] == str(path)
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.subprocess.run')
+    def test_evicted_audio_path_is_cleared(self, mock_run, mock_popen, cache, database):
+        """Test a recorded clip that was evicted is forgotten, then rendered and recorded again"""
+        from audio_player import AudioPlayer
+        
+        mock_run.side_effect = self.fake_say
+        player = AudioPlayer(cache=cache, db=database)
+        player.play('שלום', lemma_id=1)
+        audio_path = database.get_audio_path(1)
+        assert cache.evict(0) == [audio_path]
+        
+        mock_run.side_effect = FileNotFoundError('say')
+        player.play('שלום', lemma_id=1)
+        assert database.get_audio_path(1) is None
+        
+        mock_run.side_effect = self.fake_say
+        player.play('שלום', lemma_id=1)
+        assert database.get_audio_path(1) == audio_path and mock_run.call_count == 3
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.subprocess.run')
+    def test_other_voice_is_not_played(self, mock_run, mock_popen, cache, database):
+        """Test a clip recorded in another voice is rendered again in this one"""
+        from audio_player import AudioPlayer
+        
+        mock_run.side_effect = self.fake_say
+        AudioPlayer(voice='Other', cache=cache, db=database).play('שלום', lemma_id=1)
+        player = AudioPlayer(cache=cache, db=database)
+        player.play('שלום', lemma_id=1)
+        
+        assert mock_run.call_count == 2
+        assert cache.path(database.get_audio_path(1)) == cache.get('שלום', player.voice, player.backend.name)
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('audio_player.subprocess.run')
+    def test_render_failure_is_handled(self, mock_run, mock_popen, cache):
+        """Test a failing synthesizer does not raise from play()"""
+        from audio_player import AudioPlayer
+        
+        mock_run.side_effect = FileNotFoundError('say')
+        AudioPlayer(cache=cache).play('שלום')
+        
+        mock_popen.assert_not_called()
+        assert len(cache) == 0
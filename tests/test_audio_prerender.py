@@ -0,0 +1,110 @@
+"""
+Tests for audio pre-rendering
+Tests parallel rendering into the cache, skipping, failures and resuming
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import audio_prerender
+from audio_cache import AudioCache
+from audio_prerender import Prerenderer, main, session_words
+from tts_backends import TTSBackend
+
+
+class TextBackend(TTSBackend):
+    """Picklable stand-in engine: a clip is the word's UTF-8 bytes ('!' fails)"""
+    
+    name = 'text'
+    default_voice = 'plain'
+    
+    def render(self, text, voice, path):
+        if text == '!':
+            raise RuntimeError('engine crashed')
+        with open(path, 'wb') as f:
+            f.write(text.encode('utf-8'))
+
+
+def threaded(cache, **options):
+    """A prerenderer on threads, so tests can count calls in-process"""
+    return Prerenderer(cache, TextBackend(), executor=ThreadPoolExecutor, **options)
+
+
+class TestPrerender:
+    """Test rendering word lists into the cache"""
+    
+    def test_renders_in_worker_processes(self, cache):
+        """Test a process pool renders each distinct word once and reports every lemma"""
+        prerenderer = Prerenderer(cache, TextBackend(), workers=2)
+        clips = prerenderer.run([(1, 'שלום'), (2, 'תודה'), (3, 'שלום')])
+        assert sorted(clips) == [1, 2, 3] and clips[1] == clips[3]
+        assert cache.path(clips[2]).read_bytes() == 'תודה'.encode('utf-8')
+        assert len(cache) == 2 and prerenderer.failed == []
+    
+    def test_cached_words_are_skipped(self, cache):
+        """Test a second run renders nothing but still reports the cached paths"""
+        threaded(cache).run([(1, 'שלום')])
+        progress = []
+        clips = threaded(cache).run([(1, 'שלום'), (2, 'תודה')], lambda done, total: progress.append((done, total)))
+        assert progress == [(0, 1), (1, 1)]
+        assert sorted(clips) == [1, 2]
+    
+    def test_failures_leave_no_partial_files(self, cache):
+        """Test a failing word is reported and the rest are cached"""
+        prerenderer = threaded(cache)
+        clips = prerenderer.run([(1, '!'), (2, 'תודה'), (3, None)])
+        assert list(clips) == [2]
+        assert [text for text, _ in prerenderer.failed] == ['!']
+        assert cache.verify() == []
+    
+    def test_interrupted_run_resumes(self, cache):
+        """Test clips cached before an interruption are not rendered again"""
+        words = [(n, f'word{n}') for n in range(10)]
+        
+        def interrupt(done, total):
+            if done == 4:
+                raise KeyboardInterrupt
+        with pytest.raises(KeyboardInterrupt):
+            threaded(cache, workers=1).run(words, interrupt)
+        assert len(cache) == 4
+        
+        progress = []
+        clips = threaded(cache, workers=1).run(words, lambda done, total: progress.append(total))
+        assert progress[0] == 6 and len(clips) == 10
+        assert cache.verify() == []
+    
+    def test_cancel_stops_submitting(self, cache):
+        """Test a cancelled prerenderer renders nothing further"""
+        prerenderer = threaded(cache)
+        prerenderer.cancel()
+        assert prerenderer.run([(1, 'שלום')]) == {}
+        assert len(cache) == 0
+
+
+class TestSessionWords:
+    """Test choosing words to pre-render"""
+    
+    def test_session_then_tomorrow(self, database):
+        """Test session cards come first, then tomorrow's queue without repeats"""
+        words = session_words(database, [5, 3])
+        lemma_ids = [lemma_id for lemma_id, _ in words]
+        assert lemma_ids[:2] == [5, 3]
+        assert len(lemma_ids) == len(set(lemma_ids)) > 2
+        assert all(text for _, text in words)
+
+
+class TestCommand:
+    """Test the prerender-audio command"""
+    
+    def test_whole_deck(self, database, tmp_path, monkeypatch, capsys):
+        """Test the command caches every word and records lemmas.audio_path"""
+        monkeypatch.setattr(audio_prerender, 'select_backend', lambda engine, recordings: TextBackend())
+        assert main(['--db', str(database.db_path), '--cache', str(tmp_path / 'audio'), '--workers', '2']) == 0
+        assert 'words cached, 0 failed' in capsys.readouterr().out
+        cache = AudioCache(tmp_path / 'audio')
+        try:
+            audio_path = database.get_audio_path(1)
+            assert audio_path and cache.path(audio_path).exists()
+        finally:
+            cache.close()
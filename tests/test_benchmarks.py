@@ -0,0 +1,74 @@
+"""
+Tests for the benchmark suite
+Tests that benchmarks run on small decks and that comparisons flag regressions
+"""
+
+import json
+
+from benchmarks import BENCHMARKS, compare, main, run_benchmarks, time_call
+
+
+def document(*results, unit='seconds'):
+    return {'results': [{'name': name, 'size': size, 'best': best, 'unit': unit} for name, size, best in results]}
+
+
+class TestRun:
+    """Test running benchmarks"""
+    
+    def test_every_benchmark_runs(self):
+        """Test each benchmark produces a timing on a small deck"""
+        results = run_benchmarks(sizes=[300], repeat=1, min_time=0, memory=False)
+        assert {r['name'] for r in results['results']} == set(BENCHMARKS)
+        assert all(r['best'] > 0 and r['size'] == 300 for r in results['results'])
+        assert results['sqlite'] and results['python']
+    
+    def test_only_patterns(self):
+        """Test --only selects benchmarks by glob pattern"""
+        results = run_benchmarks(sizes=[300], only=['start_s*'], repeat=1, min_time=0)
+        names = {r['name'] for r in results['results']}
+        assert names and all(name.startswith('start_s') for name in names)
+    
+    def test_memory_profiles_recorded(self):
+        """Test memory profiles are stored as byte-valued results with bytes per lemma"""
+        results = run_benchmarks(sizes=[300], only=['memory:*'], repeat=1, min_time=0)
+        memory = {r['name']: r for r in results['results']}
+        assert 'memory:VocabularyManager.load' in memory
+        assert all(r['unit'] == 'bytes' for r in memory.values())
+        assert memory['memory:VocabularyManager.load']['bytes_per_lemma'] > 0
+    
+    def test_time_call_scales_number(self):
+        """Test calls are batched until a repeat reaches min_time"""
+        result = time_call(lambda: None, repeat=2, min_time=0.001)
+        assert result['number'] > 1
+        assert result['best'] <= result['median']
+
+
+class TestCompare:
+    """Test baseline comparison"""
+    
+    def test_flags_regressions_over_threshold(self):
+        """Test only benchmarks slower than the threshold are flagged"""
+        baseline = document(('a', 10, 1.0), ('b', 10, 1.0), ('gone', 10, 1.0))
+        current = document(('a', 10, 1.1), ('b', 10, 1.5), ('new', 10, 1.0))
+        rows = {row[0]: row for row in compare(current, baseline, threshold=0.25)}
+        assert set(rows) == {'a', 'b'}
+        assert not rows['a'][-1]
+        assert rows['b'][-1]
+        assert rows['b'][5] == 1.5
+    
+    def test_small_memory_growth_is_noise(self):
+        """Test memory growth below the noise floor is not a regression"""
+        baseline = document(('memory:a', 10, 1000), ('memory:b', 10, 1_000_000), unit='bytes')
+        current = document(('memory:a', 10, 5000), ('memory:b', 10, 2_000_000), unit='bytes')
+        rows = {row[0]: row for row in compare(current, baseline)}
+        assert not rows['memory:a'][-1]
+        assert rows['memory:b'][-1]
+    
+    def test_compare_command_exit_code(self, tmp_path, capsys):
+        """Test the compare command fails when anything regressed"""
+        baseline, current = tmp_path / 'baseline.json', tmp_path / 'current.json'
+        baseline.write_text(json.dumps(document(('a', 10, 1.0))))
+        current.write_text(json.dumps(document(('a', 10, 2.0))))
+        assert main(['compare', str(current), str(baseline)]) == 1
+        assert 'REGRESSION' in capsys.readouterr().out
+        assert main(['compare', str(baseline), str(baseline)]) == 0
@@ -0,0 +1,125 @@
+"""
+Tests for BitmapIndex
+Tests bitmap construction, set-algebra evaluation and incremental updates
+"""
+
+import pytest
+
+from bitmap_index import BitmapIndex, iter_ordinals
+from session_filters import Field, Category, Due, New, All, And, Or, Not
+
+
+@pytest.fixture
+def bitmap_index(database):
+    """Build a bitmap index over the sample database"""
+    return BitmapIndex.build(database)
+
+
+def sql_ids(database, flt, limit=None):
+    """Reference result from the SQL path"""
+    where, params = flt.compile()
+    return database.select_lemma_ids(where, params, 'l.frequency_rank', limit)
+
+
+class TestBuild:
+    """Test index construction"""
+    
+    def test_covers_every_lemma(self, bitmap_index):
+        """Test one ordinal per lemma"""
+        assert len(bitmap_index) == 50
+        assert bitmap_index.universe.bit_count() == 50
+    
+    def test_iter_ordinals(self):
+        """Test set-bit iteration order"""
+        assert list(iter_ordinals(0b1010_0000_0001)) == [0, 9, 11]
+        assert list(iter_ordinals(0)) == []
+
+
+class TestEvaluation:
+    """Test that bitmap evaluation matches SQL"""
+    
+    @pytest.mark.parametrize('flt', [
+        Category('Torah') & Field('part_of_speech', '=', 'verb'),
+        Field('register', 'in', ('biblical', 'both')) & Due(),
+        Category('Nouns') | Category('Verbs'),
+        Not(Field('familiarity', '=', 1)) & Field('rank', 'between', (10, 40)),
+        Field('rank', '<=', 25) & (New() | Field('familiarity', 'in', (1, 2))),
+        All(),
+        Or(),
+        And(),
+        Category('Torah') & Or(),
+    ])
+    def test_matches_sql(self, database, bitmap_index, flt):
+        """Test bitmap and SQL agree, including rank order"""
+        bits = bitmap_index.evaluate(flt)
+        assert bitmap_index.lemma_ids_for(bits) == sql_ids(database, flt)
+    
+    def test_limit(self, database, bitmap_index):
+        """Test limits keep the first matches in rank order"""
+        flt = Category('Nouns')
+        assert bitmap_index.lemma_ids_for(bitmap_index.evaluate(flt), 5) == sql_ids(database, flt, 5)
+    
+    def test_unsupported_filter_needs_sql(self, bitmap_index):
+        """Test that non-indexed fields fall back to SQL"""
+        assert bitmap_index.evaluate(Field('root', '=', 'ילד')) is None
+        assert bitmap_index.evaluate(Field('streak', '<', 3) & Category('Torah')) is None
+    
+    def test_null_values_need_sql(self, database, bitmap_index):
+        """Test that comparisons with None are left to SQL, which matches nothing"""
+        for flt in (Field('familiarity', '=', None), Field('familiarity', 'in', (None, 1))):
+            assert bitmap_index.evaluate(flt) is None
+        assert sql_ids(database, Field('familiarity', '=', None)) == []
+    
+    def test_due_order(self, database, bitmap_index):
+        """Test due-ordered matches agree with SQL's ORDER BY next_review"""
+        database.connection.execute('UPDATE user_progress SET next_review = NULL WHERE lemma_id = 3')
+        index = BitmapIndex.build(database)
+        flt = Field('rank', '<=', 30)
+        where, params = flt.compile()
+        expected = database.select_lemma_ids(where, params, 'up.next_review')
+        result = index.lemma_ids_by_due(index.evaluate(flt))
+        due = {w['lemma_id']: w['next_review'] for w in database.get_words(expected)}
+        assert [due[i] for i in result] == [due[i] for i in expected]
+        assert sorted(result) == sorted(expected)
+        assert due[result[0]] is None  # Unscheduled first, as in SQL
+        assert index.lemma_ids_by_due(index.evaluate(flt), 5) == result[:5]
+
+
+class TestUpdates:
+    """Test that progress changes keep bitmaps current"""
+    
+    def test_progress_listener_moves_bits(self, database, bitmap_index):
+        """Test familiarity and due bitmaps follow update_progress"""
+        database.add_progress_listener(bitmap_index.update_progress)
+        database.update_progress(21, familiarity=4)  # Lemma 21 was due today
+        
+        assert 21 in bitmap_index.lemma_ids_for(bitmap_index.evaluate(Field('familiarity', '=', 4)))
+        assert 21 not in bitmap_index.lemma_ids_for(bitmap_index.evaluate(Due()))
+        for flt in (Field('familiarity', 'in', (1, 2)), Due(), Field('familiarity', '=', 4)):
+            assert bitmap_index.lemma_ids_for(bitmap_index.evaluate(flt)) == sql_ids(database, flt)
+    
+    def test_listener_removed_during_update(self, database):
+        """Test a listener that removes itself mid-notification does not skip the next one"""
+        calls = []
+        
+        def once(lemma_id, progress):
+            calls.append('once')
+            database.remove_progress_listener(once)
+        database.add_progress_listener(once)
+        database.add_progress_listener(lambda lemma_id, progress: calls.append('after'))
+        database.update_progress(21, familiarity=4)
+        database.update_progress(21, familiarity=5)
+        assert calls == ['once', 'after', 'after']
+    
+    def test_session_manager_uses_bitmaps(self, session_manager, bitmap_index):
+        """Test rank-ordered filter sessions are answered from the bitmap index"""
+        session_manager.attach_bitmap_index(bitmap_index)
+        count = session_manager.start_filter_session(Category('Torah'), shuffle=False)
+        assert [w['lemma_id'] for w in session_manager.current_words] == [21, 22, 23]
+        assert count == 3
+    
+    def test_builtin_due_filter_uses_bitmaps(self, session_manager, bitmap_index, monkeypatch):
+        """Test due-ordered filter sessions are answered without SQL selection"""
+        session_manager.attach_bitmap_index(bitmap_index)
+        monkeypatch.setattr(session_manager.db, 'select_lemma_ids', None)
+        assert session_manager.start_saved_filter_session('Biblical Verbs Due (Top 500)') >= 0
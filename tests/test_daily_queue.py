@@ -0,0 +1,87 @@
+"""
+Tests for DailyQueue
+Tests building today's queue once and reading it through counters
+"""
+
+import pytest
+
+import daily_queue
+from config import Config
+from daily_queue import DailyQueue
+
+
+@pytest.fixture
+def queue(database):
+    """A daily queue kept current by progress updates"""
+    queue = DailyQueue(database)
+    database.add_progress_listener(queue.update_progress)
+    return queue
+
+
+class TestBuild:
+    """Test materializing the queue"""
+    
+    def test_reviews_then_new_cards(self, database, queue):
+        """Test due reviews come first (most overdue first), then new words by rank"""
+        database.connection.execute('DELETE FROM user_progress WHERE lemma_id IN (1, 2, 3)')
+        database.connection.execute('UPDATE user_progress SET next_review = next_review - 5 WHERE lemma_id = 40')
+        lemma_ids = queue.remaining()
+        
+        assert lemma_ids[0] == 40
+        assert lemma_ids[-3:] == [1, 2, 3]
+        counts = queue.counts()
+        assert counts['new_total'] == 3
+        assert counts['reviews_total'] == len(lemma_ids) - 3
+    
+    def test_daily_limits(self, database, queue, monkeypatch):
+        """Test review and new-card quotas"""
+        monkeypatch.setattr(Config, 'REVIEWS_PER_DAY', 5)
+        monkeypatch.setattr(Config, 'NEW_CARDS_PER_DAY', 1)
+        database.connection.execute('DELETE FROM user_progress WHERE lemma_id IN (1, 2)')
+        assert len(queue.remaining()) == 6
+    
+    def test_built_once_per_day(self, database, queue, monkeypatch):
+        """Test later calls read the stored queue, and a new day rebuilds it"""
+        first = queue.remaining()
+        database.connection.execute('UPDATE user_progress SET next_review = NULL')
+        assert DailyQueue(database).remaining() == first  # Another launch the same day
+        
+        today = queue.day
+        monkeypatch.setattr(daily_queue, 'day_number', lambda: today + 1)
+        assert queue.remaining() == []
+        rows = database.connection.execute('SELECT COUNT(*) FROM daily_queue WHERE day = ?', (today,))
+        assert rows.fetchone()[0] == 0  # Yesterday's rows are dropped
+    
+    def test_upcoming_previews_tomorrow(self, database, queue, monkeypatch):
+        """Test the preview holds tomorrow's reviews and the next new cards, and writes nothing"""
+        monkeypatch.setattr(Config, 'NEW_CARDS_PER_DAY', 1)
+        database.connection.execute('DELETE FROM user_progress WHERE lemma_id IN (1, 2, 3)')
+        tomorrow = daily_queue.day_number() + 1
+        database.connection.execute('UPDATE user_progress SET next_review = ? WHERE lemma_id = 40', (tomorrow,))
+        lemma_ids = queue.upcoming()
+        
+        assert 40 in lemma_ids and 40 not in queue.remaining()
+        assert lemma_ids[-2:] == [1, 2]
+        rows = database.connection.execute('SELECT COUNT(*) FROM daily_queue WHERE day = ?', (tomorrow,))
+        assert rows.fetchone()[0] == 0
+
+
+class TestCounters:
+    """Test answers update the counters"""
+    
+    def test_answers_are_counted_once(self, database, queue):
+        """Test answering removes a card from the remaining slice"""
+        first = queue.remaining()[0]
+        database.update_progress(first, familiarity=3)
+        database.update_progress(first, familiarity=3)
+        
+        assert first not in queue.remaining()
+        assert queue.counts()['reviews_done'] == 1
+        assert queue.counts()['reviews_left'] == queue.counts()['reviews_total'] - 1
+    
+    def test_srs_session_reads_the_queue(self, session_manager, database):
+        """Test SRS sessions continue with the unanswered part of the queue"""
+        total = session_manager.start_srs_session()
+        word = session_manager.get_next_word()
+        database.update_progress(word['lemma_id'], familiarity=3)
+        assert session_manager.start_srs_session() == total - 1
@@ -27,6 +27,16 @@ class TestVocabularyManager:
         assert 'english' in word
         assert 'transliteration' in word
         assert 'part_of_speech' in word
+    
+    def test_count_vocabulary(self, vocab_manager):
+        """Test counting entries without loading them"""
+        assert vocab_manager.count() == 50
+        assert vocab_manager.vocabulary == []
+    
+    def test_count_populates_empty_database(self, empty_database):
+        """Test that an empty database gets the sample words"""
+        from data_manager import VocabularyManager
+        assert VocabularyManager(empty_database).count() == 50
 
 
 class TestProgressManager:
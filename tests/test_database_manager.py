@@ -30,6 +30,50 @@ class TestDatabaseInitialization:
         }
         
         assert expected_tables.issubset(tables), f"Missing tables: {expected_tables - tables}"
+    
+    def test_iso_dates_migrate_to_day_numbers(self, temp_db_path, empty_database):
+        """Test that ISO date strings from older databases become integer day numbers"""
+        from database_manager import DatabaseManager
+        from scheduler import date_to_day
+        
+        cursor = empty_database.connection.cursor()
+        cursor.execute('''
+            INSERT INTO user_progress (lemma_id, familiarity, last_reviewed, next_review)
+            VALUES (1, 3, '2025-03-01', '2025-03-04')
+        ''')
+        cursor.execute('PRAGMA user_version = 0')  # Databases from before the migration
+        empty_database.connection.commit()
+        
+        migrated = DatabaseManager(temp_db_path)
+        row = migrated.connection.execute(
+            'SELECT last_reviewed, next_review FROM user_progress WHERE lemma_id = 1'
+        ).fetchone()
+        migrated.close()
+        
+        assert row['last_reviewed'] == date_to_day(date(2025, 3, 1))
+        assert row['next_review'] == date_to_day(date(2025, 3, 4))
+    
+    def test_migration_runs_once(self, temp_db_path, empty_database):
+        """Test that databases already migrated skip the full-table migration"""
+        from database_manager import DatabaseManager
+        
+        assert empty_database.connection.execute('PRAGMA user_version').fetchone()[0] >= 1
+        empty_database.connection.execute(
+            "INSERT INTO user_progress (lemma_id, next_review) VALUES (1, '2025-03-04')"
+        )
+        empty_database.connection.commit()
+        
+        reopened = DatabaseManager(temp_db_path)
+        value = reopened.connection.execute('SELECT next_review FROM user_progress').fetchone()[0]
+        reopened.close()
+        assert value == '2025-03-04'
+    
+    def test_due_filter_uses_index(self, database):
+        """Test that due-card lookups are integer range scans on an index"""
+        cursor = database.connection.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN SELECT lemma_id FROM user_progress WHERE next_review <= 20000')
+        plan = ' '.join(row['detail'] for row in cursor.fetchall())
+        assert 'idx_user_progress_next_review' in plan
 
 
 class TestSampleData:
@@ -90,6 +134,28 @@ class TestVocabularyQueries:
         assert lemma_id == 1
 
 
+class TestSessionSelection:
+    """Test id selection and batch word fetches used by sessions"""
+    
+    def test_select_lemma_ids_with_limit(self, database):
+        """Test selecting ids in rank order with a limit"""
+        ids = database.select_lemma_ids('l.register = ?', ('modern',), limit=3)
+        assert ids == [2, 5, 26]
+    
+    def test_get_words_preserves_order(self, database):
+        """Test that batch fetches keep the requested order"""
+        words = database.get_words([7, 3, 42])
+        assert [w['lemma_id'] for w in words] == [7, 3, 42]
+        assert words[0]['hebrew'] == 'ספר'
+    
+    def test_sample_lemma_ids_are_distinct(self, database):
+        """Test random sampling returns distinct existing ids"""
+        ids = database.sample_lemma_ids(15)
+        assert len(ids) == 15
+        assert len(set(ids)) == 15
+        assert all(1 <= i <= 50 for i in ids)
+
+
 class TestUserProgress:
     """Test user progress tracking"""
     
@@ -111,6 +177,52 @@ class TestUserProgress:
         assert 'again' in stats
         assert 'not_studied' in stats
     
+    def test_stats_follow_every_change(self, database):
+        """Test trigger-maintained stats match a full recount after each kind of change"""
+        def recount():
+            cursor = database.connection.cursor()
+            cursor.execute('''
+                SELECT
+                    COUNT(CASE WHEN familiarity = 4 THEN 1 END) as easy,
+                    COUNT(CASE WHEN familiarity = 3 THEN 1 END) as good,
+                    COUNT(CASE WHEN familiarity = 2 THEN 1 END) as hard,
+                    COUNT(CASE WHEN familiarity = 1 THEN 1 END) as again,
+                    COUNT(CASE WHEN familiarity IS NULL OR familiarity = 0 THEN 1 END) as not_studied
+                FROM lemmas l
+                LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+            ''')
+            return dict(cursor.fetchone())
+        
+        connection = database.connection
+        changes = [
+            lambda: database.update_progress(1, familiarity=1),
+            lambda: connection.execute('DELETE FROM user_progress WHERE lemma_id = 2'),
+            lambda: database.update_progress(2, familiarity=4),
+            lambda: connection.execute(
+                "INSERT INTO lemmas (lemma_id, lemma, english, frequency_rank) VALUES (99, 'א', 'a', 99)"
+            ),
+            lambda: connection.execute('INSERT OR REPLACE INTO user_progress (lemma_id, familiarity) VALUES (3, 2)'),
+            lambda: connection.execute('DELETE FROM lemmas WHERE lemma_id = 4'),
+            lambda: connection.execute('DELETE FROM user_progress WHERE lemma_id = 4'),
+            lambda: connection.execute('UPDATE user_progress SET streak = 9'),
+        ]
+        assert database.get_vocabulary_stats() == recount()
+        for change in changes:
+            change()
+            assert database.get_vocabulary_stats() == recount()
+    
+    def test_stats_seeded_for_existing_databases(self, temp_db_path, database):
+        """Test databases from before the stats table get a one-off recount"""
+        expected = database.get_vocabulary_stats()
+        database.connection.execute('DELETE FROM stats_summary')
+        database.connection.execute('PRAGMA user_version = 1')
+        database.connection.commit()
+        
+        from database_manager import DatabaseManager
+        reopened = DatabaseManager(temp_db_path)
+        assert reopened.get_vocabulary_stats() == expected
+        reopened.close()
+    
     def test_progress_updates_next_review(self, database):
         """Test that updating progress sets next_review date"""
         database.update_progress(1, familiarity=4)  # Mark as easy
@@ -120,7 +232,7 @@ class TestUserProgress:
         row = cursor.fetchone()
         
         assert row is not None
-        assert row[0] is not None  # next_review should be set
+        assert isinstance(row[0], int)  # next_review is an integer day number
 
 
 class TestUserSettings:
@@ -145,6 +257,25 @@ class TestUserSettings:
         assert value == 'second'
 
 
+class TestAudioPaths:
+    """Test rendered clip paths recorded on lemmas"""
+    
+    def test_audio_path_round_trip(self, database):
+        """Test audio_path starts empty, is stored, and can be cleared"""
+        assert database.get_audio_path(1) is None
+        database.set_audio_path(1, 'ab/abcdef.aiff')
+        assert database.get_audio_path(1) == 'ab/abcdef.aiff'
+        database.set_audio_path(1, None)
+        assert database.get_audio_path(1) is None
+        assert database.get_audio_path(999999) is None
+    
+    def test_set_many_audio_paths(self, database):
+        """Test recording several clips in one call"""
+        database.set_audio_paths([(1, 'ab/one.wav'), (2, 'cd/two.wav')])
+        assert database.get_audio_path(1) == 'ab/one.wav'
+        assert database.get_audio_path(2) == 'cd/two.wav'
+
+
 class TestVariantsAndCategories:
     """Test variants and category queries"""
     
@@ -0,0 +1,114 @@
+"""
+Tests for the database inspector CLI
+Tests section selection, output formats and single-query grouped sections
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+import inspect_database
+from inspect_database import SECTIONS, main
+
+
+@pytest.fixture
+def db_file(database, temp_db_path):
+    """Path of a populated sample database"""
+    database.update_progress(1, 1)
+    database.update_progress(1, 1)
+    return temp_db_path
+
+
+def run(*argv):
+    out = io.StringIO()
+    assert main(list(argv), out=out) == 0
+    return out.getvalue()
+
+
+class TestSections:
+    """Test section output"""
+    
+    def test_default_prints_every_section_as_text(self, db_file):
+        """Test running without a command prints all sections"""
+        text = run('--db', db_file)
+        for title, *_ in SECTIONS.values():
+            assert title in text
+    
+    def test_selected_sections_only(self, db_file):
+        """Test only the requested sections are printed"""
+        text = run('show', 'pos', 'summary', '--db', db_file)
+        assert 'PARTS OF SPEECH DISTRIBUTION' in text
+        assert 'DATABASE SUMMARY' in text
+        assert 'ALL LEMMAS' not in text
+    
+    def test_options_before_the_command_are_kept(self, db_file):
+        """Test --db/--format given before the subcommand are not reset by its defaults"""
+        args = inspect_database.build_parser().parse_args(['--db', db_file, '--format', 'json', 'show', 'due'])
+        assert str(args.db) == db_file and args.fmt == 'json'
+        records = [json.loads(line) for line in run('--db', db_file, '--format', 'json', 'show', 'pos').splitlines()]
+        assert records and all(record['section'] == 'pos' for record in records)
+    
+    def test_unknown_section_is_an_error(self, db_file):
+        """Test an unknown section name exits with a usage error"""
+        with pytest.raises(SystemExit):
+            run('show', 'nonsense', '--db', db_file)
+    
+    def test_json_lines(self, db_file, database):
+        """Test JSON output is one object per row tagged with its section"""
+        records = [json.loads(line) for line in run('show', 'lemmas', '--format', 'json', '--db', db_file).splitlines()]
+        assert len(records) == database.count_lemmas()
+        assert all(record['section'] == 'lemmas' for record in records)
+        assert {'lemma', 'english', 'frequency_rank'} <= set(records[0])
+    
+    def test_csv(self, db_file):
+        """Test CSV output starts each section with a header row"""
+        rows = list(csv.reader(io.StringIO(run('show', 'pos', '--format', 'csv', '--db', db_file))))
+        assert rows[0] == ['section', 'part_of_speech', 'count']
+        assert all(row[0] == 'pos' for row in rows[1:])
+    
+    def test_categories_limited_per_group(self, db_file):
+        """Test at most --per-group words are listed for each category"""
+        records = [json.loads(line) for line in
+                   run('show', 'categories', '--per-group', '2', '--format', 'json', '--db', db_file).splitlines()]
+        per_category = {}
+        for record in records:
+            per_category[record['category']] = per_category.get(record['category'], 0) + 1
+        assert per_category
+        assert max(per_category.values()) <= 2
+    
+    def test_roots_only_lists_families(self, db_file):
+        """Test roots are listed only when shared by more than one word"""
+        records = [json.loads(line) for line in
+                   run('show', 'roots', '--format', 'json', '--db', db_file).splitlines()]
+        assert all(record['family_size'] > 1 for record in records)
+    
+    @pytest.mark.parametrize('section', ['categories', 'roots'])
+    def test_grouped_sections_use_one_query(self, db_file, section, monkeypatch):
+        """Test grouped sections issue a single SELECT however many groups exist"""
+        statements = []
+        original = inspect_database.stream_section
+        
+        def traced(db, name, args):
+            db.connection.set_trace_callback(statements.append)
+            return original(db, name, args)
+        
+        monkeypatch.setattr(inspect_database, 'stream_section', traced)
+        run('show', section, '--db', db_file)
+        selects = [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+        assert len(selects) == 1
+
+
+class TestAnalytics:
+    """Test analytics reports"""
+    
+    def test_leeches_report(self, db_file):
+        """Test the leech report lists words failed at least --threshold times"""
+        records = [json.loads(line) for line in
+                   run('analytics', 'leeches', '--threshold', '2', '--format', 'json', '--db', db_file).splitlines()]
+        assert [record['lemma_id'] for record in records] == [1]
+    
+    def test_difficulty_report_text(self, db_file):
+        """Test the difficulty report prints as text"""
+        assert 'DIFFICULTY' in run('analytics', 'difficulty', '--by', 'category', '--db', db_file)
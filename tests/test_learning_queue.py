@@ -0,0 +1,71 @@
+"""
+Tests for LearningQueue
+Tests card- and minute-based learning steps
+"""
+
+import pytest
+
+from learning_queue import LearningQueue
+
+
+class FakeClock:
+    """Manually advanced clock"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestLearningQueue:
+    """Test due ordering of re-queued cards"""
+    
+    def test_card_steps(self):
+        """Test a card comes back once enough other cards were shown"""
+        queue = LearningQueue([(2, 'cards')])
+        queue.push('a', 0, cards_shown=1)
+        assert not queue.has_due(2)
+        assert queue.pop(2) is None
+        assert queue.has_due(3)
+        assert queue.pop(3) == ('a', 0)
+        assert len(queue) == 0
+    
+    def test_minute_steps(self):
+        """Test a card comes back once its delay has passed"""
+        clock = FakeClock()
+        queue = LearningQueue([(1, 'cards'), (10, 'minutes')], clock=clock)
+        queue.push('a', 1, cards_shown=0)
+        assert not queue.has_due(100)
+        clock.now = 600
+        assert queue.pop(100) == ('a', 1)
+    
+    def test_force_returns_earliest_queued(self):
+        """Test that forcing shows waiting cards in queueing order"""
+        queue = LearningQueue([(10, 'cards'), (5, 'minutes')], clock=FakeClock())
+        queue.push('first', 1, 0)
+        queue.push('second', 0, 0)
+        assert queue.pop(0) is None
+        assert queue.pop(0, force=True) == ('first', 1)
+        assert queue.pop(0, force=True) == ('second', 0)
+    
+    def test_snapshot_round_trip(self):
+        """Test checkpointed cards keep their remaining delays"""
+        clock = FakeClock()
+        queue = LearningQueue([(3, 'cards'), (10, 'minutes')], clock=clock)
+        queue.push({'lemma_id': 1}, 0, cards_shown=4)
+        queue.push({'lemma_id': 2}, 1, cards_shown=4)
+        clock.now = 120
+        assert queue.snapshot() == [(1, 0, 7), (2, 1, 480)]
+        
+        restored = LearningQueue(queue.steps, clock=clock)
+        for lemma_id, step, due in queue.snapshot():
+            restored.restore({'lemma_id': lemma_id}, step, due)
+        assert restored.pop(7) == ({'lemma_id': 1}, 0)
+        clock.now = 600
+        assert restored.pop(7) == ({'lemma_id': 2}, 1)
+    
+    def test_unknown_unit_rejected(self):
+        """Test step unit validation"""
+        with pytest.raises(ValueError):
+            LearningQueue([(1, 'hours')])
@@ -0,0 +1,41 @@
+"""
+Tests for the memory profiler
+Tests retained-memory measurement and per-subsystem reports
+"""
+
+from memory_profile import measure, profile_subsystems
+
+
+class TestMeasure:
+    """Test single measurements"""
+    
+    def test_retained_result_is_counted(self):
+        """Test memory held by the result shows up as net bytes"""
+        result, report = measure('list', lambda: [object() for _ in range(10000)], lemmas=100)
+        assert len(result) == 10000
+        assert report.net_bytes > 10000 * 16
+        assert report.peak_bytes >= report.net_bytes
+        assert report.bytes_per_lemma == report.net_bytes / 100
+    
+    def test_garbage_is_not_counted(self):
+        """Test temporary allocations freed before returning are not retained"""
+        _, report = measure('temp', lambda: len([object() for _ in range(10000)]))
+        assert report.net_bytes < 10000 * 16
+        assert report.peak_bytes > 10000 * 16
+
+
+class TestSubsystems:
+    """Test the per-subsystem report"""
+    
+    def test_reports_group_by_module(self, synthetic_database):
+        """Test each subsystem is reported and attributed to its own module"""
+        db = synthetic_database(1000)
+        reports = {report.label: report for report in profile_subsystems(db)}
+        assert {'VocabularyManager.load', 'SessionManager()', 'BitmapIndex.build',
+                'start_category_session'} <= set(reports)
+        load = reports['VocabularyManager.load']
+        assert load.lemmas == 1000
+        assert load.by_module[0][0] == 'database_manager'
+        assert reports['BitmapIndex.build'].by_module[0][0] == 'bitmap_index'
+        # The full in-memory deck costs far more per lemma than the bitmap index
+        assert load.bytes_per_lemma > reports['BitmapIndex.build'].bytes_per_lemma
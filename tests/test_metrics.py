@@ -0,0 +1,92 @@
+"""
+Tests for Metrics
+Tests histograms, spans, the disabled fast path and exports
+"""
+
+import json
+
+from metrics import BUCKETS_MS, NULL_SPAN, Histogram, Metrics
+
+
+class TestHistogram:
+    """Test fixed-bucket histograms"""
+    
+    def test_bucketing(self):
+        """Test observations land in the first bucket whose bound covers them"""
+        histogram = Histogram()
+        for ms in (0.5, 1, 1.5, 30, 99999):
+            histogram.observe(ms)
+        assert histogram.counts[0] == 2          # <= 1 ms
+        assert histogram.counts[1] == 1          # <= 2 ms
+        assert histogram.counts[BUCKETS_MS.index(50)] == 1
+        assert histogram.counts[-1] == 1         # overflow
+        assert histogram.count == 5
+    
+    def test_percentiles(self):
+        """Test percentiles are interpolated within the bucket"""
+        histogram = Histogram()
+        for _ in range(95):
+            histogram.observe(3)    # (2, 5] bucket
+        for _ in range(5):
+            histogram.observe(150)  # (100, 200] bucket
+        assert 2 < histogram.percentile(50) <= 5
+        assert histogram.percentile(95) <= 5
+        assert 100 < histogram.percentile(99) <= 200
+        assert Histogram().percentile(95) is None
+
+
+class TestMetrics:
+    """Test spans and exports"""
+    
+    def test_disabled_is_a_no_op(self):
+        """Test disabled metrics record nothing and reuse one null span"""
+        metrics = Metrics(enabled=False)
+        assert metrics.span('a') is NULL_SPAN
+        with metrics.span('a'):
+            pass
+        metrics.observe('b', 5)
+        assert metrics.timed('c')(lambda: 42)() == 42
+        assert metrics.histograms == {}
+    
+    def test_spans_and_decorator(self):
+        """Test spans and decorated calls are recorded"""
+        metrics = Metrics(enabled=True)
+        with metrics.span('block'):
+            pass
+        calls = metrics.timed('call')(lambda x: x * 2)
+        assert calls(2) == 4 and calls(3) == 6
+        snapshot = metrics.snapshot()
+        assert snapshot['block']['count'] == 1
+        assert snapshot['call']['count'] == 2
+        assert snapshot['call']['p95_ms'] is not None
+    
+    def test_span_records_on_error(self):
+        """Test a span still records when its block raises"""
+        metrics = Metrics(enabled=True)
+        try:
+            with metrics.span('failing'):
+                raise ValueError
+        except ValueError:
+            pass
+        assert metrics.histograms['failing'].count == 1
+    
+    def test_prometheus_export(self):
+        """Test cumulative buckets, sum and count in seconds"""
+        metrics = Metrics(enabled=True)
+        metrics.observe('show_answer', 3)
+        metrics.observe('show_answer', 300)
+        text = metrics.to_prometheus()
+        assert '# TYPE hebrew_learning_span_seconds histogram' in text
+        assert 'hebrew_learning_span_seconds_bucket{span="show_answer",le="0.005"} 1' in text
+        assert 'hebrew_learning_span_seconds_bucket{span="show_answer",le="+Inf"} 2' in text
+        assert 'hebrew_learning_span_seconds_count{span="show_answer"} 2' in text
+        assert 'hebrew_learning_span_seconds_sum{span="show_answer"} 0.303' in text
+    
+    def test_write_by_suffix(self, tmp_path):
+        """Test .prom files get Prometheus text and others a JSON snapshot"""
+        metrics = Metrics(enabled=True)
+        metrics.observe('mark_answer', 12)
+        metrics.write(tmp_path / 'metrics.prom')
+        metrics.write(tmp_path / 'metrics.json')
+        assert (tmp_path / 'metrics.prom').read_text().startswith('# HELP')
+        assert json.loads((tmp_path / 'metrics.json').read_text())['mark_answer']['count'] == 1
@@ -0,0 +1,37 @@
+"""
+Tests for Permutation
+Tests the seeded Feistel permutation used for lazy shuffled sessions
+"""
+
+import pytest
+
+from permutation import ShuffledRange
+
+
+class TestShuffledRange:
+    """Test permutation properties"""
+    
+    @pytest.mark.parametrize('n', [1, 2, 7, 64, 1000, 1025])
+    def test_is_a_permutation(self, n):
+        """Test every index appears exactly once"""
+        assert sorted(ShuffledRange(n, seed=42)) == list(range(n))
+    
+    def test_same_seed_same_order(self):
+        """Test that (n, seed) fully determines the order"""
+        assert list(ShuffledRange(500, seed=7)) == list(ShuffledRange(500, seed=7))
+    
+    def test_different_seeds_differ(self):
+        """Test that seeds change the order"""
+        assert list(ShuffledRange(500, seed=1)) != list(ShuffledRange(500, seed=2))
+    
+    def test_actually_shuffles(self):
+        """Test the order is not the identity"""
+        order = list(ShuffledRange(1000, seed=3))
+        assert sum(1 for i, v in enumerate(order) if i == v) < 20
+    
+    def test_huge_range_is_random_access(self):
+        """Test that a billion-element permutation needs no setup"""
+        order = ShuffledRange(10 ** 9, seed=5)
+        assert 0 <= order[123456789] < 10 ** 9
+        with pytest.raises(IndexError):
+            order[10 ** 9]
@@ -0,0 +1,208 @@
+"""
+Tests for query plans
+Every registered statement must stay indexed on a large synthetic deck, and every
+statement the data layer runs must be registered
+"""
+
+import os
+import shutil
+
+import pytest
+
+from analytics import Analytics
+from audio_cache import AudioCache
+from audio_pack import AudioPack, pack_path
+from bitmap_index import BitmapIndex
+from database_manager import DatabaseManager
+from query_plans import STATEMENTS, Statement, _session, explain, plan_problems, table_aliases, unregistered
+from review_history import load_history
+from scheduler import day_number
+from session_filters import DEFAULT_FILTERS, Field, list_saved_filters
+from session_manager import SessionManager
+from synthetic_deck import cached_deck
+from weighted_sampler import WeaknessSampler
+
+# Big enough that SQLite's statistics favour indexes the way they would on a real deck
+PLAN_DECK_LEMMAS = 10000
+
+
+@pytest.fixture(scope='module')
+def large_deck(tmp_path_factory):
+    """One synthetic deck shared by the plan checks (EXPLAIN only reads)"""
+    path = tmp_path_factory.mktemp('plans') / 'deck.db'
+    shutil.copyfile(cached_deck(PLAN_DECK_LEMMAS), path)
+    db = DatabaseManager(path)
+    yield db.connection
+    db.close()
+
+
+def exercise(db):
+    """Run every query path of the data layer once, tracing from after its own lookups"""
+    cursor = db.connection.cursor()
+    cursor.execute('SELECT root FROM lemmas WHERE root IS NOT NULL LIMIT 1')
+    root = cursor.fetchone()[0]
+    cursor.execute('SELECT name FROM categories LIMIT 1')
+    category = cursor.fetchone()[0]
+    db.tracer.reset()
+
+    session = SessionManager(db)
+    starts = [
+        lambda: session.start_session(),
+        lambda: session.start_session(50),
+        lambda: session.start_custom_session(10, 100),
+        lambda: session.start_register_session('biblical'),
+        lambda: session.start_part_of_speech_session('verb'),
+        lambda: session.start_root_family_session(root),
+        lambda: session.start_category_session(category),
+        lambda: session.start_weak_words_session(),
+        lambda: session.start_strong_words_session(),
+        lambda: session.practice_difficult_words(100),
+        lambda: session.start_random_session(),
+        lambda: session.start_smart_random_session(),
+        lambda: session.start_new_words_session(),
+        lambda: session.start_srs_session(),
+        *[lambda name=name: session.start_saved_filter_session(name) for name in DEFAULT_FILTERS],
+    ]
+    for start in starts:
+        start()
+        for answer in ('again', 'good'):
+            word = session.get_next_word()
+            if word is None:
+                break
+            session.record_answer(answer)
+            db.update_progress(word['lemma_id'], 1 if answer == 'again' else 3)
+            session.advance()
+    session.resume_session()
+    session.daily_queue.counts()
+    session.daily_queue.upcoming()
+    new_cards = [word for word in db.get_words(session.daily_queue.remaining()) if not word['familiarity']]
+    db.update_progress(new_cards[0]['lemma_id'], 3)
+    db.delete_checkpoint(session.checkpoint_id)
+
+    lemma_id = db.get_lemma_id_by_rank(1)
+    db.get_all_vocabulary()
+    db.get_words([lemma_id, lemma_id + 1])
+    db.get_lemma_variants(lemma_id)
+    db.get_lemma_categories(lemma_id)
+    db.get_lemma_translations(lemma_id)
+    db.set_audio_path(lemma_id, db.get_audio_path(lemma_id))
+    db.set_audio_paths([(lemma_id, db.get_audio_path(lemma_id))])
+    db.get_vocabulary_stats()
+    db.count_lemmas()
+    db.save_setting('theme', 'dark')
+    list_saved_filters(db)
+    db.rebuild_stats()
+    load_history(db, day_number())
+
+    analytics = Analytics(db)
+    analytics.retention_by_interval()
+    analytics.card_lapses()
+    analytics.leeches()
+    analytics.difficulty('part_of_speech')
+    analytics.difficulty('category')
+
+    BitmapIndex.build(db)
+    WeaknessSampler.build(db)
+
+    pack = AudioPack(db, pack_path(db.db_path))
+    pack.add([(lemma_id, b'clip', '.wav'), (lemma_id + 1, b'clip', '.wav'), (lemma_id + 2, b'tail', '.wav')])
+    pack.read(lemma_id)
+    cache = AudioCache(db.db_path.parent / 'audio')
+    pack.add_from_cache(cache)
+    cache.close()
+    os.truncate(pack.path, pack.path.stat().st_size - 2)  # Cut short, so compacting drops a row
+    pack.compact()
+    pack.stats()
+    pack.close()
+
+
+class TestPlans:
+    """Test registered statements against a large deck"""
+    
+    @pytest.mark.parametrize('name', sorted(STATEMENTS))
+    def test_registered_statement_is_indexed(self, large_deck, name):
+        """Test no plan scans a large table or sorts for ORDER BY unless its entry allows it"""
+        assert plan_problems(large_deck, STATEMENTS[name]) == []
+    
+    def test_full_scan_is_reported(self, large_deck):
+        """Test an unindexed filter on lemmas fails, through its alias too"""
+        for sql in ('SELECT lemma_id FROM lemmas WHERE english = ?',
+                    'SELECT l.lemma_id FROM lemmas l WHERE l.english = ?'):
+            problems = plan_problems(large_deck, Statement(sql))
+            assert len(problems) == 1 and problems[0].startswith('full scan of lemmas')
+        assert plan_problems(large_deck, Statement('SELECT lemma_id FROM lemmas WHERE english = ?',
+                                                   scans={'lemmas'})) == []
+    
+    def test_order_by_sort_is_reported(self, large_deck):
+        """Test sorting for an ORDER BY no index serves fails unless allowed"""
+        sql = 'SELECT lemma_id FROM lemmas WHERE part_of_speech = ? ORDER BY english'
+        problems = plan_problems(large_deck, Statement(sql))
+        assert len(problems) == 1 and problems[0].startswith('sort for ORDER BY')
+        assert plan_problems(large_deck, Statement(sql, sorts=True)) == []
+    
+    def test_small_tables_may_be_scanned(self, large_deck):
+        """Test scans of tables that do not grow with the deck pass"""
+        assert plan_problems(large_deck, Statement('SELECT name FROM categories')) == []
+    
+    def test_familiarity_in_list_would_scan(self, large_deck):
+        """Test why weak-word sessions use a range: an IN list scans every lemma and sorts"""
+        problems = plan_problems(large_deck, _session(Field('familiarity', 'in', (1, 2, 3, 4)), 'weakest', 20))
+        assert any(problem.startswith('full scan of lemmas') for problem in problems)
+    
+    def test_explain_binds_parameters(self, large_deck):
+        """Test statements explain without sample values, question marks in strings aside"""
+        assert explain(large_deck, "SELECT lemma_id FROM lemmas WHERE frequency_rank = ? AND notes != '?'")
+
+
+class TestRegistry:
+    """Test statements are registered centrally"""
+    
+    def test_data_layer_statements_are_registered(self, synthetic_database):
+        """Test every statement the data layer runs has a registry entry"""
+        db = synthetic_database(1000, trace=True)
+        exercise(db)
+        assert len(db.tracer.statements) > 40
+        assert unregistered(db.tracer.statements) == []
+        assert unregistered(db.tracer.traced) == []  # What SQLite ran, however it was issued
+    
+    def test_connection_shortcuts_are_checked(self, synthetic_database):
+        """Test a statement run through connection.execute is caught as unregistered"""
+        db = synthetic_database(1000, trace=True)
+        db.connection.execute('SELECT lemma_id FROM lemmas WHERE notes = ?', ('x',)).fetchall()
+        missing = ['SELECT lemma_id FROM lemmas WHERE notes = ?']
+        assert unregistered(db.tracer.statements) == unregistered(db.tracer.traced) == missing
+    
+    def test_registry_has_no_stale_entries(self, synthetic_database, temp_db_path):
+        """Test every registered statement is still run by the data layer"""
+        db = synthetic_database(1000, trace=True)
+        exercise(db)
+        sample = DatabaseManager(temp_db_path, trace=True)
+        try:
+            sample.tracer.reset()
+            sample.populate_sample_data()
+            run = set(db.tracer.statements) | set(sample.tracer.statements)
+        finally:
+            sample.close()
+        assert [name for name, statement in STATEMENTS.items() if statement.key not in run] == []
+    
+    def test_sample_data_statements_are_registered(self, temp_db_path):
+        """Test the sample-data loader's inserts are registered too"""
+        db = DatabaseManager(temp_db_path, trace=True)
+        try:
+            db.tracer.reset()
+            db.populate_sample_data()
+            assert unregistered(db.tracer.statements) == []
+        finally:
+            db.close()
+    
+    def test_new_statement_is_unregistered(self):
+        """Test a query missing from the registry is caught, whatever its values and spacing"""
+        sql = 'SELECT lemma_id FROM lemmas WHERE english = ?'
+        assert unregistered([sql, 'PRAGMA data_version']) == [sql]
+        assert unregistered(["SELECT value  FROM user_settings WHERE key = 'theme'"]) == []
+    
+    def test_aliases_resolve_to_tables(self):
+        """Test plan names map back to tables, keywords aside"""
+        aliases = table_aliases(STATEMENTS['session.category'].sql)
+        assert aliases['l'] == 'lemmas' and aliases['up'] == 'user_progress'
+        assert aliases['lc'] == 'lemma_categories' and 'WHERE' not in aliases
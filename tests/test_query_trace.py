@@ -0,0 +1,99 @@
+"""
+Tests for query tracing
+Tests SQL normalization and per-statement aggregation on a traced DatabaseManager
+"""
+
+import pytest
+
+from database_manager import DatabaseManager
+from query_trace import normalize_sql
+
+
+@pytest.fixture
+def traced_db(temp_db_path):
+    """Sample database opened with tracing on, counters cleared after setup"""
+    db = DatabaseManager(temp_db_path, trace=True)
+    db.populate_sample_data()
+    db.tracer.reset()
+    yield db
+    db.close()
+
+
+class TestNormalize:
+    """Test statement normalization"""
+    
+    def test_literals_and_whitespace(self):
+        """Test values become placeholders and whitespace is squeezed"""
+        assert normalize_sql("SELECT *\n  FROM lemmas WHERE lemma_id = 42 AND lemma = 'it''s'") == \
+            "SELECT * FROM lemmas WHERE lemma_id = ? AND lemma = ?"
+    
+    def test_in_lists_collapse(self):
+        """Test IN lists of any length share one key"""
+        assert normalize_sql("WHERE id IN (?, ?, ?)") == normalize_sql("WHERE id IN (1,2)") == "WHERE id IN (?, ...)"
+    
+    def test_expanded_parameters_match(self):
+        """Test the trace callback's expanded values key like the bound statement"""
+        assert normalize_sql("SELECT lemma_id FROM daily_queue WHERE day = 7 ORDER BY position LIMIT -1") == \
+            normalize_sql("SELECT lemma_id FROM daily_queue WHERE day = ? ORDER BY position LIMIT ?")
+        assert normalize_sql("UPDATE lemmas SET audio_path = NULL WHERE notes IS NOT NULL AND day - 1") == \
+            "UPDATE lemmas SET audio_path = ? WHERE notes IS NOT NULL AND day - ?"
+    
+    def test_identifiers_keep_digits(self):
+        """Test digits inside identifiers are not treated as literals"""
+        assert normalize_sql("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+
+class TestTracer:
+    """Test per-statement aggregation"""
+    
+    def test_off_by_default(self, database):
+        """Test tracing is opt-in"""
+        assert database.tracer is None
+        assert database.query_stats() == []
+    
+    def test_repeated_lookups_aggregate(self, traced_db):
+        """Test an N+1 loop shows up as one statement with a high count"""
+        for lemma_id in range(1, 11):
+            traced_db.get_lemma_variants(lemma_id)
+        stats = [row for row in traced_db.query_stats() if 'FROM variants' in row['sql']]
+        assert len(stats) == 1
+        assert stats[0]['calls'] == 10
+        assert stats[0]['rows'] == sum(len(traced_db.get_lemma_variants(i)) for i in range(1, 11))
+        assert stats[0]['max_ms'] <= stats[0]['total_ms']
+    
+    def test_iterated_rows_are_counted(self, traced_db):
+        """Test rows read by iterating a cursor are counted"""
+        cursor = traced_db.connection.cursor()
+        cursor.execute('SELECT lemma_id FROM lemmas WHERE frequency_rank <= 5')
+        assert len(list(cursor)) == 5
+        row, = [r for r in traced_db.query_stats() if 'frequency_rank <= ?' in r['sql']]
+        assert row['rows'] == 5
+    
+    def test_connection_shortcuts_are_timed(self, traced_db):
+        """Test connection.execute/executemany go through traced cursors too"""
+        rows = traced_db.connection.execute('SELECT lemma_id FROM lemmas WHERE frequency_rank <= 3').fetchall()
+        traced_db.connection.executemany('UPDATE lemmas SET notes = notes WHERE lemma_id = ?', [(1,), (2,)])
+        stats = {row['sql']: row for row in traced_db.query_stats()}
+        assert stats['SELECT lemma_id FROM lemmas WHERE frequency_rank <= ?']['rows'] == len(rows) == 3
+        assert stats['UPDATE lemmas SET notes = notes WHERE lemma_id = ?']['calls'] == 1
+        engine_only = dict(traced_db.tracer.engine_only())
+        assert not any('frequency_rank' in sql or 'SET notes' in sql for sql in engine_only)
+    
+    def test_trigger_runs_traced(self, traced_db):
+        """Test trigger bodies count as extra engine runs of the firing statement"""
+        traced_db.update_progress(1, 3)
+        progress, = [r for r in traced_db.query_stats() if r['sql'].startswith('INSERT INTO user_progress')]
+        assert progress['calls'] == 1
+        assert progress['engine_runs'] > 1
+    
+    def test_implicit_transactions_traced(self, traced_db):
+        """Test statements no cursor issued are reported separately"""
+        traced_db.update_progress(1, 3)
+        assert 'BEGIN' in dict(traced_db.tracer.engine_only())
+    
+    def test_dump(self, traced_db, tmp_path):
+        """Test the report is written as JSON"""
+        traced_db.get_vocabulary_stats()
+        path = tmp_path / 'trace.json'
+        traced_db.tracer.dump(path)
+        assert 'stats_summary' in path.read_text()
@@ -0,0 +1,89 @@
+"""
+Tests for Review History
+Tests per-day review aggregates and the heatmap/trend shaping
+"""
+
+import pytest
+
+import review_history
+from scheduler import day_number, day_to_date
+
+
+class TestDailyAggregates:
+    """Test that answers update the per-day table"""
+    
+    def test_answers_are_aggregated(self, empty_database):
+        """Test reviews, recall, lapses, new cards and time are summed per day"""
+        cursor = empty_database.connection.cursor()
+        cursor.executemany(
+            "INSERT INTO lemmas (lemma_id, lemma, frequency_rank) VALUES (?, 'x', ?)",
+            [(i, i) for i in range(1, 4)]
+        )
+        empty_database.update_progress(1, familiarity=3, duration_ms=4000)
+        empty_database.update_progress(2, familiarity=1, duration_ms=6000)
+        empty_database.update_progress(1, familiarity=4)
+        
+        today = day_number()
+        [row] = empty_database.get_review_history(today - 365, today)
+        assert row == {'day': today, 'reviews': 3, 'correct': 2, 'lapses': 1, 'new_cards': 2, 'time_ms': 10000}
+    
+    def test_history_is_a_key_range_read(self, database):
+        """Test a year of history uses the primary key, not a scan"""
+        cursor = database.connection.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN SELECT * FROM daily_review_stats WHERE day BETWEEN 1 AND 365')
+        plan = ' '.join(row['detail'] for row in cursor.fetchall())
+        assert 'SEARCH' in plan
+    
+    def test_session_times_answers(self, session_manager, monkeypatch):
+        """Test answer time is measured from showing the card, with a cap"""
+        import session_manager as module
+        clock = iter([100.0, 103.5, 200.0, 900.0])
+        monkeypatch.setattr(module.time, 'monotonic', lambda: next(clock))
+        session_manager.start_session(limit=5)
+        session_manager.get_next_word()
+        assert session_manager.answer_time_ms() == 3500
+        session_manager.advance()
+        session_manager.get_next_word()
+        assert session_manager.answer_time_ms() == 60000
+
+
+def row(day, reviews, correct=0, time_ms=0, new_cards=0):
+    return {'day': day, 'reviews': reviews, 'correct': correct, 'lapses': 0,
+            'new_cards': new_cards, 'time_ms': time_ms}
+
+
+class TestShaping:
+    """Test heatmap and trend data"""
+    
+    def test_heatmap_calendar(self):
+        """Test weeks start on Monday and levels scale to the busiest day"""
+        today = day_number()
+        history = {today: row(today, 40), today - 1: row(today - 1, 10)}
+        weeks = review_history.heatmap_weeks(history, today, days=365)
+        
+        cells = [cell for week in weeks for cell in week if cell]
+        assert len(cells) == 365
+        assert all(len(week) == 7 for week in weeks)
+        assert day_to_date(weeks[1][0][0]).weekday() == 0
+        levels = {day: level for day, _, level in cells}
+        assert levels[today] == review_history.HEAT_LEVELS
+        assert levels[today - 1] == 1
+        assert levels[today - 2] == 0
+    
+    def test_trend_and_summary(self):
+        """Test daily retention, minutes and the running streak"""
+        today = day_number()
+        history = {
+            today - 1: row(today - 1, 10, correct=8, time_ms=120000, new_cards=2),
+            today - 2: row(today - 2, 5, correct=5),
+            today - 4: row(today - 4, 5, correct=2),
+        }
+        points = review_history.trend(history, today, days=5)
+        assert points[-1] == (today, 0, None, 0.0)
+        assert points[-2] == (today - 1, 10, pytest.approx(0.8), pytest.approx(2.0))
+        
+        totals = review_history.summary(history, today)
+        assert totals['streak'] == 2
+        assert totals['reviews'] == 20
+        assert totals['retention'] == pytest.approx(0.75)
+        assert totals['days_studied'] == 3
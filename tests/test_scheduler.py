@@ -0,0 +1,92 @@
+"""
+Tests for Review Scheduling
+Tests study-day numbering, due-date load balancing and the due-count histogram
+"""
+
+import pytest
+from collections import Counter
+from datetime import date, datetime, timezone
+
+from config import Config
+from scheduler import DueLoadBalancer, day_number, date_to_day, day_to_date
+
+
+class TestDayNumbers:
+    """Test integer study-day numbering"""
+    
+    def test_epoch_is_day_zero(self):
+        """Test the day-number origin"""
+        assert date_to_day(date(1970, 1, 1)) == 0
+        assert day_to_date(date_to_day(date(2025, 3, 14))) == date(2025, 3, 14)
+    
+    def test_rollover_hour_belongs_to_previous_day(self, monkeypatch):
+        """Test that reviews before the rollover hour count for the previous day"""
+        monkeypatch.setattr(Config, 'DAY_ROLLOVER_HOUR', 4)
+        monkeypatch.setattr(Config, 'TIMEZONE', None)
+        late_night = datetime(2025, 3, 15, 2, 30)
+        morning = datetime(2025, 3, 15, 9, 0)
+        assert day_number(late_night) == date_to_day(date(2025, 3, 14))
+        assert day_number(morning) == date_to_day(date(2025, 3, 15))
+    
+    def test_timezone_is_applied(self, monkeypatch):
+        """Test that aware timestamps are converted to the configured timezone"""
+        monkeypatch.setattr(Config, 'DAY_ROLLOVER_HOUR', 0)
+        monkeypatch.setattr(Config, 'TIMEZONE', 'Asia/Jerusalem')
+        utc_evening = datetime(2025, 3, 14, 23, 0, tzinfo=timezone.utc)
+        assert day_number(utc_evening) == date_to_day(date(2025, 3, 15))
+
+
+class TestFuzzWindow:
+    """Test tolerance window sizing"""
+    
+    def test_short_intervals_are_not_moved(self, database):
+        """Test that again/hard intervals keep their exact date"""
+        balancer = DueLoadBalancer(database.connection)
+        today = 20000
+        assert balancer.fuzz_days(0) == 0
+        assert balancer.pick_due_date(today, 1) == today + 1
+    
+    def test_window_grows_with_interval(self, database):
+        """Test that longer intervals get a wider window"""
+        balancer = DueLoadBalancer(database.connection)
+        assert balancer.fuzz_days(7) == 1
+        assert balancer.fuzz_days(30) == 3
+
+
+class TestLoadBalancing:
+    """Test least-loaded day selection"""
+    
+    def test_picks_emptiest_day(self, database):
+        """Test that the day with the fewest reviews wins"""
+        balancer = DueLoadBalancer(database.connection)
+        today = 20000
+        balancer.due_counts = {today + 6: 5, today + 7: 9, today + 8: 2}
+        assert balancer.pick_due_date(today, 7) == today + 8
+    
+    def test_ties_prefer_nominal_interval(self, database):
+        """Test that an empty window keeps the nominal date"""
+        balancer = DueLoadBalancer(database.connection)
+        balancer.due_counts = {}
+        today = 20000
+        assert balancer.pick_due_date(today, 7) == today + 7
+    
+    def test_move_updates_histogram(self, database):
+        """Test incremental histogram maintenance"""
+        balancer = DueLoadBalancer(database.connection)
+        day = 20007
+        balancer.due_counts = {day: 1}
+        balancer.move(day, day + 1)
+        assert day not in balancer.due_counts
+        assert balancer.due_counts[day + 1] == 1
+    
+    def test_batch_is_spread_across_window(self, empty_database):
+        """Test that a batch answered on one day does not fall due together"""
+        for lemma_id in range(1, 22):
+            empty_database.update_progress(lemma_id, familiarity=4)
+        
+        cursor = empty_database.connection.cursor()
+        cursor.execute('SELECT next_review FROM user_progress')
+        due_days = Counter(row[0] for row in cursor.fetchall())
+        
+        assert len(due_days) == 3
+        assert max(due_days.values()) - min(due_days.values()) <= 1
@@ -0,0 +1,111 @@
+"""
+Tests for Session Filters
+Tests filter expression compilation, serialization and saved filters
+"""
+
+import pytest
+
+from session_filters import (
+    Filter, Field, Category, Due, New, All, And, Or, Not,
+    save_filter, load_filter, list_saved_filters
+)
+
+
+class TestCompilation:
+    """Test compiling filter expressions to SQL"""
+    
+    def test_field_equality(self):
+        """Test a single field comparison"""
+        sql, params = Field('register', '=', 'biblical').compile()
+        assert sql == 'l.register = ?'
+        assert params == ('biblical',)
+    
+    def test_combined_expression(self):
+        """Test and/or combinations keep parameter order"""
+        flt = Field('part_of_speech', '=', 'verb') & (Category('Torah') | Field('rank', '<=', 100))
+        sql, params = flt.compile()
+        assert ' AND ' in sql and ' OR ' in sql
+        assert params == ('verb', 'Torah', 100)
+    
+    def test_unknown_field_rejected(self):
+        """Test that arbitrary column names cannot reach the SQL"""
+        with pytest.raises(ValueError):
+            Field('english; DROP TABLE lemmas', '=', 'x')
+    
+    def test_empty_combinations(self):
+        """Test an empty and matches everything and an empty or matches nothing"""
+        assert And().compile() == ('1', ())
+        assert Or().compile() == ('0', ())
+    
+    def test_unknown_operator_rejected(self):
+        """Test operator whitelist"""
+        with pytest.raises(ValueError):
+            Field('rank', 'LIKE', '%')
+
+
+class TestSerialization:
+    """Test JSON round-trips"""
+    
+    def test_round_trip(self):
+        """Test that to_json/from_json rebuilds an equal filter"""
+        flt = (Field('rank', 'between', (1, 500)) & Due()) | ~New()
+        assert Filter.from_json(flt.to_json()) == flt
+
+
+class TestFilterSessions:
+    """Test filters evaluated against the database"""
+    
+    def test_biblical_verbs_due(self, session_manager):
+        """Test a multi-criterion filter session"""
+        flt = Field('register', 'in', ('biblical', 'both')) & Field('part_of_speech', '=', 'verb') & Due()
+        count = session_manager.start_filter_session(flt, order='due', limit=500)
+        assert count > 0
+        for word in session_manager.current_words:
+            assert word['part_of_speech'] == 'verb'
+            assert word['register'] in ('biblical', 'both')
+    
+    def test_not_keeps_unstudied_words(self, session_manager, database):
+        """Test that NOT over a progress field still matches words without progress"""
+        database.connection.execute('DELETE FROM user_progress WHERE lemma_id = 50')
+        session_manager.start_filter_session(Not(Field('familiarity', '=', 1)))
+        assert 50 in {w['lemma_id'] for w in session_manager.current_words}
+    
+    def test_all_words(self, session_manager):
+        """Test the match-everything filter"""
+        assert session_manager.start_filter_session(All()) == 50
+
+
+class TestSavedFilters:
+    """Test storing filters in user_settings"""
+    
+    def test_save_and_load(self, database):
+        """Test that a saved filter comes back with its order and limit"""
+        flt = Category('Verbs') & Field('streak', '<', 3)
+        save_filter(database, 'Shaky verbs', flt, order='weakest', limit=25)
+        loaded, order, limit = load_filter(database, 'Shaky verbs')
+        assert loaded == flt
+        assert (order, limit) == ('weakest', 25)
+        assert 'Shaky verbs' in list_saved_filters(database)
+    
+    @pytest.mark.parametrize('stored', [
+        'not json',
+        '{"filter": {"all": true}, "order": "sideways"}',
+        '{"filter": {"field": "english", "op": "=", "value": "x"}}',
+        '{"order": "rank"}',
+        '{"filter": {"all": true}, "limit": "ten"}',
+    ])
+    def test_invalid_saved_filter_is_ignored(self, database, session_manager, stored):
+        """Test a corrupt saved spec reads as missing instead of raising"""
+        database.save_setting('filter:Broken', stored)
+        assert load_filter(database, 'Broken') is None
+        assert session_manager.start_saved_filter_session('Broken') == 0
+    
+    def test_builtin_filters_are_listed(self, database):
+        """Test that built-in filters are offered without being saved"""
+        assert 'Biblical Verbs Due (Top 500)' in list_saved_filters(database)
+    
+    def test_start_saved_filter_session(self, session_manager):
+        """Test starting a session by saved filter name"""
+        count = session_manager.start_saved_filter_session('Biblical Verbs Due (Top 500)')
+        assert count >= 0
+        assert session_manager.start_saved_filter_session('No such filter') == 0
@@ -5,6 +5,10 @@ Tests study session logic and word selection
 
 import pytest
 
+from config import Config
+from session_filters import All, Due, Field
+from session_manager import SessionManager
+
 
 class TestSessionStart:
     """Test session initialization"""
@@ -56,6 +60,16 @@ class TestStudyModes:
         for word in session_manager.current_words:
             assert word['register'] == 'modern'
     
+    def test_start_srs_session(self, session_manager):
+        """Test that due cards are selected by integer day number"""
+        from scheduler import day_number
+        
+        count = session_manager.start_srs_session()
+        # Sample lemmas 21-50 are always due today; the daily queue may add new words
+        assert count >= 30
+        for word in session_manager.current_words:
+            assert word['next_review'] is None or word['next_review'] <= day_number()
+    
     def test_start_root_family_session(self, session_manager):
         """Test studying words from same root"""
         # Root 'ילד' has multiple words (ילד, ילדה)
@@ -63,6 +77,87 @@ class TestStudyModes:
         assert count >= 1
 
 
+class TestSqlSelection:
+    """Test that study modes are selected by indexed SQL queries"""
+    
+    def test_category_session(self, session_manager):
+        """Test category membership is resolved in SQL"""
+        count = session_manager.start_category_session('Torah')
+        assert count == 3
+        assert {w['lemma_id'] for w in session_manager.current_words} == {21, 22, 23}
+    
+    def test_weak_words_are_weakest_first(self, session_manager):
+        """Test weak-word ordering and limit come from ORDER BY/LIMIT"""
+        count = session_manager.start_weak_words_session(limit=5)
+        assert count == 5
+        keys = [(w['familiarity'], w['easiness']) for w in session_manager.current_words]
+        assert keys == sorted(keys)
+    
+    def test_difficult_words_in_top_n(self, session_manager):
+        """Test difficult words are limited to Hard/Again within the rank cutoff"""
+        session_manager.practice_difficult_words(30)
+        for word in session_manager.current_words:
+            assert word['rank'] <= 30
+            assert word['familiarity'] in (None, 0, 1, 2)
+    
+    def test_new_words_session_selects_unstudied(self, session_manager, database):
+        """Test new words are unstudied lemmas in rank order"""
+        database.connection.execute('DELETE FROM user_progress WHERE lemma_id IN (40, 45)')
+        count = session_manager.start_new_words_session(limit=10)
+        assert count == 2
+        assert [w['lemma_id'] for w in session_manager.current_words] == [40, 45]
+    
+    def test_unknown_field_is_rejected(self, session_manager):
+        """Test that only whitelisted columns reach the SQL"""
+        with pytest.raises(ValueError):
+            session_manager.start_by_field('english; DROP TABLE lemmas', 'x')
+    
+    def test_rank_range_uses_index(self, database):
+        """Test the rank-range selection is an index range scan"""
+        cursor = database.connection.cursor()
+        cursor.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT l.lemma_id FROM lemmas l
+            LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+            WHERE l.frequency_rank BETWEEN 1 AND 10
+            ORDER BY l.frequency_rank
+        ''')
+        plan = ' '.join(row['detail'] for row in cursor.fetchall())
+        assert 'idx_lemmas_rank' in plan
+        assert 'TEMP B-TREE' not in plan
+
+
+class TestLazyShuffledSessions:
+    """Test seeded, on-demand shuffled sessions"""
+    
+    def test_all_words_is_lazy(self, session_manager):
+        """Test the whole-deck session holds ids, not word dictionaries"""
+        count = session_manager.start_session()
+        assert count == 50
+        assert isinstance(session_manager.current_words.lemma_ids, range)
+    
+    def test_same_seed_resumes_same_order(self, session_manager):
+        """Test that (seed, position) reproduces a shuffled session"""
+        session_manager.start_session()
+        seed = session_manager.session_seed
+        first_order = [w['lemma_id'] for w in session_manager.current_words]
+        
+        session_manager.start_filter_session(All(), seed=seed)
+        assert [w['lemma_id'] for w in session_manager.current_words] == first_order
+        assert sorted(first_order) == list(range(1, 51))
+    
+    def test_deleted_lemmas_are_skipped(self, session_manager, database):
+        """Test that gaps in the id range are skipped when walking the deck"""
+        database.connection.execute('DELETE FROM lemmas WHERE lemma_id = 25')
+        session_manager.start_session()
+        seen = []
+        while session_manager.get_next_word():
+            seen.append(session_manager.current_word['lemma_id'])
+            session_manager.advance()
+        assert 25 not in seen
+        assert len(seen) == 49
+
+
 class TestWordNavigation:
     """Test word navigation during session"""
     
@@ -158,3 +253,127 @@ class TestSessionModeTracking:
         """Test part of speech session mode label"""
         session_manager.start_part_of_speech_session('noun')
         assert "noun" in session_manager.session_mode.lower()
+
+
+class TestLearningSteps:
+    """Test in-session re-queueing and interleaving"""
+    
+    def study(self, session_manager, answers):
+        """Answer every card with answers(lemma_id, times_seen); return the lemma_ids shown"""
+        shown = []
+        while session_manager.get_next_word():
+            lemma_id = session_manager.current_word['lemma_id']
+            shown.append(lemma_id)
+            session_manager.record_answer(answers(lemma_id, shown.count(lemma_id)))
+            session_manager.advance()
+        return shown
+    
+    def test_get_next_word_is_stable_until_advance(self, session_manager):
+        """Test repeated calls return the card on screen"""
+        session_manager.start_session(limit=5)
+        assert session_manager.get_next_word() is session_manager.get_next_word()
+    
+    def test_failed_card_returns_after_steps(self, session_manager, monkeypatch):
+        """Test 'again' re-queues the card for each learning step"""
+        monkeypatch.setattr(Config, 'LEARNING_STEPS', ((2, 'cards'), (3, 'cards')))
+        session_manager.start_filter_session(Field('rank', '<=', 8), shuffle=False)
+        first = session_manager.get_next_word()['lemma_id']
+        shown = self.study(session_manager, lambda lemma_id, seen: 'again' if (lemma_id, seen) == (first, 1) else 'good')
+        
+        assert shown.count(first) == 3  # Original, then once per step
+        assert len(shown) == 10
+        positions = [i for i, lemma_id in enumerate(shown) if lemma_id == first]
+        assert positions[1] - positions[0] >= 3
+        assert session_manager.is_complete()
+    
+    def test_easy_graduates(self, session_manager):
+        """Test a learning card answered easy is not shown again"""
+        session_manager.start_session(limit=5)
+        first = session_manager.get_next_word()['lemma_id']
+        shown = self.study(session_manager, lambda lemma_id, seen: 'again' if seen == 1 and lemma_id == first else 'easy')
+        assert shown.count(first) == 2
+    
+    def test_new_and_review_are_interleaved(self, session_manager, database, monkeypatch):
+        """Test SESSION_MIX ratios between new and review cards"""
+        monkeypatch.setattr(Config, 'SESSION_MIX', {'learning': 1, 'review': 1, 'new': 1})
+        database.connection.execute('DELETE FROM user_progress WHERE lemma_id <= 10')
+        session_manager.start_filter_session(Field('rank', '<=', 20), shuffle=False)
+        shown = self.study(session_manager, lambda lemma_id, seen: 'good')
+        kinds = ['new' if lemma_id <= 10 else 'review' for lemma_id in shown]
+        assert kinds[:6] in (['review', 'new'] * 3, ['new', 'review'] * 3)
+        assert sorted(shown) == list(range(1, 21))
+
+
+class TestCheckpoints:
+    """Test persistent, resumable sessions"""
+    
+    def answer(self, session_manager, count=None, database=None):
+        """Answer cards (every seventh lemma 'again' the first time); return the lemma_ids shown"""
+        shown = []
+        while (count is None or len(shown) < count) and session_manager.get_next_word():
+            lemma_id = session_manager.current_word['lemma_id']
+            shown.append(lemma_id)
+            failed = lemma_id % 7 == 0 and session_manager.current_step is None
+            if database is not None:
+                database.update_progress(lemma_id, familiarity=1 if failed else 3)
+            session_manager.record_answer('again' if failed else 'good')
+            session_manager.advance()
+        return shown
+    
+    def test_resume_continues_where_stopped(self, session_manager, database):
+        """Test a resumed shuffled session shows exactly the remaining cards"""
+        session_manager.start_session()
+        self.answer(session_manager, 5)
+        checkpoint = database.load_checkpoint()
+        assert checkpoint['position'] >= 5
+        assert checkpoint['total'] == 5
+        rest = self.answer(session_manager)
+        
+        resumed = SessionManager(database)
+        assert resumed.resume_session(checkpoint) == 50
+        assert resumed.session_stats['total'] == 5
+        assert self.answer(resumed) == rest
+    
+    def test_finished_session_is_forgotten(self, session_manager, database):
+        """Test completing a session removes its checkpoint"""
+        session_manager.start_session(limit=3)
+        self.answer(session_manager, 1)
+        assert database.load_checkpoint() is not None
+        self.answer(session_manager)
+        assert session_manager.is_complete()
+        assert database.load_checkpoint() is None
+    
+    def test_one_row_per_session(self, session_manager, database):
+        """Test checkpoints are upserted, and a new session replaces the old one"""
+        session_manager.start_session(limit=10)
+        self.answer(session_manager, 3)
+        session_manager.start_custom_session(1, 20)
+        self.answer(session_manager, 2)
+        count = database.connection.execute('SELECT COUNT(*) FROM session_checkpoints').fetchone()[0]
+        assert count == 1
+        assert database.load_checkpoint()['mode'] == 'Custom Range: 1-20'
+    
+    def test_random_sessions_are_not_checkpointed(self, session_manager, database):
+        """Test sessions that cannot be rebuilt from a filter are skipped"""
+        session_manager.start_random_session(count=5)
+        self.answer(session_manager, 2)
+        assert database.load_checkpoint() is None
+    
+    def test_progress_dependent_session_resumes(self, session_manager, database):
+        """Test due sessions are re-queried without answered words, keeping learning cards"""
+        database.connection.execute('UPDATE user_progress SET next_review = 0 WHERE lemma_id = 14')
+        session_manager.start_filter_session(Due(), "Due Today", order='due', shuffle=False)
+        due = {w['lemma_id'] for w in session_manager.current_words}
+        first = self.answer(session_manager, 3, database)
+        failed = {lemma_id for lemma_id in first if lemma_id % 7 == 0}
+        assert 14 in failed and len(session_manager.learning) == len(failed)
+        
+        resumed = SessionManager(database)
+        resumed.resume_session()
+        assert resumed.session_mode == 'Due Today'
+        assert resumed.cards_shown == 3
+        assert len(resumed.learning) == len(failed)
+        rest = self.answer(resumed, database=database)
+        assert not (set(first) - failed) & set(rest)
+        assert failed <= set(rest)  # Back from learning
+        assert set(first) | set(rest) == due
@@ -0,0 +1,92 @@
+"""
+Tests for Startup
+Tests the startup phase profiler and the fast-start card snapshot
+"""
+
+import io
+
+import pytest
+
+from startup import SNAPSHOT_KEY, StartupProfiler, load_snapshot, save_snapshot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestProfiler:
+    """Test phase recording"""
+    
+    def test_phases_are_offsets_from_origin(self):
+        """Test each phase records when it started and how long it took"""
+        clock = FakeClock()
+        profiler = StartupProfiler(enabled=True, origin=0.0, clock=clock)
+        clock.now = 0.5
+        with profiler.phase('database'):
+            clock.now = 0.75
+        profiler.mark('first card')
+        assert profiler.as_dict() == [
+            {'phase': 'database', 'start_ms': 500.0, 'duration_ms': 250.0},
+            {'phase': 'first card', 'start_ms': 750.0, 'duration_ms': 0.0},
+        ]
+        assert 'total' in profiler.report()
+    
+    def test_phase_recorded_on_error(self):
+        """Test a failing phase is still recorded"""
+        profiler = StartupProfiler(enabled=True)
+        with pytest.raises(RuntimeError):
+            with profiler.phase('boom'):
+                raise RuntimeError
+        assert [p['phase'] for p in profiler.as_dict()] == ['boom']
+    
+    def test_disabled_records_nothing(self):
+        """Test the profiler is silent unless enabled"""
+        profiler = StartupProfiler()
+        with profiler.phase('database'):
+            pass
+        out = io.StringIO()
+        profiler.dump(out)
+        assert profiler.phases == [] and out.getvalue() == ''
+    
+    def test_dump(self):
+        """Test the breakdown is written when enabled"""
+        profiler = StartupProfiler(enabled=True)
+        profiler.mark('first card')
+        out = io.StringIO()
+        profiler.dump(out)
+        assert 'first card' in out.getvalue()
+
+
+class TestSnapshot:
+    """Test the first-card snapshot"""
+    
+    def test_round_trip(self, database):
+        """Test a saved card is loaded back with only the fields needed to draw it"""
+        word = database.get_word(6)
+        save_snapshot(database, 'checkpoint', 'Top 50 (resumed)', word)
+        snapshot = load_snapshot(database)
+        assert snapshot['source'] == 'checkpoint'
+        assert snapshot['label'] == 'Top 50 (resumed)'
+        assert snapshot['word']['hebrew'] == word['hebrew']
+        assert 'easiness' not in snapshot['word']
+    
+    def test_cleared_for_sessions_that_cannot_resume(self, database):
+        """Test saving without a source removes the snapshot"""
+        save_snapshot(database, 'srs', 'SRS', database.get_word(1))
+        save_snapshot(database, None, 'Random', database.get_word(2))
+        assert load_snapshot(database) is None
+    
+    def test_unknown_source_rejected(self, database):
+        """Test only rebuildable sessions can be snapshotted"""
+        with pytest.raises(ValueError):
+            save_snapshot(database, 'random', 'Random', database.get_word(1))
+    
+    @pytest.mark.parametrize('text', ['not json', '[]', '{"source": "srs"}', '{"source": "x", "word": {"hebrew": "a"}}'])
+    def test_invalid_snapshot_ignored(self, database, text):
+        """Test a damaged snapshot falls back to a normal start"""
+        database.save_setting(SNAPSHOT_KEY, text)
+        assert load_snapshot(database) is None
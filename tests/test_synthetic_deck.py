@@ -0,0 +1,92 @@
+"""
+Tests for the synthetic deck generator
+Tests determinism, table contents and the per-size deck cache
+"""
+
+import sqlite3
+
+import pytest
+
+from synthetic_deck import CATEGORIES, cached_deck, generate
+
+
+def table_rows(path, table):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(f'SELECT * FROM {table} ORDER BY 1, 2').fetchall()
+    finally:
+        connection.close()
+
+
+class TestGenerate:
+    """Test deck generation"""
+    
+    def test_deterministic(self, tmp_path):
+        """Test the same size, seed and day always build the same rows"""
+        first = generate(tmp_path / 'a.db', 300, seed=7, today=20000)
+        second = generate(tmp_path / 'b.db', 300, seed=7, today=20000)
+        for table in ('lemmas', 'variants', 'lemma_categories', 'translations', 'user_progress'):
+            assert table_rows(first, table) == table_rows(second, table)
+    
+    def test_seed_changes_deck(self, tmp_path):
+        """Test a different seed builds a different deck"""
+        first = generate(tmp_path / 'a.db', 300, seed=1, today=20000)
+        second = generate(tmp_path / 'b.db', 300, seed=2, today=20000)
+        assert table_rows(first, 'lemmas') != table_rows(second, 'lemmas')
+    
+    def test_contents(self, tmp_path):
+        """Test every table is populated with plausible spreads"""
+        path = generate(tmp_path / 'deck.db', 2000, today=20000)
+        connection = sqlite3.connect(path)
+        count = lambda sql: connection.execute(sql).fetchone()[0]
+        assert count('SELECT COUNT(*) FROM lemmas') == 2000
+        assert count('SELECT COUNT(*) FROM categories') == len(CATEGORIES)
+        assert 0 < count('SELECT COUNT(*) FROM user_progress') < 2000
+        assert count('SELECT COUNT(*) FROM variants') > 1000
+        assert count('SELECT COUNT(*) FROM translations') > 500
+        assert count('SELECT COUNT(DISTINCT part_of_speech) FROM lemmas') > 4
+        # Some roots are shared by several words
+        assert count('SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM lemmas GROUP BY root)') > 3
+        # Some reviews are due
+        assert count('SELECT COUNT(*) FROM user_progress WHERE next_review <= 20000') > 0
+        connection.close()
+    
+    def test_stats_and_indexes_restored(self, tmp_path):
+        """Test stats_summary matches the data and dropped triggers and indexes are back"""
+        path = generate(tmp_path / 'deck.db', 500, today=20000)
+        connection = sqlite3.connect(path)
+        assert connection.execute('SELECT SUM(count) FROM stats_summary').fetchone()[0] == 500
+        studied = dict(connection.execute(
+            'SELECT familiarity, COUNT(*) FROM user_progress GROUP BY familiarity').fetchall())
+        summary = dict(connection.execute('SELECT familiarity, count FROM stats_summary').fetchall())
+        assert all(summary[level] == studied.get(level, 0) for level in (1, 2, 3, 4))
+        names = {row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('trigger', 'index')")}
+        assert {'idx_lemmas_rank', 'idx_variants_lemma', 'stats_progress_update'} <= names
+        connection.close()
+    
+    def test_refuses_to_overwrite(self, tmp_path):
+        """Test an existing database is never overwritten"""
+        path = generate(tmp_path / 'deck.db', 10)
+        with pytest.raises(FileExistsError):
+            generate(path, 10)
+
+
+class TestCache:
+    """Test the per-size deck cache"""
+    
+    def test_built_once(self, tmp_path):
+        """Test a cached deck is reused rather than rebuilt"""
+        path = cached_deck(200, cache_dir=tmp_path)
+        mtime = path.stat().st_mtime_ns
+        assert cached_deck(200, cache_dir=tmp_path) == path
+        assert path.stat().st_mtime_ns == mtime
+        assert cached_deck(201, cache_dir=tmp_path) != path
+    
+    def test_fixture_gives_writable_copy(self, synthetic_database):
+        """Test the fixture's database can be changed without touching the cache"""
+        db = synthetic_database(1000)
+        assert db.count_lemmas() == 1000
+        db.update_progress(1, 4)
+        assert sqlite3.connect(cached_deck(1000)).execute(
+            'SELECT COUNT(*) FROM review_log').fetchone()[0] == 0
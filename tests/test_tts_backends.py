@@ -0,0 +1,133 @@
+"""
+Tests for TTS backends
+Tests engine commands, backend selection, recordings and the synthesis pool
+"""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from audio_player import AudioPlayer
+from tts_backends import EspeakBackend, FileBackend, SayBackend, SynthesisPool, select_backend
+
+
+def write_clip(command, **kwargs):
+    """Stand-in for an engine rendering to a file: writes to the path after -o/-w"""
+    flag = '-o' if '-o' in command else '-w'
+    with open(command[command.index(flag) + 1], 'wb') as f:
+        f.write(command[-1].encode('utf-8'))
+
+
+class TestBackends:
+    """Test each engine's commands"""
+    
+    def test_say_commands(self):
+        """Test say speaks and renders with its Hebrew voice and plays with afplay"""
+        backend = SayBackend()
+        assert backend.speak_command('שלום', None) == ['say', '-v', 'Carmit', 'שלום']
+        assert backend.render_command('שלום', 'Carmit', 'out.aiff') == ['say', '-v', 'Carmit', '-o', 'out.aiff', 'שלום']
+        assert backend.play_command('out.aiff') == ['afplay', 'out.aiff']
+    
+    def test_espeak_commands(self):
+        """Test espeak-ng uses its Hebrew voice and writes wav files"""
+        backend = EspeakBackend()
+        assert backend.speak_command('שלום', None) == ['espeak-ng', '-v', 'he', 'שלום']
+        assert backend.render_command('שלום', 'he', 'out.wav') == ['espeak-ng', '-v', 'he', '-w', 'out.wav', 'שלום']
+        assert backend.suffix == '.wav'
+    
+    def test_recordings_are_found_by_text(self, tmp_path):
+        """Test a recording is looked up by its Hebrew file name"""
+        (tmp_path / 'שלום.mp3').write_bytes(b'clip')
+        backend = FileBackend(tmp_path)
+        assert backend.recorded('שלום') == tmp_path / 'שלום.mp3'
+        assert backend.recorded('תודה') is None
+        assert backend.speak_command('שלום', None)[-1] == str(tmp_path / 'שלום.mp3')
+        with pytest.raises(FileNotFoundError):
+            backend.speak_command('תודה', None)
+    
+    def test_select_named_backend(self, tmp_path):
+        """Test a configured engine is used as named"""
+        assert isinstance(select_backend('espeak-ng'), EspeakBackend)
+        assert select_backend('file', tmp_path).directory == tmp_path
+        with pytest.raises(ValueError):
+            select_backend('festival')
+    
+    def test_select_first_installed_backend(self, tmp_path):
+        """Test automatic selection skips engines that are not installed"""
+        with patch('tts_backends.shutil.which', lambda name: '/usr/bin/espeak-ng' if name == 'espeak-ng' else None):
+            assert isinstance(select_backend(), EspeakBackend)
+        with patch('tts_backends.shutil.which', return_value=None):
+            assert isinstance(select_backend(None, tmp_path), FileBackend)
+
+
+class TestSynthesisPool:
+    """Test requests supersede each other"""
+    
+    def test_newer_request_supersedes_older(self):
+        """Test a queued request is cancelled and a running one does not call back"""
+        pool = SynthesisPool(workers=1)
+        started, release = threading.Event(), threading.Event()
+        played = []
+        
+        def slow():
+            started.set()
+            release.wait(5)
+            return 'first'
+        
+        try:
+            first = pool.submit(slow, played.append)
+            assert started.wait(5)
+            second = pool.submit(lambda: 'second', played.append)
+            third = pool.submit(lambda: 'third', played.append)
+            release.set()
+            assert third.result(5) == 'third'
+            assert first.result(5) == 'first'
+            assert second.cancelled()
+            assert played == ['third']
+        finally:
+            pool.shutdown()
+
+
+class TestPooledPlayback:
+    """Test AudioPlayer with a backend and pool"""
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('tts_backends.subprocess.run')
+    def test_background_render_then_play(self, mock_run, mock_popen, cache, database):
+        """Test a pooled play renders off-thread, plays, and records audio_path on the next call"""
+        mock_run.side_effect = write_clip
+        player = AudioPlayer(None, cache, database, backend=EspeakBackend(), pool=SynthesisPool())
+        try:
+            path = player.play('שלום', lemma_id=1).result(5)
+            assert path.suffix == '.wav' and path.read_bytes() == 'שלום'.encode('utf-8')
+            assert mock_popen.call_args[0][0][-1] == str(path)
+            assert player.voice == 'he'
+            assert database.get_audio_path(1) is None
+            player.record_audio_paths()
+            assert cache.path(database.get_audio_path(1)) == path
+        finally:
+            player.close()
+    
+    @patch('audio_player.subprocess.Popen')
+    def test_next_word_stops_previous(self, mock_popen):
+        """Test starting a word terminates the one still speaking"""
+        speaking = MagicMock()
+        speaking.poll.return_value = None
+        mock_popen.return_value = speaking
+        player = AudioPlayer(backend=EspeakBackend())
+        player.play('שלום')
+        player.play('תודה')
+        speaking.terminate.assert_called_once()
+        assert mock_popen.call_args[0][0] == ['espeak-ng', '-v', 'he', 'תודה']
+    
+    @patch('audio_player.subprocess.Popen')
+    @patch('tts_backends.subprocess.run')
+    def test_recordings_skip_rendering(self, mock_run, mock_popen, cache, tmp_path):
+        """Test a pre-recorded word plays its file without synthesis or caching"""
+        (tmp_path / 'שלום.wav').write_bytes(b'clip')
+        player = AudioPlayer(None, cache, backend=FileBackend(tmp_path))
+        player.play('שלום')
+        mock_run.assert_not_called()
+        assert mock_popen.call_args[0][0][-1] == str(tmp_path / 'שלום.wav')
+        assert len(cache) == 0
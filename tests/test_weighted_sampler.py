@@ -0,0 +1,91 @@
+"""
+Tests for Weighted Sampler
+Tests the Fenwick tree and weakness-weighted card sampling
+"""
+
+import random
+import pytest
+from collections import Counter
+
+from weighted_sampler import FenwickTree, WeaknessSampler, weakness_weight
+
+
+class TestFenwickTree:
+    """Test prefix sums, updates and search"""
+    
+    def test_total_and_update(self):
+        """Test totals follow point updates"""
+        tree = FenwickTree([1.0, 2.0, 3.0, 4.0, 5.0])
+        assert tree.total() == pytest.approx(15.0)
+        tree.update(2, 0.0)
+        assert tree.total() == pytest.approx(12.0)
+    
+    def test_find(self):
+        """Test that find maps a target to the bucket containing it"""
+        tree = FenwickTree([1.0, 2.0, 0.0, 3.0])
+        assert tree.find(0.5) == 0
+        assert tree.find(1.0) == 1
+        assert tree.find(2.9) == 1
+        assert tree.find(3.0) == 3  # Zero-weight index 2 is never selected
+
+
+class TestWeaknessWeight:
+    """Test the weight function"""
+    
+    def test_weak_words_weigh_more(self):
+        """Test again > hard > good > easy"""
+        weights = [weakness_weight(f, 2.5, 0, None, 100) for f in (1, 2, 3, 4)]
+        assert weights == sorted(weights, reverse=True)
+    
+    def test_overdue_words_weigh_more(self):
+        """Test overdue words are favoured"""
+        assert weakness_weight(3, 2.5, 1, 90, 100) > weakness_weight(3, 2.5, 1, 100, 100)
+
+
+class TestWeaknessSampler:
+    """Test drawing cards"""
+    
+    def test_draws_are_distinct(self, database):
+        """Test no card is drawn twice and weights are restored"""
+        sampler = WeaknessSampler.build(database)
+        total = sampler.tree.total()
+        drawn = sampler.sample(20, random.Random(1))
+        assert len(drawn) == len(set(drawn)) == 20
+        assert sampler.tree.total() == pytest.approx(total)
+    
+    def test_favours_heavy_weights(self):
+        """Test draw frequencies follow the weights"""
+        sampler = WeaknessSampler([1, 2], [9.0, 1.0])
+        rng = random.Random(0)
+        counts = Counter(sampler.sample(1, rng)[0] for _ in range(2000))
+        assert counts[1] > 5 * counts[2]
+    
+    def test_listener_reweights(self, database):
+        """Test that answering a word updates its weight"""
+        sampler = WeaknessSampler.build(database)
+        database.add_progress_listener(sampler.update_progress)
+        ordinal = sampler.ordinals[30]
+        database.update_progress(30, familiarity=1)
+        weak = sampler.tree.weights[ordinal]
+        database.update_progress(30, familiarity=4)
+        assert sampler.tree.weights[ordinal] < weak
+    
+    def test_smart_random_session(self, session_manager):
+        """Test the weakness-weighted session mode"""
+        count = session_manager.start_smart_random_session(count=10)
+        assert count == 10
+        assert len({w['lemma_id'] for w in session_manager.current_words}) == 10
+    
+    def test_reweights_on_new_day(self, database, monkeypatch):
+        """Test overdue weights are recomputed when the study day changes"""
+        import weighted_sampler
+        sampler = WeaknessSampler.build(database)
+        lemma_id = database.connection.execute(
+            'SELECT lemma_id FROM user_progress WHERE next_review IS NOT NULL LIMIT 1'
+        ).fetchone()[0]
+        before = sampler.tree.weights[sampler.ordinals[lemma_id]]
+        later = sampler.build_day + 20
+        monkeypatch.setattr(weighted_sampler, 'day_number', lambda: later)
+        sampler.sample(1)
+        assert sampler.build_day == later
+        assert sampler.tree.weights[sampler.ordinals[lemma_id]] > before
@@ -0,0 +1,206 @@
+"""
+TTS Backends
+Pluggable text-to-speech engines and the bounded worker pool that runs synthesis
+Each backend can speak text live, render it to a clip file for the audio cache,
+and name the command that plays a clip. Pre-recorded clips (FileBackend) are
+played as they are, without rendering.
+"""
+
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config import Config
+
+# Longest a single word may take to render before giving up
+RENDER_TIMEOUT = 30
+
+# Clip players, first available wins
+PLAYERS = (
+    ('afplay',),
+    ('paplay',),
+    ('aplay', '-q'),
+    ('ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet'),
+)
+
+# Players that read a clip from stdin (afplay cannot)
+STREAM_PLAYERS = (
+    ('paplay',),
+    ('aplay', '-q', '-'),
+    ('ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet', '-i', '-'),
+)
+
+
+def find_player():
+    """Command prefix of the first installed clip player (afplay if none is found)"""
+    for player in PLAYERS:
+        if shutil.which(player[0]):
+            return list(player)
+    return list(PLAYERS[0])
+
+
+def find_stream_player():
+    """Command of the first installed player reading stdin, or None"""
+    for player in STREAM_PLAYERS:
+        if shutil.which(player[0]):
+            return list(player)
+    return None
+
+
+class TTSBackend:
+    """Base class: one speech engine, addressed in the audio cache by `name`"""
+    
+    name = None
+    command = None  # Executable the backend needs
+    suffix = '.wav'  # Clip format it renders
+    default_voice = None
+    
+    def available(self):
+        return shutil.which(self.command) is not None
+    
+    def speak_command(self, text, voice):
+        """Command speaking text aloud directly"""
+        raise NotImplementedError
+    
+    def render_command(self, text, voice, path):
+        """Command writing text as a clip to path"""
+        raise NotImplementedError
+    
+    def render(self, text, voice, path):
+        """Write text as a clip to path (blocks until the engine exits)"""
+        subprocess.run(
+            self.render_command(text, voice, path),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=RENDER_TIMEOUT
+        )
+    
+    def recorded(self, text):
+        """An existing clip for text that needs no rendering, or None"""
+        return None
+    
+    def play_command(self, path):
+        return [*find_player(), str(path)]
+
+
+class SayBackend(TTSBackend):
+    """macOS 'say' with a Hebrew voice"""
+    
+    name = 'say'
+    command = 'say'
+    suffix = '.aiff'
+    default_voice = 'Carmit'
+    
+    def speak_command(self, text, voice):
+        return ['say', '-v', voice or self.default_voice, text]
+    
+    def render_command(self, text, voice, path):
+        return ['say', '-v', voice or self.default_voice, '-o', str(path), text]
+    
+    def play_command(self, path):
+        return ['afplay', str(path)]
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng (Linux, Windows) with its Hebrew voice"""
+    
+    name = 'espeak-ng'
+    command = 'espeak-ng'
+    default_voice = 'he'
+    
+    def speak_command(self, text, voice):
+        return ['espeak-ng', '-v', voice or self.default_voice, text]
+    
+    def render_command(self, text, voice, path):
+        return ['espeak-ng', '-v', voice or self.default_voice, '-w', str(path), text]
+
+
+class FileBackend(TTSBackend):
+    """Pre-recorded clips named after their text: <directory>/<text><extension>"""
+    
+    name = 'file'
+    EXTENSIONS = ('.wav', '.mp3', '.aiff', '.m4a', '.ogg')
+    
+    def __init__(self, directory):
+        self.directory = Path(directory) if directory else None
+    
+    def available(self):
+        return self.directory is not None and self.directory.is_dir()
+    
+    def recorded(self, text):
+        if not self.available():
+            return None
+        for extension in self.EXTENSIONS:
+            path = self.directory / f'{text}{extension}'
+            if path.is_file():
+                return path
+        return None
+    
+    def speak_command(self, text, voice):
+        path = self.recorded(text)
+        if path is None:
+            raise FileNotFoundError(f"No recording for: {text}")
+        return self.play_command(path)
+    
+    def render(self, text, voice, path):
+        raise FileNotFoundError(f"No recording for: {text}")
+
+
+BACKENDS = {'say': SayBackend, 'espeak-ng': EspeakBackend}
+
+
+def select_backend(engine=None, recordings=None):
+    """The named backend, or the first available: say on macOS, then espeak-ng, then recordings"""
+    if engine == FileBackend.name:
+        return FileBackend(recordings)
+    if engine is not None:
+        if engine not in BACKENDS:
+            raise ValueError(f"Unknown text-to-speech engine: {engine}")
+        return BACKENDS[engine]()
+    candidates = [SayBackend(), EspeakBackend()] if sys.platform == 'darwin' else [EspeakBackend(), SayBackend()]
+    for backend in candidates:
+        if backend.available():
+            return backend
+    return FileBackend(recordings)
+
+
+class SynthesisPool:
+    """A few worker threads for synthesis, where each request supersedes the last
+    
+    A request that has not started when the next one arrives is cancelled; one
+    already rendering finishes (its clip still lands in the cache) but its
+    callback is skipped. So at most `workers` engine processes run however fast
+    cards are flipped.
+    """
+    
+    def __init__(self, workers=Config.TTS_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.pending = None  # Future of the latest request
+    
+    def submit(self, render, then):
+        """Run render() on a worker, then then(result) unless a newer request arrived meanwhile"""
+        with self.lock:
+            self.generation += 1
+            if self.pending is not None:
+                self.pending.cancel()
+            self.pending = self.executor.submit(self._run, self.generation, render, then)
+            return self.pending
+    
+    def superseded(self, generation):
+        with self.lock:
+            return generation != self.generation
+    
+    def _run(self, generation, render, then):
+        if self.superseded(generation):
+            return None
+        result = render()
+        if not self.superseded(generation):
+            then(result)
+        return result
+    
+    def shutdown(self):
+        """Cancel queued requests and wait for the ones rendering (so the cache can close)"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -6,6 +6,8 @@ All UI configuration, themes, layout, fonts, colors, and widget creation in one
 
 import flet as ft
 
+from scheduler import day_to_date
+
 # ============================================================================
 #                           UI CONFIGURATION SECTION
 #              ALL VISUAL SETTINGS ARE HERE FOR EASY CUSTOMIZATION
@@ -261,7 +263,13 @@ class UIBuilder:
                     {'label': 'Prepositions Only', 'command': menu_callbacks.get('pos_preposition')},
                 ]},
                 {'separator': True},
+                {'label': 'Saved Filters', 'submenu': [
+                    {'label': label, 'command': command}
+                    for label, command in menu_callbacks.get('saved_filters', [])
+                ]},
+                {'separator': True},
                 {'label': 'Random 10 Words', 'command': menu_callbacks.get('random_10')},
+                {'label': 'Smart Random 10 (Favours Weak Words)', 'command': menu_callbacks.get('smart_random_10')},
             ]
             
             widgets['nav_study'] = ft.PopupMenuButton(
@@ -288,6 +296,8 @@ class UIBuilder:
             # Vocabulary Menu
             vocab_items_config = [
                 {'label': 'View Statistics', 'command': menu_callbacks.get('show_statistics')},
+                {'label': 'Review History', 'command': menu_callbacks.get('show_review_history')},
+                {'label': 'Diagnostics', 'command': menu_callbacks.get('show_diagnostics')},
             ]
             widgets['nav_vocabulary'] = ft.PopupMenuButton(
                 content=ft.Text("Vocabulary ▼", color=self.theme['nav_btn_fg']),
@@ -653,3 +663,92 @@ class DialogHelper:
             ft.TextButton("OK", on_click=lambda e: page.close(dlg))
         ]
         page.open(dlg)
+    
+    @staticmethod
+    def show_review_history(page, weeks, trend, summary, theme):
+        """Show the review heatmap (one cell per day) and 30-day trend bars"""
+        heat_colors = ['#ebedf0', '#9be9a8', '#40c463', '#30a14e', '#216e39']
+        cell = 10
+        
+        heatmap = ft.Row(
+            controls=[
+                ft.Column(
+                    controls=[
+                        ft.Container(
+                            width=cell, height=cell, border_radius=2,
+                            bgcolor=heat_colors[entry[2]] if entry else None,
+                            tooltip=f"{day_to_date(entry[0]).isoformat()}: {entry[1]} reviews" if entry else None,
+                        )
+                        for entry in week
+                    ],
+                    spacing=2,
+                )
+                for week in weeks
+            ],
+            spacing=2,
+            scroll=ft.ScrollMode.AUTO,
+        )
+        
+        busiest = max((reviews for _, reviews, _, _ in trend), default=0) or 1
+        bar_height = 60
+        bars = ft.Row(
+            controls=[
+                ft.Container(
+                    width=8, height=max(1, reviews * bar_height // busiest), bgcolor=theme['btn_good'],
+                    tooltip=(
+                        f"{day_to_date(day).isoformat()}: {reviews} reviews"
+                        + (f", {kept * 100:.0f}% recalled" if kept is not None else "")
+                        + f", {minutes:.0f} min"
+                    ),
+                )
+                for day, reviews, kept, minutes in trend
+            ],
+            spacing=2,
+            vertical_alignment=ft.CrossAxisAlignment.END,
+            height=bar_height,
+        )
+        
+        retention_text = f"{summary['retention'] * 100:.1f}%" if summary['retention'] is not None else "-"
+        totals = ft.Text(
+            f"Days studied: {summary['days_studied']}   Current streak: {summary['streak']} days\n"
+            f"Reviews: {summary['reviews']}   New words: {summary['new_cards']}   "
+            f"Recalled: {retention_text}   Time: {summary['minutes']:.0f} min"
+        )
+        
+        dlg = ft.AlertDialog(
+            title=ft.Text("Review History"),
+            content=ft.Column(
+                controls=[totals, ft.Text("Past year"), heatmap, ft.Text("Last 30 days"), bars],
+                tight=True,
+                spacing=10,
+            ),
+        )
+        dlg.actions = [
+            ft.TextButton("OK", on_click=lambda e: page.close(dlg))
+        ]
+        page.open(dlg)
+    
+    @staticmethod
+    def show_diagnostics(page, query_stats, engine_only):
+        """Show per-statement SQL counts and timings (empty when tracing is off)"""
+        if query_stats:
+            lines = [
+                f"{row['calls']:6d}x ({row['engine_runs']} runs)  {row['total_ms']:8.1f} ms total  "
+                f"{row['max_ms']:7.1f} ms max  {row['rows']:7d} rows\n    {row['sql'][:160]}"
+                for row in query_stats[:30]
+            ]
+            if engine_only:
+                lines.append("\nRun by SQLite only:")
+                lines.extend(f"{count:6d}x  {sql[:160]}" for sql, count in engine_only[:10])
+            body = ft.Text("\n".join(lines), font_family="monospace", size=11, selectable=True)
+        else:
+            body = ft.Text("Query tracing is off.\nStart the app with HEBREW_TRACE_SQL=1 to time every statement.")
+        
+        dlg = ft.AlertDialog(
+            title=ft.Text("Diagnostics: SQL Statements"),
+            content=ft.Column(controls=[body], tight=True, scroll=ft.ScrollMode.AUTO, height=420),
+        )
+        dlg.actions = [
+            ft.TextButton("OK", on_click=lambda e: page.close(dlg))
+        ]
+        page.open(dlg)
@@ -0,0 +1,142 @@
+"""
+Weighted Sampler
+Random card selection that favours weak words
+A Fenwick (binary indexed) tree over per-word weights gives O(log n) draws and
+O(log n) weight updates, so drawing k cards never sorts or scans the deck
+"""
+
+import random
+from array import array
+
+from scheduler import day_number
+
+# Base weight by familiarity (None/0 = never studied)
+FAMILIARITY_WEIGHTS = {None: 3.0, 0: 3.0, 1: 8.0, 2: 5.0, 3: 2.0, 4: 1.0}
+
+
+def weakness_weight(familiarity, easiness, streak, next_review, today):
+    """Sampling weight for a word - higher means weaker"""
+    weight = FAMILIARITY_WEIGHTS.get(familiarity, 1.0)
+    weight *= 2.5 / max(easiness or 2.5, 1.3)   # Low easiness -> harder word
+    weight /= 1 + 0.5 * (streak or 0)           # Long streaks -> well known
+    if next_review is not None and next_review < today:
+        weight *= 1 + min(today - next_review, 30) / 10  # Overdue words, capped at 4x
+    return weight
+
+
+class FenwickTree:
+    """Prefix sums over float weights with point updates"""
+    
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.weights = array('d', weights)
+        self.tree = array('d', [0.0]) * (self.size + 1)
+        # O(n) construction: push each node's sum to its parent once
+        for i, weight in enumerate(self.weights, start=1):
+            self.tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self.top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+    
+    def update(self, index, weight):
+        """Set the weight at index - O(log n)"""
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+    
+    def total(self):
+        """Sum of all weights - O(log n)"""
+        result = 0.0
+        i = self.size
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+    
+    def find(self, target):
+        """Smallest index whose prefix sum exceeds target - O(log n) binary lifting"""
+        position = 0
+        step = self.top_bit
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] <= target:
+                position = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return min(position, self.size - 1)
+
+
+class WeaknessSampler:
+    """Draws lemma_ids with probability proportional to weakness_weight"""
+    
+    def __init__(self, lemma_ids, weights):
+        self.lemma_ids = array('q', lemma_ids)
+        self.ordinals = {lemma_id: i for i, lemma_id in enumerate(self.lemma_ids)}
+        self.tree = FenwickTree(weights)
+        self.db = None
+        self.build_day = None  # Overdue weights depend on the day they were computed
+    
+    @classmethod
+    def build(cls, db):
+        """Build weights for every lemma with a single query"""
+        sampler = cls(*cls._load(db, day_number()))
+        sampler.db = db
+        sampler.build_day = day_number()
+        return sampler
+    
+    @staticmethod
+    def _load(db, today):
+        cursor = db.connection.cursor()
+        cursor.execute('''
+            SELECT l.lemma_id, up.familiarity, up.easiness, up.streak, up.next_review
+            FROM lemmas l
+            LEFT JOIN user_progress up ON l.lemma_id = up.lemma_id
+        ''')
+        lemma_ids, weights = array('q'), array('d')
+        for lemma_id, familiarity, easiness, streak, next_review in cursor:
+            lemma_ids.append(lemma_id)
+            weights.append(weakness_weight(familiarity, easiness, streak, next_review, today))
+        return lemma_ids, weights
+    
+    def refresh(self):
+        """Recompute every weight in place (once per study day, as cards become more overdue)"""
+        today = day_number()
+        fresh = WeaknessSampler(*self._load(self.db, today))
+        self.lemma_ids, self.ordinals, self.tree = fresh.lemma_ids, fresh.ordinals, fresh.tree
+        self.build_day = today
+    
+    def update_progress(self, lemma_id, progress):
+        """Progress listener: re-weight one word - O(log n)"""
+        ordinal = self.ordinals.get(lemma_id)
+        if ordinal is not None:
+            self.tree.update(ordinal, weakness_weight(
+                progress['familiarity'], progress['easiness'], progress['streak'],
+                progress['next_review'], day_number()
+            ))
+    
+    def sample(self, count, rng=random):
+        """Draw up to `count` distinct lemma_ids - O(k log n)"""
+        if self.db is not None and day_number() != self.build_day:
+            self.refresh()
+        drawn = []
+        removed = []
+        target_count = min(count, len(self.lemma_ids))
+        while len(drawn) < target_count:
+            total = self.tree.total()
+            if total <= 1e-9:
+                break  # Only rounding residue left - every weighted card is drawn
+            ordinal = self.tree.find(rng.random() * total)
+            weight = self.tree.weights[ordinal]
+            if weight <= 0:
+                continue  # Float rounding landed on an already-drawn card; draw again
+            drawn.append(self.lemma_ids[ordinal])
+            # Zero the weight so the same card is not drawn twice, then restore below
+            removed.append((ordinal, weight))
+            self.tree.update(ordinal, 0.0)
+        for ordinal, weight in removed:
+            self.tree.update(ordinal, weight)
+        return drawn